@@ -99,6 +99,12 @@ export const intakeFormApi = {
   saveUserDumbbellInfo: (email: string, dumbbellData: any) => {
     return apiRequest(`/intake/${encodeURIComponent(email)}/dumbbell-info`, 'POST', dumbbellData);
   },
+
+  // Save several sections (intake, goals, strength_measurements, genetics,
+  // cardio_equipment, gym_equipment, dumbbell_info) in one round trip
+  submitIntakeSections: (email: string, sections: any) => {
+    return apiRequest(`/intake/${encodeURIComponent(email)}/submit`, 'POST', sections);
+  },
 };
 
 export const goalsApi = {
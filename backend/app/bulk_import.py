@@ -0,0 +1,311 @@
+"""
+Bulk NDJSON import of clients: one line per client, holding the user and any
+intake sections (ClientImport, the /intake/{email}/submit body plus the user).
+
+The body is split into lines as it streams in and handled IMPORT_BATCH_SIZE
+lines at a time. A batch is validated with the API's own schemas and written in
+one transaction with one executemany per table, instead of the create user /
+initialize / submit round trips per client. When the batch transaction fails,
+its rows are retried one transaction each so only the offending rows are
+reported; earlier batches stay committed.
+
+The inserts bypass the ORM, so this module does what the mapper events would:
+it fills in the normalized measurement columns, counts the forms into the
+funnel counters, appends the strength history and bumps the strength version.
+"""
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.config import env_int
+from app.data_versions import mark_changed
+from app.database import DbSession
+from app.dependencies import invalidate_user, normalize_email
+from app.funnel import count_inserted_forms
+from app.models import intake_models, user_models
+from app.models.schemas import ClientImport, ImportReport, ImportRowError, IntakeFormUpdate
+from app.strength import STRENGTH_VERSION
+from app.strength_history import append_entries, database_now, entry_rows
+from app.units import FORM_INPUTS, LIFTS, STRENGTH_INPUTS, normalized_form_columns, normalized_strength_columns
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = env_int("IMPORT_BATCH_SIZE", 500)
+IMPORT_MAX_ERRORS = env_int("IMPORT_MAX_ERRORS", 1000)
+# Longer lines are reported as errors; at most this much of a line is buffered
+MAX_LINE_BYTES = 1024 * 1024
+
+_USERS = user_models.User.__table__
+_FORMS = intake_models.IntakeForm.__table__
+_STRENGTH = intake_models.StrengthMeasurement.__table__
+_GENETICS = intake_models.Genetics.__table__
+_DUMBBELLS = intake_models.DumbbellInfo.__table__
+_GYM = intake_models.GymEquipment.__table__
+_CARDIO = intake_models.CardioEquipment.__table__
+
+# Every row of one executemany must have the same keys, so rows are built over
+# fixed column lists with the columns' Python-side defaults filled in
+_USER_COLUMNS = ["user_id", "email", "full_name", "phone_number", "is_signup_only"]
+_FORM_COLUMNS = ["user_id", "email"] + [name for name in IntakeFormUpdate.model_fields if name in _FORMS.c]
+_STRENGTH_COLUMNS = ["form_id", "user_id", *STRENGTH_INPUTS, "strength1_completed", "strength2_completed", "last_updated"]
+_GENETICS_COLUMNS = ["form_id", "user_id", "wrist_circumference", "ankle_circumference", "genetics_completed"]
+_DUMBBELL_COLUMNS = ["form_id", "user_id", "is_full_set", "min_weight", "max_weight", "specific_weights"]
+
+Line = Tuple[int, Optional[bytes]]
+Numbered = Tuple[int, ClientImport]
+
+
+def _defaults(table) -> Dict[str, object]:
+    return {
+        column.name: column.default.arg
+        for column in table.columns
+        if column.default is not None and column.default.is_scalar
+    }
+
+
+_DEFAULTS = {table.name: _defaults(table) for table in (_USERS, _FORMS, _STRENGTH, _GENETICS)}
+
+
+def _row(table, names: List[str], values: Dict[str, object]) -> Dict[str, object]:
+    # Missing and null values get the column default, as an ORM insert would for unset ones
+    defaults = _DEFAULTS.get(table.name, {})
+    return {name: defaults.get(name) if values.get(name) is None else values[name] for name in names}
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Line]:
+    """
+    (line number, line) for each non-blank line of a streamed body; the line is
+    None when it is longer than MAX_LINE_BYTES
+    """
+    buffer = b""
+    number = 0
+    oversized = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if oversized or len(line) > MAX_LINE_BYTES:
+                oversized = False
+                yield number, None
+            elif line.strip():
+                yield number, line
+        if len(buffer) > MAX_LINE_BYTES:
+            # Drop the line's head; its tail is reported when the newline arrives
+            oversized = True
+            buffer = b""
+    if oversized or buffer.strip():
+        yield number + 1, None if oversized else buffer
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    )
+
+
+def _parse(lines: List[Line]) -> Tuple[List[Numbered], List[ImportRowError]]:
+    clients, errors = [], []
+    for number, line in lines:
+        if line is None:
+            errors.append(ImportRowError(line=number, detail=f"Line exceeds {MAX_LINE_BYTES} bytes"))
+            continue
+        try:
+            client = ClientImport.model_validate_json(line)
+        except ValidationError as e:
+            errors.append(ImportRowError(line=number, detail=_validation_detail(e)))
+            continue
+        # Stored, compared and cached as every other writer does
+        client.user.email = normalize_email(client.user.email)
+        clients.append((number, client))
+    return clients, errors
+
+
+def _reject_existing(db: Session, clients: List[Numbered]) -> Tuple[List[Numbered], List[ImportRowError]]:
+    """
+    Drop clients whose email or user_id is already registered or repeats an earlier line
+    """
+    emails = [client.user.email for _, client in clients]
+    user_ids = [client.user.user_id for _, client in clients]
+    registered_emails, registered_ids = set(), set()
+    for email, user_id in db.execute(
+        select(_USERS.c.email, _USERS.c.user_id).where(or_(_USERS.c.email.in_(emails), _USERS.c.user_id.in_(user_ids)))
+    ):
+        registered_emails.add(email)
+        registered_ids.add(user_id)
+
+    accepted, errors = [], []
+    for number, client in clients:
+        email, user_id = client.user.email, client.user.user_id
+        if email in registered_emails:
+            errors.append(ImportRowError(line=number, email=email, detail="Email already registered"))
+        elif user_id in registered_ids:
+            errors.append(ImportRowError(line=number, email=email, detail="User id already registered"))
+        else:
+            accepted.append((number, client))
+        registered_emails.add(email)
+        registered_ids.add(user_id)
+    return accepted, errors
+
+
+def _form_values(client: ClientImport, now: datetime) -> Dict[str, object]:
+    """
+    Intake form column values as initialize + submit would leave them
+    """
+    values = {"user_id": client.user.user_id, "email": client.user.email}
+    if client.intake is not None:
+        values.update(client.intake.model_dump(exclude_unset=True))
+    if client.goals is not None:
+        values.update(client.goals.model_dump(), goals_completed=True)
+    if client.gym_equipment is not None and client.gym_equipment.leg_curl_type:
+        values["leg_curl_type"] = client.gym_equipment.leg_curl_type
+    values["last_updated"] = values.get("last_updated") or now
+    return values
+
+
+def _equipment_rows(form_id: int, user_id: str, equipment_list: List[str]) -> List[dict]:
+    # Skip empty entries and duplicates, keeping the submitted order
+    return [
+        {"form_id": form_id, "user_id": user_id, "equipment_type": e}
+        for e in dict.fromkeys(e for e in equipment_list if e)
+    ]
+
+
+def _insert_clients(db: Session, clients: List[ClientImport]) -> None:
+    """
+    Stage users, intake forms and section rows with one executemany per table,
+    plus the bookkeeping the ORM events would have done; does not commit
+    """
+    connection = db.connection()
+    now = database_now(connection)
+
+    connection.execute(insert(_USERS), [_row(_USERS, _USER_COLUMNS, client.user.model_dump()) for client in clients])
+
+    forms = [_row(_FORMS, _FORM_COLUMNS, _form_values(client, now)) for client in clients]
+    normalized = normalized_form_columns({name: [form[name] for form in forms] for name in FORM_INPUTS})
+    for i, form in enumerate(forms):
+        form.update({name: column[i] for name, column in normalized.items()})
+    connection.execute(insert(_FORMS), forms)
+    count_inserted_forms(db, forms)
+
+    user_ids = [client.user.user_id for client in clients]
+    form_ids = dict(connection.execute(
+        select(_FORMS.c.user_id, _FORMS.c.form_id).where(_FORMS.c.user_id.in_(user_ids))
+    ).all())
+
+    strength, systems, bodyweights = [], [], []
+    genetics, dumbbells, gym, cardio = [], [], [], []
+    for client, form in zip(clients, forms):
+        user_id = client.user.user_id
+        keys = {"form_id": form_ids[user_id], "user_id": user_id}
+        if client.strength_measurements is not None:
+            strength.append(_row(
+                _STRENGTH, _STRENGTH_COLUMNS,
+                {**client.strength_measurements.model_dump(), **keys, "last_updated": now},
+            ))
+            systems.append(form["measurement_system"])
+            bodyweights.append(form["weight_kg"])
+        if client.genetics is not None:
+            genetics.append(_row(_GENETICS, _GENETICS_COLUMNS, {**client.genetics.model_dump(), **keys}))
+        if client.dumbbell_info is not None:
+            dumbbells.append(_row(_DUMBBELLS, _DUMBBELL_COLUMNS, {**client.dumbbell_info.model_dump(), **keys}))
+        if client.gym_equipment is not None:
+            gym += _equipment_rows(keys["form_id"], user_id, client.gym_equipment.equipment_list)
+        if client.cardio_equipment is not None:
+            cardio += _equipment_rows(keys["form_id"], user_id, client.cardio_equipment.equipment_list)
+
+    if strength:
+        normalized = normalized_strength_columns(
+            {name: [row[name] for row in strength] for name in STRENGTH_INPUTS}, systems
+        )
+        for i, row in enumerate(strength):
+            row.update({name: column[i] for name, column in normalized.items()})
+        connection.execute(insert(_STRENGTH), strength)
+
+        history = {name: [] for name in ("user_ids", "recorded_at", "lifts", "weight", "reps", "bodyweight")}
+        for row, bodyweight in zip(strength, bodyweights):
+            for lift in LIFTS:
+                weight, reps = row[f"{lift}_weight_kg"], row[f"{lift}_reps_count"]
+                if weight is None and reps is None:
+                    continue
+                history["user_ids"].append(row["user_id"])
+                history["recorded_at"].append(now)
+                history["lifts"].append(lift)
+                history["weight"].append(weight)
+                history["reps"].append(reps)
+                history["bodyweight"].append(bodyweight)
+        append_entries(connection, entry_rows(**history), new_users=True)
+        mark_changed(db, STRENGTH_VERSION)
+
+    for table, rows in ((_GENETICS, genetics), (_DUMBBELLS, dumbbells), (_GYM, gym), (_CARDIO, cardio)):
+        if rows:
+            connection.execute(insert(table), rows)
+
+
+def _database_detail(error: Exception) -> str:
+    return f"Database error: {getattr(error, 'orig', None) or error}"
+
+
+def import_batch(db: Session, lines: List[Line]) -> Tuple[int, List[ImportRowError]]:
+    """
+    Validate and insert one batch of lines; returns (clients imported, row errors)
+    """
+    clients, errors = _parse(lines)
+    if clients:
+        clients, rejected = _reject_existing(db, clients)
+        errors += rejected
+
+    imported = []
+    if clients:
+        try:
+            _insert_clients(db, [client for _, client in clients])
+            db.commit()
+            imported = clients
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.warning("Import batch of %d clients failed, retrying row by row: %s", len(clients), _database_detail(e))
+            for number, client in clients:
+                try:
+                    _insert_clients(db, [client])
+                    db.commit()
+                    imported.append((number, client))
+                except SQLAlchemyError as row_error:
+                    db.rollback()
+                    errors.append(ImportRowError(line=number, email=client.user.email, detail=_database_detail(row_error)))
+
+    for _, client in imported:
+        invalidate_user(client.user.email)
+    errors.sort(key=lambda error: error.line)
+    return len(imported), errors
+
+
+async def import_clients(db: DbSession, chunks: AsyncIterator[bytes], batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """
+    Import a streamed NDJSON body batch by batch; each batch commits on its own
+    """
+    report = ImportReport(lines=0, imported=0, failed=0, errors=[])
+
+    async def flush(lines: List[Line]) -> None:
+        imported, errors = await db.run_sync(import_batch, lines)
+        report.imported += imported
+        report.failed += len(errors)
+        report.errors += errors[:IMPORT_MAX_ERRORS - len(report.errors)]
+
+    lines: List[Line] = []
+    async for line in ndjson_lines(chunks):
+        report.lines += 1
+        lines.append(line)
+        if len(lines) >= batch_size:
+            await flush(lines)
+            lines = []
+    if lines:
+        await flush(lines)
+
+    logger.info("Imported %d of %d clients (%d failed)", report.imported, report.lines, report.failed)
+    return report
\ No newline at end of file
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with an optional time-to-live per entry
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                # Expired entries count as misses and are dropped eagerly
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class LocalCacheBackend:
+    """
+    In-process backend for DocumentCache
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, etag: str, body: bytes) -> None:
+        self._cache.set(key, (etag, body))
+
+    async def delete(self, key: str) -> None:
+        self._cache.invalidate(key)
+
+    def stats(self) -> dict:
+        return {"backend": "local", **self._cache.stats()}
+
+
+class RedisCacheBackend:
+    """
+    Shared backend for DocumentCache, so every worker sees the same documents.
+    Size is bounded by the Redis maxmemory policy plus the per-key TTL.
+    """
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefix: str = "cache:"):
+        import redis.asyncio as redis  # optional dependency
+
+        self._client = redis.from_url(url)
+        self.ttl = int(ttl) if ttl else None
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        raw = await self._client.get(self.prefix + key)
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return etag.decode("utf-8"), body
+
+    async def set(self, key: str, etag: str, body: bytes) -> None:
+        await self._client.set(self.prefix + key, etag.encode("utf-8") + b"\n" + body, ex=self.ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "prefix": self.prefix, "ttl": self.ttl}
+
+
+class DocumentCache:
+    """
+    Cache of serialized response documents, each stored with the ETag it was built for.
+
+    get() only returns a document whose ETag matches the current one, so a stale entry
+    (e.g. written by another worker, or raced by a concurrent write) is never served.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.writes = 0
+        self.invalidations = 0
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def get(self, key: str, etag: str) -> Optional[bytes]:
+        entry = await self.backend.get(key)
+        if entry is None:
+            self._count("misses")
+            return None
+
+        cached_etag, body = entry
+        if cached_etag != etag:
+            self._count("stale")
+            return None
+
+        self._count("hits")
+        return body
+
+    async def set(self, key: str, etag: str, body: bytes) -> None:
+        self._count("writes")
+        await self.backend.set(key, etag, body)
+
+    async def invalidate(self, key: str) -> None:
+        self._count("invalidations")
+        await self.backend.delete(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "writes": self.writes,
+                "invalidations": self.invalidations,
+            }
+        return {**counters, **self.backend.stats()}
+
+
+def build_cache_backend(url: Optional[str], maxsize: int, ttl: Optional[float], prefix: str):
+    """
+    Redis backend when a redis:// URL is configured, otherwise the in-process one
+    """
+    if url:
+        return RedisCacheBackend(url, ttl=ttl, prefix=prefix)
+    return LocalCacheBackend(maxsize=maxsize, ttl=ttl)
@@ -0,0 +1,31 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment
+    """
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    """
+    Read a float setting from the environment
+    """
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean setting from the environment ("1", "true", "yes" and "on" are true)
+    """
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
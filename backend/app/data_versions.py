@@ -0,0 +1,96 @@
+"""
+Versions of data sets that in-process caches are derived from.
+
+A writer marks a named version as changed on its Session; once the transaction
+commits, the version is bumped once, in a short transaction of its own, however
+many rows the write touched. Write transactions therefore never hold the lock on
+the shared version row, and a reader compares the stored version (one
+primary-key lookup) with the one its cached result was built from. Unlike a TTL
+this also sees writes made by other workers; a reader may briefly see the old
+version just after a commit, never a new version with old data.
+
+Each intake form also carries its own version, bumped with every write to the
+form or its sections; its ETag and cached document are derived from it.
+"""
+import logging
+
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.models import intake_models
+
+logger = logging.getLogger(__name__)
+
+_VERSIONS = intake_models.DataVersion.__table__
+_FORMS = intake_models.IntakeForm.__table__
+
+
+def bump_version(connection, name: str) -> None:
+    """
+    Mark the data set as changed (atomic version = version + 1)
+    """
+    result = connection.execute(
+        update(_VERSIONS).where(_VERSIONS.c.name == name).values(version=_VERSIONS.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_VERSIONS).values(name=name, version=1))
+
+
+def mark_changed(session: Session, name: str) -> None:
+    """
+    Bump the data set's version once the session's transaction commits
+    """
+    session.info.setdefault("changed_data_versions", set()).add(name)
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_committed_versions(session):
+    # The session's connection is still checked out here; the bump waits for
+    # after_transaction_end so it never needs a second connection at once
+    changed = session.info.pop("changed_data_versions", None)
+    if changed:
+        session.info.setdefault("committed_data_versions", set()).update(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_versions(session):
+    session.info.pop("changed_data_versions", None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _bump_committed_versions(session, transaction):
+    if transaction.parent is not None:
+        return
+    committed = session.info.pop("committed_data_versions", None)
+    if not committed:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            for name in sorted(committed):
+                bump_version(connection, name)
+    except Exception:
+        # The write is committed; caches see it with the next successful bump
+        logger.exception("Bumping data versions %s failed", ", ".join(sorted(committed)))
+
+
+def read_version(connection, name: str) -> int:
+    return connection.execute(select(_VERSIONS.c.version).where(_VERSIONS.c.name == name)).scalar() or 0
+
+
+def touch_intake_form(intake_form: intake_models.IntakeForm) -> None:
+    """
+    Stage a change to an intake form: bump its version and last_updated
+    """
+    # A new form is inserted with the column default; the expression needs a row
+    if inspect(intake_form).has_identity:
+        intake_form.version = intake_models.IntakeForm.version + 1
+    intake_form.last_updated = func.now()
+
+
+def bump_form_version(connection, user_id: str) -> None:
+    """
+    Mark a user's intake form as changed by a write that does not load it
+    (atomic version = version + 1; no-op when the user has no intake form)
+    """
+    connection.execute(update(_FORMS).where(_FORMS.c.user_id == user_id).values(version=_FORMS.c.version + 1))
\ No newline at end of file
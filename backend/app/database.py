@@ -1,9 +1,15 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.config import env_bool, env_float, env_int
+from app.pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_pool
+from app.profiler import SQL_PROFILE, instrument_engine
+
 # Load environment variables
 load_dotenv()
 
@@ -14,19 +20,115 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable not set")
 
-# Create SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# "sync" runs the ORM on threadpool threads, "async" on an async driver
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+if DATABASE_MODE not in ("sync", "async"):
+    raise ValueError(f"Unsupported DATABASE_MODE: {DATABASE_MODE}")
+
+# Async drivers substituted for the sync ones when DATABASE_MODE=async
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Rewrite a sync database URL to use the matching async driver
+    """
+    scheme, separator, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+# Connection pool settings
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+
+
+def engine_options(url: str, is_async: bool) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine
+    """
+    options = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    # SQLite keeps SQLAlchemy's default pool, which does not take sizing options
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+# Create SQLAlchemy engine and SessionLocal class
+if DATABASE_MODE == "async":
+    engine = create_async_engine(
+        to_async_url(SQLALCHEMY_DATABASE_URL),
+        **engine_options(SQLALCHEMY_DATABASE_URL, is_async=True)
+    )
+    SessionLocal = async_sessionmaker(autoflush=False, bind=engine)
+else:
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        **engine_options(SQLALCHEMY_DATABASE_URL, is_async=False)
+    )
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Record checkouts, wait time, overflow and invalidations for /internal/pool
+instrument_pool(engine)
+
+# Opt-in per-request statement counts, N+1 detection and slow-query log
+if SQL_PROFILE:
+    instrument_engine(engine)
 
 # Create Base class
 Base = declarative_base()
 
+
+class DbSession:
+    """
+    Request-scoped wrapper over a Session or AsyncSession.
+
+    Routers keep their ORM code synchronous and hand it to run_sync: in sync mode
+    it runs on the threadpool, in async mode it runs on the async driver through
+    AsyncSession.run_sync, so no thread is held while waiting on the database.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def is_async(self) -> bool:
+        return isinstance(self.session, AsyncSession)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """
+        Call fn(session, *args, **kwargs) without blocking the event loop
+        """
+        if self.is_async:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self):
+        if self.is_async:
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+async def get_db():
+    db = DbSession(SessionLocal())
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
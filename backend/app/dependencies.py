@@ -0,0 +1,135 @@
+import os
+from typing import Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.cache import DocumentCache, LRUCache, build_cache_backend
+from app.config import env_float, env_int
+from app.database import DbSession, get_db
+from app.models import intake_models, user_models
+
+# email -> user_id. The mapping only changes when a user is created or deleted,
+# so entries are invalidated once those changes commit and the TTL is a backstop.
+user_id_cache = LRUCache(
+    maxsize=env_int("USER_CACHE_SIZE", 10000),
+    ttl=env_float("USER_CACHE_TTL", 300),
+)
+
+# user_id -> serialized IntakeFormResponse. Entries carry the ETag they were built
+# for and are only served when it still matches, so local caches in different
+# workers cannot serve stale documents.
+intake_form_cache = DocumentCache(build_cache_backend(
+    os.getenv("INTAKE_CACHE_URL"),
+    maxsize=env_int("INTAKE_CACHE_SIZE", 2000),
+    ttl=env_float("INTAKE_CACHE_TTL", 600),
+    prefix="intake_form:",
+))
+
+
+def normalize_email(email: str) -> str:
+    """
+    The form emails are stored, queried and cached in
+    """
+    return email.strip().lower()
+
+
+def invalidate_user(email: str) -> None:
+    """
+    Drop a cached email -> user_id mapping
+    """
+    user_id_cache.invalidate(normalize_email(email))
+
+
+def _lookup_user_id(db: Session, email: str) -> Optional[str]:
+    row = db.query(user_models.User.user_id).filter(user_models.User.email == email).first()
+    return row.user_id if row else None
+
+
+async def get_user_id(email: str, db: DbSession = Depends(get_db)) -> str:
+    """
+    Resolve a user's email to their user_id, querying the database only on a cache miss
+    """
+    key = normalize_email(email)
+    user_id = user_id_cache.get(key)
+    if user_id is None:
+        user_id = await db.run_sync(_lookup_user_id, key)
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        user_id_cache.set(key, user_id)
+
+    return user_id
+
+
+class IntakeFormResolver:
+    """
+    Dependency returning (user, intake_form) for an email with a single joined query
+
+    required: raise 404 when the user has no intake form
+    create: add a new, uncommitted intake form to the session when the user has none
+    """
+
+    def __init__(self, required: bool = True, create: bool = False):
+        self.required = required
+        self.create = create
+
+    async def __call__(
+        self, email: str, db: DbSession = Depends(get_db)
+    ) -> Tuple[user_models.User, Optional[intake_models.IntakeForm]]:
+        return await db.run_sync(self.resolve, email)
+
+    def resolve(
+        self, db: Session, email: str
+    ) -> Tuple[user_models.User, Optional[intake_models.IntakeForm]]:
+        email = normalize_email(email)
+        row = db.query(user_models.User, intake_models.IntakeForm).outerjoin(
+            intake_models.IntakeForm,
+            intake_models.IntakeForm.user_id == user_models.User.user_id
+        ).filter(
+            user_models.User.email == email
+        ).first()
+
+        if not row:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        user, intake_form = row
+        user_id_cache.set(email, user.user_id)
+
+        if intake_form is None:
+            if self.create:
+                intake_form = intake_models.IntakeForm(
+                    user_id=user.user_id,
+                    email=email
+                )
+                db.add(intake_form)
+            elif self.required:
+                raise HTTPException(status_code=404, detail="Intake form not found")
+
+        return user, intake_form
+
+
+require_intake_form = IntakeFormResolver()
+get_or_create_intake_form = IntakeFormResolver(create=True)
+get_optional_intake_form = IntakeFormResolver(required=False)
+
+
+@event.listens_for(user_models.User, "after_insert")
+@event.listens_for(user_models.User, "after_delete")
+def _collect_changed_user(mapper, connection, target):
+    # Invalidating here would let a concurrent lookup re-cache the old mapping
+    # before this transaction commits, so only note the email until then
+    session = object_session(target)
+    if target.email and session is not None:
+        session.info.setdefault("changed_user_emails", set()).add(target.email)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for email in session.info.pop("changed_user_emails", ()):
+        invalidate_user(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_emails", None)
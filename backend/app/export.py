@@ -0,0 +1,216 @@
+"""
+Streaming export of intake data, one row per client.
+
+users ⨝ intake_forms is read in EXPORT_BATCH_SIZE batches in form_id order, each
+batch starting after the last form_id of the previous one. For each batch the
+clients' strength measurements, genetics, dumbbell info and equipment lists are
+fetched with one IN query per table, and the batch is encoded (and optionally
+gzipped) and sent before the next one is read, so memory use depends on the
+batch size, not on the number of clients.
+
+A batch is read, encoded and compressed in one call on one session, whose
+connection goes back to the pool between batches: an export holds no
+connection while it waits for a slow client to take the previous chunk. Each
+batch is read in its own transaction, so a client changed during a long export
+is exported as it was when its batch was read.
+"""
+import csv
+import io
+import zlib
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import Boolean, Date, DateTime, select
+from sqlalchemy.orm import Session
+
+from app.config import env_int
+from app.database import DbSession, SessionLocal
+from app.models import intake_models, user_models
+
+EXPORT_BATCH_SIZE = env_int("EXPORT_BATCH_SIZE", 1000)
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+_USERS = user_models.User.__table__
+_FORMS = intake_models.IntakeForm.__table__
+
+_USER_COLUMNS = list(_USERS.columns)
+# The form repeats some user columns; the users table is the source of truth.
+# version is the form's internal change counter.
+_FORM_COLUMNS = [column for column in _FORMS.columns if column.name not in _USERS.columns and column.name != "version"]
+
+# One-to-one sections, exported as <prefix>_<column>; a user's latest row wins
+_SECTIONS = [
+    ("strength", intake_models.StrengthMeasurement.__table__),
+    ("genetics", intake_models.Genetics.__table__),
+    ("dumbbell", intake_models.DumbbellInfo.__table__),
+]
+# One-to-many equipment tables, exported as lists of equipment_type
+_LISTS = [
+    ("gym_equipment", intake_models.GymEquipment.__table__),
+    ("cardio_equipment", intake_models.CardioEquipment.__table__),
+]
+
+
+def _section_columns(table) -> list:
+    return [column for column in table.columns if not column.primary_key and column.name not in ("form_id", "user_id")]
+
+
+def _prefixed(prefix: str, name: str) -> str:
+    return name if name.startswith(f"{prefix}_") else f"{prefix}_{name}"
+
+
+COLUMNS = (
+    [column.name for column in _USER_COLUMNS]
+    + [column.name for column in _FORM_COLUMNS]
+    + [_prefixed(prefix, column.name) for prefix, table in _SECTIONS for column in _section_columns(table)]
+    + [name for name, _ in _LISTS]
+)
+
+
+def export_query():
+    """
+    The exported users ⨝ intake_forms select, in form_id order; filters are added by the caller
+    """
+    return (
+        select(*_USER_COLUMNS, *_FORM_COLUMNS)
+        .select_from(_USERS.join(_FORMS, _FORMS.c.user_id == _USERS.c.user_id))
+        .order_by(_FORMS.c.form_id)
+    )
+
+
+def _values(db: Session, rows: list) -> List[list]:
+    """
+    Complete a batch of users ⨝ intake_forms rows with their sections and
+    equipment; returns one list of values per client, in COLUMNS order
+    """
+    user_ids = [row.user_id for row in rows]
+
+    sections = []
+    for prefix, table in _SECTIONS:
+        columns = _section_columns(table)
+        primary_key = list(table.primary_key.columns)[0]
+        # Ordered by key so a user's latest row is the one kept
+        by_user = {
+            row[0]: row[1:]
+            for row in db.execute(
+                select(table.c.user_id, *columns).where(table.c.user_id.in_(user_ids)).order_by(primary_key)
+            )
+        }
+        sections.append((by_user, (None,) * len(columns)))
+
+    lists = []
+    for name, table in _LISTS:
+        by_user = {}
+        for user_id, equipment_type in db.execute(
+            select(table.c.user_id, table.c.equipment_type)
+            .where(table.c.user_id.in_(user_ids))
+            .order_by(table.c.equipment_id)
+        ):
+            by_user.setdefault(user_id, []).append(equipment_type)
+        lists.append(by_user)
+
+    batch = []
+    for row in rows:
+        values = list(row)
+        for by_user, missing in sections:
+            values.extend(by_user.get(row.user_id, missing))
+        for by_user in lists:
+            values.append(by_user.get(row.user_id, []))
+        batch.append(values)
+    return batch
+
+
+# CSV cells: None is written empty by the csv module; these columns need converting
+_ALL_COLUMNS = (
+    _USER_COLUMNS + _FORM_COLUMNS
+    + [column for _, table in _SECTIONS for column in _section_columns(table)]
+)
+_BOOLEANS = {True: "true", False: "false", None: ""}
+_BOOLEAN_INDEXES = [i for i, column in enumerate(_ALL_COLUMNS) if isinstance(column.type, Boolean)]
+_TIMESTAMP_INDEXES = [i for i, column in enumerate(_ALL_COLUMNS) if isinstance(column.type, (DateTime, Date))]
+_LIST_INDEXES = list(range(len(_ALL_COLUMNS), len(COLUMNS)))
+
+
+def _encode_csv(batch: List[list]) -> bytes:
+    for values in batch:
+        for i in _BOOLEAN_INDEXES:
+            values[i] = _BOOLEANS[values[i]]
+        for i in _TIMESTAMP_INDEXES:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        for i in _LIST_INDEXES:
+            values[i] = ";".join(values[i])
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(batch)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(batch: List[list]) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(COLUMNS, values))) + b"\n" for values in batch)
+
+
+_ENCODERS: Dict[str, Callable[[List[list]], bytes]] = {"csv": _encode_csv, "ndjson": _encode_ndjson}
+
+
+def _header(fmt: str) -> bytes:
+    if fmt != "csv":
+        return b""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(COLUMNS)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _export_batch(db: Session, query, after: Optional[int], batch_size: int,
+                  encode: Callable[[List[list]], bytes], output: Callable[[bytes], bytes]) -> Tuple[bytes, Optional[int]]:
+    """
+    Read, complete, encode and compress the batch after form_id after; returns
+    the output and the last form_id (None when there are no rows left)
+    """
+    if after is not None:
+        query = query.where(_FORMS.c.form_id > after)
+    try:
+        rows = db.execute(query.limit(batch_size)).all()
+        if not rows:
+            return b"", None
+        data = output(encode(_values(db, rows)))
+    finally:
+        # Return the connection to the pool until the next batch
+        db.rollback()
+    return data, rows[-1].form_id
+
+
+async def stream_export(query, fmt: str, compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encoded export chunks, one per batch, gzipped on the fly when compress is set.
+
+    Opens its own session, which is closed when the stream ends or the client
+    disconnects, so it can outlive the request handler.
+    """
+    encode = _ENCODERS[fmt]
+    # wbits=31 writes a gzip container rather than a raw zlib stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def output(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor is not None else data
+
+    db = DbSession(SessionLocal())
+    try:
+        chunk = output(_header(fmt))
+        after = None
+        while True:
+            # Lookups, encoding and compression run together, off the event loop in sync mode
+            data, after = await db.run_sync(_export_batch, query, after, batch_size, encode, output)
+            if after is None:
+                break
+            chunk += data
+            # Compressed output may lag the input; only send non-empty chunks
+            if chunk:
+                yield chunk
+                chunk = b""
+        if compressor is not None:
+            chunk += compressor.flush()
+        if chunk:
+            yield chunk
+    finally:
+        await db.close()
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""
+Onboarding funnel counters.
+
+intake_funnel_counters holds one row per (metric, bucket): the number of intake
+forms, how many have each *_completed flag set, and how many have each
+activity/stress/dedication level. Mapper events work out which buckets a write
+changes, so the analytics endpoint reads a few dozen rows instead of grouping
+the whole intake_forms table.
+
+The deltas are collected on the Session and applied once its transaction has
+committed, in a short transaction of their own (like app.data_versions), so
+concurrent intake writes never wait on each other for the shared counter rows.
+An update or delete computes its deltas from the stored row rather than the
+session's copy, which another transaction may have changed since it was loaded.
+Without a row lock two overlapping updates can still both subtract the same old
+value, a delta is lost if its transaction fails after the write committed, and
+writes that bypass the ORM (manual SQL) are not seen at all, so the counters
+are only eventually consistent: every FUNNEL_REBUILD_INTERVAL seconds
+rebuild_periodically() recomputes them from intake_forms, which bounds how long
+any drift lasts. Bulk inserts of new forms pass their rows to
+count_inserted_forms(); POST /internal/funnel/rebuild recomputes the counters on
+demand.
+"""
+import asyncio
+import logging
+from collections import Counter
+from enum import Enum
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.orm import Session, object_session
+
+from app.config import env_float
+from app.models import intake_models
+from app.models.schemas import FunnelReport, FunnelStage
+
+logger = logging.getLogger(__name__)
+
+_FORMS = intake_models.IntakeForm.__table__
+_COUNTERS = intake_models.FunnelCounter.__table__
+
+# Section flags in form order, which is the order the funnel is reported in
+COMPLETION_STAGES = [column.name for column in _FORMS.columns if column.name.endswith("_completed")]
+DISTRIBUTIONS = ["activity_level", "stress_level", "dedication_level"]
+TRACKED = COMPLETION_STAGES + DISTRIBUTIONS
+
+TOTAL = ("forms", "total")
+
+# Seconds between full recomputes of the counters; 0 turns them off
+FUNNEL_REBUILD_INTERVAL = env_float("FUNNEL_REBUILD_INTERVAL", 3600)
+
+Bucket = Tuple[str, str]
+
+
+def _attribute_buckets(name: str, value) -> List[Bucket]:
+    """
+    Counter buckets one attribute value falls into
+    """
+    if name in DISTRIBUTIONS:
+        if value is None:
+            return []
+        # Writes may carry the schema's str Enum members rather than plain strings
+        return [(name, value.value if isinstance(value, Enum) else str(value))]
+    return [("completed", name)] if value else []
+
+
+def _form_buckets(values: Dict[str, object]) -> Counter:
+    buckets = Counter([TOTAL])
+    for name in TRACKED:
+        buckets.update(_attribute_buckets(name, values.get(name)))
+    return buckets
+
+
+def _stored_values(connection, form_id: int, names: Iterable[str]) -> Dict[str, object]:
+    """
+    Current database values of some intake form columns, before this flush writes them
+    """
+    names = list(names)
+    row = connection.execute(
+        select(*(_FORMS.c[name] for name in names)).where(_FORMS.c.form_id == form_id)
+    ).first()
+    return dict(zip(names, row)) if row else {}
+
+
+def apply_deltas(connection, deltas: Counter) -> None:
+    """
+    Add deltas to the counters with atomic count = count + n updates
+    """
+    for (metric, bucket), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        result = connection.execute(
+            update(_COUNTERS)
+            .where(_COUNTERS.c.metric == metric, _COUNTERS.c.bucket == bucket)
+            .values(count=_COUNTERS.c.count + delta)
+        )
+        # Every known bucket is created by rebuild_counters; only values outside
+        # the enums (which SQLite does not enforce) can be missing
+        if result.rowcount == 0:
+            connection.execute(insert(_COUNTERS).values(metric=metric, bucket=bucket, count=delta))
+
+
+def stage_deltas(session: Session, deltas: Counter) -> None:
+    """
+    Apply deltas to the counters once the session's transaction commits
+    """
+    session.info.setdefault("funnel_deltas", Counter()).update(deltas)
+
+
+def count_inserted_forms(session: Session, rows: Iterable[Dict[str, object]]) -> None:
+    """
+    Add intake forms inserted outside the ORM to the counters, given their column values
+    """
+    deltas = Counter()
+    for values in rows:
+        deltas.update(_form_buckets(values))
+    stage_deltas(session, deltas)
+
+
+@event.listens_for(intake_models.IntakeForm, "after_insert")
+def _count_inserted_form(mapper, connection, target):
+    # Column defaults are populated by now; anything not in the dict was never set
+    stage_deltas(object_session(target), _form_buckets(inspect(target).dict))
+
+
+@event.listens_for(intake_models.IntakeForm, "before_update")
+def _count_updated_form(mapper, connection, target):
+    state = inspect(target)
+    new = {}
+    for name in TRACKED:
+        history = state.attrs[name].history
+        if history.added:
+            new[name] = history.added[0]
+    if not new:
+        return
+
+    # Not the attribute history: the value this session loaded may have been
+    # changed by another transaction since
+    old = _stored_values(connection, target.form_id, new)
+
+    deltas = Counter()
+    for name, value in new.items():
+        deltas.update(_attribute_buckets(name, value))
+        deltas.subtract(_attribute_buckets(name, old.get(name)))
+    stage_deltas(object_session(target), deltas)
+
+
+@event.listens_for(intake_models.IntakeForm, "before_delete")
+def _count_deleted_form(mapper, connection, target):
+    deltas = Counter()
+    deltas.subtract(_form_buckets(_stored_values(connection, target.form_id, TRACKED)))
+    stage_deltas(object_session(target), deltas)
+
+
+@event.listens_for(Session, "after_commit")
+def _collect_committed_deltas(session):
+    # Applied in after_transaction_end, once the session's connection is released
+    staged = session.info.pop("funnel_deltas", None)
+    if staged:
+        session.info.setdefault("committed_funnel_deltas", Counter()).update(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_deltas(session):
+    session.info.pop("funnel_deltas", None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _apply_committed_deltas(session, transaction):
+    if transaction.parent is not None:
+        return
+    committed = session.info.pop("committed_funnel_deltas", None)
+    if not committed:
+        return
+    try:
+        with session.get_bind().begin() as connection:
+            apply_deltas(connection, committed)
+    except Exception:
+        # The write is committed; the next periodic rebuild counts it
+        logger.exception("Applying funnel counter deltas failed")
+
+
+def _known_buckets() -> List[Bucket]:
+    buckets = [TOTAL] + [("completed", stage) for stage in COMPLETION_STAGES]
+    for name in DISTRIBUTIONS:
+        buckets += [(name, value) for value in _FORMS.c[name].type.enums]
+    return buckets
+
+
+def rebuild_counters(conn) -> int:
+    """
+    Recompute every counter from intake_forms with a full scan; returns the form count.
+
+    Runs in the caller's transaction (the migration, or /internal/funnel/rebuild).
+    """
+    counts = Counter({bucket: 0 for bucket in _known_buckets()})
+
+    totals = conn.execute(select(
+        func.count(),
+        *(func.coalesce(func.sum(case((_FORMS.c[stage], 1), else_=0)), 0) for stage in COMPLETION_STAGES),
+    )).one()
+    counts[TOTAL] = totals[0]
+    for stage, completed in zip(COMPLETION_STAGES, totals[1:]):
+        counts[("completed", stage)] = completed
+
+    for name in DISTRIBUTIONS:
+        column = _FORMS.c[name]
+        for value, count in conn.execute(select(column, func.count()).where(column.is_not(None)).group_by(column)):
+            counts[(name, str(value))] = count
+
+    conn.execute(delete(_COUNTERS))
+    conn.execute(insert(_COUNTERS), [
+        {"metric": metric, "bucket": bucket, "count": count} for (metric, bucket), count in counts.items()
+    ])
+    logger.info("Rebuilt funnel counters for %d intake forms", counts[TOTAL])
+    return counts[TOTAL]
+
+
+def _rebuild_and_commit(conn) -> int:
+    forms = rebuild_counters(conn)
+    conn.commit()
+    return forms
+
+
+async def rebuild_periodically(engine, interval: float = FUNNEL_REBUILD_INTERVAL) -> None:
+    """
+    Recompute the counters every interval seconds until cancelled, correcting any
+    drift the per-write deltas missed
+    """
+    from app.migrations import run_migrations
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_migrations(engine, _rebuild_and_commit)
+        except Exception:
+            logger.exception("Rebuilding the funnel counters failed")
+
+
+def funnel_report(db) -> FunnelReport:
+    """
+    Funnel and distributions from the counters table (one small query)
+    """
+    counts = {
+        (metric, bucket): count
+        for metric, bucket, count in db.execute(select(_COUNTERS.c.metric, _COUNTERS.c.bucket, _COUNTERS.c.count))
+    }
+    total = counts.get(TOTAL, 0)
+
+    stages = []
+    previous = total
+    for stage in COMPLETION_STAGES:
+        completed = counts.get(("completed", stage), 0)
+        stages.append(FunnelStage(
+            stage=stage,
+            completed=completed,
+            completion_rate=round(completed / total, 4) if total else 0.0,
+            drop_off=previous - completed,
+        ))
+        previous = completed
+
+    distributions = {
+        name: {bucket: count for (metric, bucket), count in counts.items() if metric == name}
+        for name in DISTRIBUTIONS
+    }
+    return FunnelReport(total_forms=total, stages=stages, **distributions)
\ No newline at end of file
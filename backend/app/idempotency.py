@@ -0,0 +1,225 @@
+"""
+Idempotency-Key support for POST and PUT requests.
+
+A client that retries a write sends the same Idempotency-Key header with each
+attempt. The first response for a key (scoped to the method and URL) is stored,
+and later requests with the key get that response replayed without reaching the
+route, so none of its lookups or writes run again. Requests that arrive while the first one
+is still running wait for it instead of racing it.
+
+Responses are kept in a size-bounded store with a TTL (in-process, or Redis when
+IDEMPOTENCY_CACHE_URL is set). 5xx responses are not stored, so a retry after a
+server error runs again. Reusing a key for a different body is rejected with 422.
+
+Only requests declaring a JSON Content-Type (in any case) are handled: the body is read up
+front to fingerprint it, which would defeat the streaming uploads (body photos,
+NDJSON imports), and requests without a Content-Type pass through untouched. A
+body larger than IDEMPOTENCY_MAX_BODY_BYTES is rejected with 413 rather than
+buffered.
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+import orjson
+
+from app.cache import build_cache_backend
+from app.config import env_float, env_int
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+METHODS = {"POST", "PUT"}
+# Largest request body buffered for fingerprinting
+IDEMPOTENCY_MAX_BODY_BYTES = env_int("IDEMPOTENCY_MAX_BODY_BYTES", 1024 * 1024)
+
+
+class IdempotencyStore:
+    """
+    Stored responses by key, plus the requests currently running for a key
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # key -> future resolved when the request holding the key finishes
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.stored = 0
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def acquire(self, key: str) -> None:
+        """
+        Wait until no other request holds the key, then hold it
+        """
+        while key in self._in_flight:
+            self.count("waited")
+            await asyncio.shield(self._in_flight[key])
+        # No await between the check and this, so only one request can get here per key
+        self._in_flight[key] = asyncio.get_running_loop().create_future()
+
+    def release(self, key: str) -> None:
+        waiter = self._in_flight.pop(key)
+        waiter.set_result(None)
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = await self.backend.get(key)
+        if entry is None:
+            return None
+        meta, body = entry
+        return {**orjson.loads(meta), "body": body}
+
+    async def set(self, key: str, fingerprint: str, status: int, headers: list, body: bytes) -> None:
+        # Kept in the backend's (etag, body) shape; the JSON has no newlines
+        meta = orjson.dumps({
+            "fingerprint": fingerprint,
+            "status": status,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+        }).decode("utf-8")
+        await self.backend.set(key, meta, body)
+        self.count("stored")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {
+                "stored": self.stored,
+                "replayed": self.replayed,
+                "waited": self.waited,
+                "conflicts": self.conflicts,
+            }
+        return {**counters, "in_flight": len(self._in_flight), **self.backend.stats()}
+
+
+idempotency_store = IdempotencyStore(build_cache_backend(
+    os.getenv("IDEMPOTENCY_CACHE_URL"),
+    maxsize=env_int("IDEMPOTENCY_CACHE_SIZE", 5000),
+    ttl=env_float("IDEMPOTENCY_TTL", 86400),
+    prefix="idempotency:",
+))
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+async def _send_json(send, status: int, detail: str) -> None:
+    body = orjson.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware replaying stored responses for repeated Idempotency-Keys
+    """
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store, max_body_bytes: int = IDEMPOTENCY_MAX_BODY_BYTES):
+        self.app = app
+        self.store = store
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in METHODS:
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, IDEMPOTENCY_HEADER)
+        content_type = _header(scope, b"content-type")
+        if key is None or content_type is None or not content_type.lower().startswith(b"application/json"):
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        too_large = f"Request body exceeds {self.max_body_bytes} bytes"
+        content_length = _header(scope, b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_bytes:
+            await _send_json(send, 413, too_large)
+            return
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            # Content-Length may be absent (chunked) or wrong
+            if size > self.max_body_bytes:
+                await _send_json(send, 413, too_large)
+                return
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        # The query string is part of the target, e.g. POST /goals/?email=...
+        target = scope["path"] + ("?" + scope["query_string"].decode("latin-1") if scope["query_string"] else "")
+        store_key = f"{scope['method']} {target} {key.decode('latin-1')}"
+
+        await self.store.acquire(store_key)
+        try:
+            stored = await self.store.get(store_key)
+            if stored is not None:
+                await self._replay(stored, fingerprint, send)
+                return
+            await self._run(scope, receive, send, body, store_key, fingerprint)
+        finally:
+            self.store.release(store_key)
+
+    async def _replay(self, stored: dict, fingerprint: str, send) -> None:
+        if stored["fingerprint"] != fingerprint:
+            self.store.count("conflicts")
+            await _send_json(send, 422, "Idempotency-Key was already used for a different request body")
+            return
+        self.store.count("replayed")
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored["headers"]]
+        await send({
+            "type": "http.response.start",
+            "status": stored["status"],
+            "headers": headers + [(REPLAYED_HEADER, b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored["body"]})
+
+    async def _run(self, scope, receive, send, body: bytes, store_key: str, fingerprint: str) -> None:
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Only a disconnect can follow
+            return await receive()
+
+        start = None
+        response = []
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                response.append(message.get("body", b""))
+                if not message.get("more_body", False) and start["status"] < 500:
+                    await self.store.set(store_key, fingerprint, start["status"], start["headers"], b"".join(response))
+            await send(message)
+
+        await self.app(scope, receive_body, send_wrapper)
\ No newline at end of file
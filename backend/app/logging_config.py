@@ -0,0 +1,101 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Optional
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, including any fields passed through `extra=`
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock prepare() formats the record on the calling (request) thread; here
+    the record is enqueued as-is so %-interpolation and JSON encoding happen off it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_levels(spec: str) -> dict:
+    """
+    Parse "app.routers=DEBUG,sqlalchemy.engine=WARNING" into {logger: level}
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging():
+    """
+    Route the app's logging through a queue so handler I/O runs on a background thread.
+
+    LOG_LEVEL   default level for the "app" loggers (INFO, so debug dumps are off)
+    LOG_LEVELS  per-module overrides, e.g. "app.routers.intake_forms=DEBUG"
+    LOG_FORMAT  "json" (default) or "text"
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    # Everything that reaches the root logger goes through the queue; the root
+    # stays at WARNING so third-party libraries only log what LOG_LEVELS asks for
+    root_logger = logging.getLogger()
+    root_logger.addHandler(DeferredQueueHandler(log_queue))
+    root_logger.setLevel(logging.WARNING)
+    logging.getLogger("app").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    for name, level in parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
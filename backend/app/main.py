@@ -1,37 +1,104 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
-from app.database import engine
-from app.models import user_models, intake_models
-from app.routers import users, goals, intake_forms, address
-
-# Create tables
-user_models.Base.metadata.create_all(bind=engine)
-intake_models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Cymron API",
-    description="API for Cymron fitness app",
-    version="1.0.0"
-)
-
-# Set up CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(users.router)
-app.include_router(goals.router)
-app.include_router(intake_forms.router)
-app.include_router(address.router)
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+# Imported first so the startup clock includes everything below
+from app.startup import startup_report, warm_up
+
+with startup_report.phase("import fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import ORJSONResponse
+    from fastapi.staticfiles import StaticFiles
+
+with startup_report.phase("configure logging"):
+    from app.logging_config import configure_logging, shutdown_logging
+
+    # Send logs through a background queue before anything else starts logging
+    configure_logging()
+    logger = logging.getLogger(__name__)
+
+# Builds the engine; no connection is opened until the warm-up task or a request needs one
+database = startup_report.import_module("app.database")
+startup_report.import_module("app.models.user_models")
+startup_report.import_module("app.models.intake_models")
+# Registers the write hooks that keep the numeric measurement columns in sync
+startup_report.import_module("app.units")
+
+with startup_report.phase("import middleware"):
+    from app.config import env_bool
+    from app.funnel import FUNNEL_REBUILD_INTERVAL, rebuild_periodically
+    from app.idempotency import IdempotencyMiddleware
+    from app.metrics import MetricsMiddleware
+    from app.photos import PHOTO_STORAGE_DIR, PHOTO_URL_PREFIX, photo_processor
+    from app.profiler import SQL_PROFILE, QueryProfilerMiddleware
+
+ROUTERS = ["users", "goals", "intake_forms", "address", "clients", "analytics", "internal", "metrics"]
+router_modules = [startup_report.import_module(f"app.routers.{name}") for name in ROUTERS]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect, check migrations and warm the pool in the background: the server starts
+    # accepting requests immediately and /internal/ready reports when the pool is warm
+    warm_up_task = asyncio.create_task(warm_up(database.engine))
+    # Bounds any drift of the funnel counters (see app.funnel)
+    rebuild_task = asyncio.create_task(rebuild_periodically(database.engine)) if FUNNEL_REBUILD_INTERVAL > 0 else None
+    try:
+        yield
+    finally:
+        warm_up_task.cancel()
+        if rebuild_task is not None:
+            rebuild_task.cancel()
+        # Abandon photo variant jobs still running; re-uploading a photo retries them
+        await photo_processor.shutdown()
+        if database.DATABASE_MODE == "async":
+            await database.engine.dispose()
+        else:
+            database.engine.dispose()
+        # Flush any queued log records
+        shutdown_logging()
+
+with startup_report.phase("build app"):
+    app = FastAPI(
+        title="Cymron API",
+        description="API for Cymron fitness app",
+        version="1.0.0",
+        lifespan=lifespan,
+        # Routes returning plain dicts are encoded with orjson; response models
+        # are serialized by pydantic directly (see app.responses)
+        default_response_class=ORJSONResponse,
+    )
+
+    # Replays stored responses for retried POST/PUT requests carrying an
+    # Idempotency-Key; added first so replays still pass through CORS
+    app.add_middleware(IdempotencyMiddleware)
+
+    # Set up CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify exact origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Per-route request counts and latency histograms, served at /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Per-request SQL statement counts and timings (SQL_PROFILE=1)
+    if SQL_PROFILE:
+        app.add_middleware(QueryProfilerMiddleware)
+
+    # Include routers
+    for module in router_modules:
+        app.include_router(module.router)
+
+    # Uploaded body photos and their variants, unless a web server or CDN serves them
+    if env_bool("PHOTO_SERVE_LOCAL", True):
+        app.mount(PHOTO_URL_PREFIX, StaticFiles(directory=PHOTO_STORAGE_DIR, check_dir=False), name="photos")
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to Cymron API"}
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, Tuple
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+# Label used for requests that did not match any route, so 404 scans cannot
+# create one series per raw path
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_float(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class RequestMetrics:
+    """
+    Request counters, in-flight gauge and latency histograms keyed by route template.
+
+    Updates are a couple of dict lookups under one lock; bucket counts are stored
+    per bucket and only made cumulative when rendered for a scrape.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._in_progress: Dict[str, int] = {}
+        # (method, route) -> [per-bucket counts..., +Inf count, sum]
+        self._durations: Dict[Tuple[str, str], list] = {}
+
+    def started(self, method: str) -> None:
+        with self._lock:
+            self._in_progress[method] = self._in_progress.get(method, 0) + 1
+
+    def finished(self, method: str, route: str, status: int, duration: float) -> None:
+        index = bisect_left(self.buckets, duration)
+        with self._lock:
+            self._in_progress[method] -= 1
+
+            key = (method, route, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            histogram = self._durations.get((method, route))
+            if histogram is None:
+                histogram = self._durations[(method, route)] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += duration
+
+    def render(self) -> str:
+        """
+        Current values in the Prometheus text exposition format (version 0.0.4)
+        """
+        with self._lock:
+            requests = dict(self._requests)
+            in_progress = dict(self._in_progress)
+            durations = {key: list(value) for key, value in self._durations.items()}
+
+        lines = [
+            "# HELP http_requests_total Total HTTP requests by method, route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for key, count in sorted(requests.items()):
+            lines.append(f"http_requests_total{_labels(('method', 'route', 'status'), key)} {count}")
+
+        lines += [
+            "# HELP http_requests_in_progress HTTP requests currently being served.",
+            "# TYPE http_requests_in_progress gauge",
+        ]
+        for method, count in sorted(in_progress.items()):
+            lines.append(f"http_requests_in_progress{_labels(('method',), (method,))} {count}")
+
+        lines += [
+            "# HELP http_request_duration_seconds HTTP request latency by method and route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        names = ("method", "route")
+        for key, histogram in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram[:-1]):
+                cumulative += count
+                le = f'le="{_format_float(bound)}"'
+                lines.append(f"http_request_duration_seconds_bucket{_labels(names, key, le)} {cumulative}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(names, key)} {_format_float(histogram[-1])}")
+            lines.append(f"http_request_duration_seconds_count{_labels(names, key)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead) that feeds RequestMetrics.
+
+    The route template comes from scope["route"], which FastAPI sets on the shared
+    scope once routing has matched, so /intake/{email} is one series, not one per user.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.started(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.metrics.finished(
+                method,
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status,
+                time.perf_counter() - start,
+            )
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Versioned schema migrations.
+
+Each module in app/migrations/versions is named m<version>_<slug>.py and defines a
+`description` and an `upgrade(conn)` that receives a sync Connection. Applied versions
+are recorded in the schema_migrations table; run pending ones with
+
+    python -m app.migrations upgrade
+"""
+import importlib
+import logging
+import pkgutil
+from dataclasses import dataclass
+from typing import Callable, List
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, Integer, MetaData, String, Table, TIMESTAMP, insert, select
+from sqlalchemy.sql import func
+
+from app.migrations import versions
+
+logger = logging.getLogger(__name__)
+
+# Kept off the models' metadata so create_all in a migration never touches it
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String(255)),
+    Column("applied_at", TIMESTAMP, server_default=func.now()),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    description: str
+    upgrade: Callable
+
+
+def load_migrations() -> List[Migration]:
+    """
+    All migrations in app/migrations/versions, oldest first
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        prefix, _, _ = module_info.name.partition("_")
+        if not (prefix.startswith("m") and prefix[1:].isdigit()):
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(int(prefix[1:]), module_info.name, module.description, module.upgrade))
+
+    migrations.sort(key=lambda migration: migration.version)
+    seen = set()
+    for migration in migrations:
+        if migration.version in seen:
+            raise RuntimeError(f"Duplicate migration version {migration.version}")
+        seen.add(migration.version)
+    return migrations
+
+
+def applied_versions(conn) -> set:
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(conn) -> List[Migration]:
+    applied = applied_versions(conn)
+    return [migration for migration in load_migrations() if migration.version not in applied]
+
+
+def upgrade(conn) -> List[Migration]:
+    """
+    Apply pending migrations in order, committing after each one
+    """
+    applied = []
+    for migration in pending_migrations(conn):
+        logger.info("Applying migration %s: %s", migration.name, migration.description)
+        migration.upgrade(conn)
+        conn.execute(insert(schema_migrations), {"version": migration.version, "description": migration.description})
+        # MySQL commits DDL implicitly anyway; this also records the version
+        conn.commit()
+        applied.append(migration)
+    return applied
+
+
+async def run_migrations(engine, fn=upgrade):
+    """
+    Run fn(conn) on a connection from the app's sync or async engine
+    """
+    if hasattr(engine, "sync_engine"):
+        async with engine.connect() as conn:
+            return await conn.run_sync(fn)
+
+    def _run():
+        with engine.connect() as conn:
+            return fn(conn)
+
+    return await run_in_threadpool(_run)
\ No newline at end of file
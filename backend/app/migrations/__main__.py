@@ -0,0 +1,34 @@
+"""
+python -m app.migrations [upgrade|status]
+"""
+import argparse
+import asyncio
+
+from app.database import engine
+from app.logging_config import configure_logging
+from app.migrations import load_migrations, pending_migrations, run_migrations, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Apply or list schema migrations")
+    parser.add_argument("command", choices=("upgrade", "status"), nargs="?", default="upgrade")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.command == "status":
+        pending = {migration.version for migration in asyncio.run(run_migrations(engine, pending_migrations))}
+        for migration in load_migrations():
+            state = "pending" if migration.version in pending else "applied"
+            print(f"{migration.name:<40} {state:<8} {migration.description}")
+        return
+
+    applied = asyncio.run(run_migrations(engine, upgrade))
+    if applied:
+        for migration in applied:
+            print(f"Applied {migration.name}: {migration.description}")
+    else:
+        print("Database is up to date")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
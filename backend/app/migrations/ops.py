@@ -0,0 +1,63 @@
+"""
+Idempotent DDL helpers for migrations.
+
+Databases created before migrations existed were built by create_all from the
+models at the time, so they may already have some of the columns and indexes a
+migration adds; these helpers make such changes skip instead of failing.
+
+Migrations pass their own frozen Table definitions, never the models', so what
+they create stays the same however the models change later.
+"""
+import logging
+from typing import Sequence
+
+from sqlalchemy import Column, Index, MetaData, Table, inspect, text
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+
+def has_index_on(conn, table: str, columns: Sequence[str]) -> bool:
+    """
+    True if some index (or unique constraint) already leads with these columns.
+
+    MySQL creates an index for every foreign key, so a column may be covered
+    by an index the models never declared.
+    """
+    columns = list(columns)
+    inspector = inspect(conn)
+    indexes = inspector.get_indexes(table) + inspector.get_unique_constraints(table)
+    if any(list(index["column_names"][: len(columns)]) == columns for index in indexes):
+        return True
+    primary_key = inspector.get_pk_constraint(table).get("constrained_columns") or []
+    return list(primary_key[: len(columns)]) == columns
+
+
+def create_index(conn, table: Table, name: str, columns: Sequence[str], unique: bool = False) -> bool:
+    """
+    Create an index unless an equivalent one exists; returns whether it was created
+    """
+    if has_index_on(conn, table.name, columns):
+        logger.debug("Skipping index %s: %s(%s) is already indexed", name, table.name, ", ".join(columns))
+        return False
+    # Build the index on a stand-in table so it is not attached to the caller's Table
+    stub = Table(table.name, MetaData(), *(Column(column, table.c[column].type) for column in columns))
+    Index(name, *(stub.c[column] for column in columns), unique=unique).create(conn)
+    return True
+
+
+def has_column(conn, table: str, column: str) -> bool:
+    return any(existing["name"] == column for existing in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table: Table, column: str) -> bool:
+    """
+    Add one of a table's columns unless it exists; returns whether it was added
+    """
+    if has_column(conn, table.name, column):
+        logger.debug("Skipping column %s.%s: already exists", table.name, column)
+        return False
+    preparer = conn.dialect.identifier_preparer
+    definition = CreateColumn(table.c[column]).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}"))
+    return True
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Baseline: the user and intake tables as the API created them before migrations.
+
+The tables are defined here rather than taken from the models, so this migration
+builds the same schema however the models change later; each later migration
+applies its own change on top. Databases created by the old startup create_all
+already have these tables, so existing tables are left untouched and only missing
+ones are created.
+"""
+from sqlalchemy import Boolean, Column, Enum, Float, ForeignKey, Integer, MetaData, String, TIMESTAMP, Table, Text
+from sqlalchemy.sql import func
+
+description = "Create the user and intake tables"
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("user_id", String(255), primary_key=True, index=True),
+    Column("email", String(255), unique=True, index=True),
+    Column("full_name", String(255)),
+    Column("phone_number", String(20)),
+    Column("created_at", TIMESTAMP, server_default=func.now()),
+    Column("is_signup_only", Boolean),
+)
+
+Table(
+    "user_addresses",
+    metadata,
+    Column("address_id", Integer, primary_key=True, index=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("house_number", String(255)),
+    Column("street", String(255)),
+    Column("city", String(255)),
+    Column("postal_code", String(20)),
+    Column("country", String(255)),
+    Column("address_updated_at", TIMESTAMP, server_default=func.now()),
+)
+
+Table(
+    "intake_forms",
+    metadata,
+    Column("form_id", Integer, primary_key=True, index=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), unique=True),
+    Column("email", String(255), unique=True),
+    Column("full_name", String(255)),
+    Column("phone_number", String(20)),
+    Column("is_signup_only", Boolean),
+    Column("age", String(10)),
+    Column("weight", String(10)),
+    Column("height", String(10)),
+    Column("body_fat", String(20)),
+    Column("measurement_system", Enum("metric", "imperial", name="measurement_system")),
+    Column("weight_height_completed", Boolean),
+    Column("goal1", String(255)),
+    Column("goal2", String(255)),
+    Column("goal3", String(255)),
+    Column("obstacle", Text),
+    Column("goals_completed", Boolean),
+    Column("occupation", String(255)),
+    Column("occupation_completed", Boolean),
+    Column("activity_level", Enum(
+        "sedentary", "lightly_active", "moderately_active", "very_active", "extremely_active", "active",
+        name="activity_level",
+    )),
+    Column("activity_level_completed", Boolean),
+    Column("dedication_level", Enum("minimum", "moderate", "maximum", name="dedication_level")),
+    Column("dedication_level_completed", Boolean),
+    Column("stress_level", Enum("low_stress", "average_stress", "high_stress", name="stress_level")),
+    Column("stress_level_completed", Boolean),
+    Column("caffeine", String(255)),
+    Column("caffeine_completed", Boolean),
+    Column("diet", String(255)),
+    Column("diet_description", Text),
+    Column("medical_conditions", String(255)),
+    Column("menstrual_info", String(255)),
+    Column("training_program", String(255)),
+    Column("weekly_frequency", String(10)),
+    Column("training_frequency_completed", Boolean),
+    Column("training_time_preference", String(50)),
+    Column("training_time_completed", Boolean),
+    Column("supplements", String(255)),
+    Column("supplements_completed", Boolean),
+    Column("additional_equipment_info", Text),
+    Column("leg_curl_type", String(50)),
+    Column("has_measuring_tape", Boolean),
+    Column("skinfold_calipers", String(255)),
+    Column("fitness_tech", String(255)),
+    Column("strength_training_experience", String(10)),
+    Column("strength_competency", String(50)),
+    Column("strength_competency_value", Float),
+    Column("strength_competency_comments", Text),
+    Column("strength_choice_completed", Boolean),
+    Column("other_exercises", Text),
+    Column("other_exercise_completed", Boolean),
+    Column("equipment1_completed", Boolean),
+    Column("equipment2_completed", Boolean),
+    Column("equipment3_completed", Boolean),
+    Column("equipment4_completed", Boolean),
+    Column("current_program_completed", Boolean),
+    Column("intake_form_completed", Boolean),
+    Column("last_updated", TIMESTAMP, server_default=func.now()),
+    Column("sleep_quality", String(50)),
+)
+
+
+def _owned_columns():
+    """
+    form_id / user_id of a table holding one intake section
+    """
+    return [
+        Column("form_id", Integer, ForeignKey("intake_forms.form_id"), nullable=True),
+        Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    ]
+
+
+Table(
+    "strength_measurements",
+    metadata,
+    Column("measurement_id", Integer, primary_key=True, index=True, autoincrement=True),
+    *_owned_columns(),
+    *(Column(f"{lift}_{part}", String(length)) for lift in ("squat", "bench_press", "deadlift", "overhead_press", "chin_up")
+      for part, length in (("weight", 20), ("reps", 10))),
+    Column("strength1_completed", Boolean),
+    Column("strength2_completed", Boolean),
+    Column("last_updated", TIMESTAMP, server_default=func.now()),
+)
+
+Table(
+    "genetics",
+    metadata,
+    Column("genetics_id", Integer, primary_key=True, index=True, autoincrement=True),
+    *_owned_columns(),
+    Column("wrist_circumference", String(20)),
+    Column("ankle_circumference", String(20)),
+    Column("genetics_completed", Boolean),
+)
+
+Table(
+    "dumbbell_info",
+    metadata,
+    Column("dumbbell_id", Integer, primary_key=True, autoincrement=True),
+    *_owned_columns(),
+    Column("is_full_set", Boolean),
+    Column("min_weight", String(20)),
+    Column("max_weight", String(20)),
+    Column("specific_weights", Text),
+)
+
+Table(
+    "gym_equipment",
+    metadata,
+    Column("equipment_id", Integer, primary_key=True, index=True, autoincrement=True),
+    *_owned_columns(),
+    Column("equipment_type", String(255)),
+)
+
+Table(
+    "cardio_equipment",
+    metadata,
+    Column("equipment_id", Integer, primary_key=True, index=True, autoincrement=True),
+    *_owned_columns(),
+    Column("equipment_type", String(255)),
+)
+
+Table(
+    "addresses",
+    metadata,
+    Column("address_id", Integer, primary_key=True, index=True, autoincrement=True),
+    *_owned_columns(),
+    Column("house_number", String(100)),
+    Column("street", String(255)),
+    Column("city", String(100)),
+    Column("postal_code", String(20)),
+    Column("country", String(100)),
+    Column("address_updated_at", TIMESTAMP, server_default=func.now()),
+)
+
+Table(
+    "body_photos",
+    metadata,
+    Column("photo_id", Integer, primary_key=True, index=True, autoincrement=True),
+    *_owned_columns(),
+    Column("photo_url", String(255)),
+    Column("upload_date", TIMESTAMP, server_default=func.now()),
+)
+
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+Index the user_id / form_id foreign keys every handler filters on, plus
+intake_forms.last_updated for the client listing's range filters.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, TIMESTAMP, Table
+
+from app.migrations.ops import create_index
+
+description = "Index foreign keys on the intake child tables and user_addresses"
+
+# Tables whose rows are looked up by their owner's user_id and form_id
+CHILD_TABLES = [
+    "strength_measurements",
+    "genetics",
+    "dumbbell_info",
+    "gym_equipment",
+    "cardio_equipment",
+    "addresses",
+    "body_photos",
+]
+
+
+def _table(name: str, *columns: Column) -> Table:
+    # Frozen copies of just the indexed columns
+    return Table(name, MetaData(), *columns)
+
+
+def upgrade(conn):
+    for name in CHILD_TABLES:
+        table = _table(name, Column("user_id", String(255)), Column("form_id", Integer))
+        create_index(conn, table, f"ix_{name}_user_id", ["user_id"])
+        create_index(conn, table, f"ix_{name}_form_id", ["form_id"])
+
+    create_index(conn, _table("user_addresses", Column("user_id", String(255))), "ix_user_addresses_user_id", ["user_id"])
+    create_index(conn, _table("intake_forms", Column("last_updated", TIMESTAMP)), "ix_intake_forms_last_updated", ["last_updated"])
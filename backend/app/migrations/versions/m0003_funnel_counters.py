@@ -0,0 +1,68 @@
+"""
+Summary counters for the onboarding funnel analytics, backfilled from the
+existing intake forms. From here on app.funnel keeps them up to date.
+
+The table and the backfill are frozen copies, so later changes to app.funnel or
+the models do not change what this migration does.
+"""
+from sqlalchemy import Boolean, Column, Enum, Integer, MetaData, String, Table, case, delete, func, insert, select
+
+description = "Add intake_funnel_counters and backfill it from intake_forms"
+
+metadata = MetaData()
+
+counters = Table(
+    "intake_funnel_counters",
+    metadata,
+    Column("metric", String(64), primary_key=True),
+    Column("bucket", String(64), primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+
+# Section flags in form order
+COMPLETION_STAGES = [
+    "weight_height_completed", "goals_completed", "occupation_completed", "activity_level_completed",
+    "dedication_level_completed", "stress_level_completed", "caffeine_completed",
+    "training_frequency_completed", "training_time_completed", "supplements_completed",
+    "strength_choice_completed", "other_exercise_completed", "equipment1_completed",
+    "equipment2_completed", "equipment3_completed", "equipment4_completed",
+    "current_program_completed", "intake_form_completed",
+]
+DISTRIBUTIONS = {
+    "activity_level": ["sedentary", "lightly_active", "moderately_active", "very_active", "extremely_active", "active"],
+    "stress_level": ["low_stress", "average_stress", "high_stress"],
+    "dedication_level": ["minimum", "moderate", "maximum"],
+}
+
+forms = Table(
+    "intake_forms",
+    MetaData(),
+    *(Column(stage, Boolean) for stage in COMPLETION_STAGES),
+    *(Column(name, Enum(*values, name=name)) for name, values in DISTRIBUTIONS.items()),
+)
+
+
+def upgrade(conn):
+    counters.create(conn, checkfirst=True)
+    counts = {("forms", "total"): 0}
+    counts.update({("completed", stage): 0 for stage in COMPLETION_STAGES})
+    for name, values in DISTRIBUTIONS.items():
+        counts.update({(name, value): 0 for value in values})
+
+    totals = conn.execute(select(
+        func.count(),
+        *(func.coalesce(func.sum(case((forms.c[stage], 1), else_=0)), 0) for stage in COMPLETION_STAGES),
+    )).one()
+    counts[("forms", "total")] = totals[0]
+    for stage, completed in zip(COMPLETION_STAGES, totals[1:]):
+        counts[("completed", stage)] = completed
+
+    for name in DISTRIBUTIONS:
+        column = forms.c[name]
+        for value, count in conn.execute(select(column, func.count()).where(column.is_not(None)).group_by(column)):
+            counts[(name, str(value))] = count
+
+    conn.execute(delete(counters))
+    conn.execute(insert(counters), [
+        {"metric": metric, "bucket": bucket, "count": count} for (metric, bucket), count in counts.items()
+    ])
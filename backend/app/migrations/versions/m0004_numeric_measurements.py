@@ -0,0 +1,187 @@
+"""
+Numeric SI columns next to the free-text body and strength inputs, backfilled
+in batches from the raw values. From here on app.units keeps them in sync.
+
+The columns are frozen copies of the models as of this migration. The backfill
+is a small self-contained conversion covering the inputs app.units accepted
+then (bare numbers, unit suffixes, feet-inches), so later changes there do not
+change what this migration writes.
+"""
+import logging
+import re
+from typing import Callable, Optional, Tuple
+
+from sqlalchemy import Column, Enum, Float, Integer, MetaData, String, Table, bindparam, select, update
+
+from app.config import env_int
+from app.migrations.ops import add_column
+
+logger = logging.getLogger(__name__)
+
+description = "Add normalized numeric body and strength columns and backfill them"
+
+BATCH_SIZE = env_int("UNIT_BACKFILL_BATCH_SIZE", 5000)
+
+LIFTS = ["squat", "bench_press", "deadlift", "overhead_press", "chin_up"]
+FORM_INPUTS = ["age", "weight", "height", "body_fat", "measurement_system"]
+STRENGTH_INPUTS = [f"{lift}_{part}" for lift in LIFTS for part in ("weight", "reps")]
+FORM_COLUMNS = ["age_years", "weight_kg", "height_m", "body_fat_pct"]
+STRENGTH_COLUMNS = [f"{lift}_{suffix}" for lift in LIFTS for suffix in ("weight_kg", "reps_count")]
+
+forms = Table(
+    "intake_forms",
+    MetaData(),
+    Column("form_id", Integer, primary_key=True),
+    Column("user_id", String(255)),
+    *(Column(name, String(20)) for name in FORM_INPUTS[:-1]),
+    Column("measurement_system", Enum("metric", "imperial", name="measurement_system")),
+    Column("age_years", Integer),
+    Column("weight_kg", Float),
+    Column("height_m", Float),
+    Column("body_fat_pct", Float),
+)
+
+strength = Table(
+    "strength_measurements",
+    MetaData(),
+    Column("measurement_id", Integer, primary_key=True),
+    Column("user_id", String(255)),
+    *(Column(name, String(20)) for name in STRENGTH_INPUTS),
+    *(Column(f"{lift}_weight_kg", Float) for lift in LIFTS),
+    *(Column(f"{lift}_reps_count", Integer) for lift in LIFTS),
+)
+
+LB_TO_KG = 0.45359237
+INCH_TO_M = 0.0254
+FOOT_TO_M = 0.3048
+
+# Plausible ranges in canonical units; anything outside becomes NULL
+AGE_RANGE = (5, 120)
+BODY_WEIGHT_RANGE = (20.0, 400.0)
+HEIGHT_RANGE = (0.5, 2.5)
+BODY_FAT_RANGE = (1.0, 75.0)
+LIFT_WEIGHT_RANGE = (0.0, 600.0)
+REPS_RANGE = (0, 100)
+
+# Unit suffix -> factor to kg or metres
+WEIGHT_UNITS = dict.fromkeys(["kg", "kgs", "kilo", "kilos"], 1.0) | dict.fromkeys(["lb", "lbs", "pound", "pounds"], LB_TO_KG)
+HEIGHT_UNITS = {"cm": 0.01, "m": 1.0} | dict.fromkeys(["in", "inch", "inches", '"'], INCH_TO_M)
+YEARS = {"y", "yr", "yrs", "years"}
+
+_QUANTITY = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*([a-z%"]*)\.?\s*$', re.IGNORECASE)
+_FEET_INCHES = re.compile(
+    r"""^\s*(\d+)\s*(?:'|ft|feet|foot)\s*(?:(\d+(?:\.\d+)?)\s*(?:"|''|in|inch|inches)?)?\s*$""",
+    re.IGNORECASE,
+)
+
+
+def _quantity(value) -> Tuple[Optional[float], str]:
+    """
+    (number, lower-case unit suffix) of a raw input, or (None, "") if it does not parse
+    """
+    match = _QUANTITY.match(value) if value is not None else None
+    if match is None:
+        return None, ""
+    return float(match.group(1).replace(",", ".")), match.group(2).lower()
+
+
+def _within(value: Optional[float], bounds: Tuple[float, float], integer: bool = False):
+    low, high = bounds
+    if value is None or not low <= value <= high or (integer and value != int(value)):
+        return None
+    return int(value) if integer else round(value, 3)
+
+
+def _imperial(system) -> bool:
+    # No system set means the imperial default
+    return (getattr(system, "value", system) or "imperial") == "imperial"
+
+
+def _weight_kg(value, system, bounds: Tuple[float, float] = BODY_WEIGHT_RANGE) -> Optional[float]:
+    number, unit = _quantity(value)
+    factor = (LB_TO_KG if _imperial(system) else 1.0) if unit == "" else WEIGHT_UNITS.get(unit)
+    return _within(number * factor if number is not None and factor else None, bounds)
+
+
+def _height_m(value, system) -> Optional[float]:
+    match = _FEET_INCHES.match(value) if value is not None else None
+    if match:
+        return _within(float(match.group(1)) * FOOT_TO_M + float(match.group(2) or 0) * INCH_TO_M, HEIGHT_RANGE)
+    number, unit = _quantity(value)
+    if number is None:
+        return None
+    if unit:
+        factor = HEIGHT_UNITS.get(unit)
+        return _within(number * factor if factor else None, HEIGHT_RANGE)
+    if not _imperial(system):
+        return _within(number if number < 3 else number / 100, HEIGHT_RANGE)
+    if number >= 9:
+        return _within(number * INCH_TO_M, HEIGHT_RANGE)
+    # The app's ft.in input: 5.10 is 5 ft 10 in
+    feet, _, inches = value.strip().partition(".")
+    inches = float(inches or 0)
+    return _within(float(feet) * FOOT_TO_M + inches * INCH_TO_M, HEIGHT_RANGE) if inches < 12 else None
+
+
+def _bare(value, units=()) -> Optional[float]:
+    number, unit = _quantity(value)
+    return number if unit == "" or unit in units else None
+
+
+def _form_columns(row) -> dict:
+    return {
+        "age_years": _within(_bare(row.age, YEARS), AGE_RANGE, integer=True),
+        "weight_kg": _weight_kg(row.weight, row.measurement_system),
+        "height_m": _height_m(row.height, row.measurement_system),
+        "body_fat_pct": _within(_bare(row.body_fat, {"%"}), BODY_FAT_RANGE),
+    }
+
+
+def _strength_columns(row) -> dict:
+    columns = {}
+    for lift in LIFTS:
+        columns[f"{lift}_weight_kg"] = _weight_kg(row._mapping[f"{lift}_weight"], row.measurement_system, LIFT_WEIGHT_RANGE)
+        columns[f"{lift}_reps_count"] = _within(_bare(row._mapping[f"{lift}_reps"]), REPS_RANGE, integer=True)
+    return columns
+
+
+def _backfill_table(conn, statement, table, key_column, normalize: Callable) -> int:
+    """
+    Walk a table in key order BATCH_SIZE rows at a time, committing each batch
+    """
+    total = 0
+    last_key = None
+    while True:
+        batch = statement.order_by(key_column).limit(BATCH_SIZE)
+        if last_key is not None:
+            batch = batch.where(key_column > last_key)
+        rows = conn.execute(batch).all()
+        if not rows:
+            break
+        conn.execute(update(table).where(key_column == bindparam("_key")), [
+            {"_key": row[0], **normalize(row)} for row in rows
+        ])
+        conn.commit()
+        total += len(rows)
+        last_key = rows[-1][0]
+        logger.info("Normalized %d %s rows", total, table.name)
+    return total
+
+
+def upgrade(conn):
+    for column in FORM_COLUMNS:
+        add_column(conn, forms, column)
+    for column in STRENGTH_COLUMNS:
+        add_column(conn, strength, column)
+
+    _backfill_table(
+        conn,
+        select(forms.c.form_id, *(forms.c[name] for name in FORM_INPUTS)),
+        forms, forms.c.form_id, _form_columns,
+    )
+    _backfill_table(
+        conn,
+        select(strength.c.measurement_id, *(strength.c[name] for name in STRENGTH_INPUTS), forms.c.measurement_system)
+        .select_from(strength.outerjoin(forms, forms.c.user_id == strength.c.user_id)),
+        strength, strength.c.measurement_id, _strength_columns,
+    )
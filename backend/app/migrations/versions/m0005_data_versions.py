@@ -0,0 +1,25 @@
+"""
+Change counters that in-process caches of whole-table results (the strength
+analytics snapshot) are validated against.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, insert, select
+
+description = "Add data_versions for cache invalidation"
+
+# Frozen copy of the table as this migration creates it
+data_versions = Table(
+    "data_versions",
+    MetaData(),
+    Column("name", String(64), primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+# The counter app.strength validates its snapshot against
+STRENGTH_VERSION = "strength"
+
+
+def upgrade(conn):
+    data_versions.create(conn, checkfirst=True)
+    # Created up front so concurrent first writers only ever UPDATE the row
+    if conn.execute(select(data_versions.c.name).where(data_versions.c.name == STRENGTH_VERSION)).first() is None:
+        conn.execute(insert(data_versions).values(name=STRENGTH_VERSION, version=0))
@@ -0,0 +1,198 @@
+"""
+Append-only strength history and its weekly/monthly rollups, started from each
+user's current measurements. From here on app.strength_history appends to them.
+
+The tables and the e1RM arithmetic are frozen copies of app.strength and
+app.strength_history as of this migration. Each user starts with one entry per
+lift, so its rollups are that entry alone and need no merging.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import (
+    Column, Date, Float, ForeignKey, Index, Integer, MetaData, SmallInteger, String, TIMESTAMP, Table,
+    delete, insert, select,
+)
+
+from app.config import env_int
+
+logger = logging.getLogger(__name__)
+
+description = "Add strength_history and strength_history_rollups and seed them from strength_measurements"
+
+BATCH_SIZE = env_int("STRENGTH_HISTORY_BATCH_SIZE", 5000)
+
+# Lifts are stored as their position in this list
+LIFTS = ["squat", "bench_press", "deadlift", "overhead_press", "chin_up"]
+PERIODS = ["week", "month"]
+BODYWEIGHT_LIFTS = {"chin_up"}
+MAX_REPS = 15
+FORMULAS = {
+    "epley": lambda weight, reps: weight * (1 + reps / 30),
+    "brzycki": lambda weight, reps: weight * 36 / (37 - reps),
+    "lander": lambda weight, reps: 100 * weight / (101.3 - 2.67123 * reps),
+    "lombardi": lambda weight, reps: weight * reps ** 0.10,
+    "mayhew": lambda weight, reps: 100 * weight / (52.2 + 41.9 * np.exp(-0.055 * reps)),
+    "oconner": lambda weight, reps: weight * (1 + reps / 40),
+    "wathen": lambda weight, reps: 100 * weight / (48.8 + 53.8 * np.exp(-0.075 * reps)),
+}
+
+metadata = MetaData()
+
+# Stand-in for the foreign key target
+Table("users", metadata, Column("user_id", String(255), primary_key=True))
+
+history = Table(
+    "strength_history",
+    metadata,
+    Column("entry_id", Integer, primary_key=True, autoincrement=True),
+    Column("user_id", String(255), ForeignKey("users.user_id"), nullable=False),
+    Column("lift", SmallInteger, nullable=False),
+    Column("recorded_at", TIMESTAMP, nullable=False),
+    Column("weight_kg", Float),
+    Column("reps", SmallInteger),
+    Column("e1rm_kg", Float),
+    Index("ix_strength_history_user_time", "user_id", "recorded_at"),
+    Index("ix_strength_history_user_lift_time", "user_id", "lift", "recorded_at"),
+)
+
+rollups_table = Table(
+    "strength_history_rollups",
+    metadata,
+    Column("user_id", String(255), primary_key=True),
+    Column("lift", SmallInteger, primary_key=True),
+    Column("period", String(8), primary_key=True),
+    Column("period_start", Date, primary_key=True),
+    Column("entries", Integer, nullable=False),
+    Column("e1rm_entries", Integer, nullable=False),
+    Column("e1rm_sum_kg", Float, nullable=False),
+    Column("best_e1rm_kg", Float),
+    Column("max_weight_kg", Float),
+    Column("last_e1rm_kg", Float),
+    Column("last_at", TIMESTAMP),
+)
+
+strength = Table(
+    "strength_measurements",
+    MetaData(),
+    Column("measurement_id", Integer, primary_key=True),
+    Column("user_id", String(255)),
+    Column("last_updated", TIMESTAMP),
+    *(Column(f"{lift}_weight_kg", Float) for lift in LIFTS),
+    *(Column(f"{lift}_reps_count", Integer) for lift in LIFTS),
+)
+
+forms = Table(
+    "intake_forms",
+    MetaData(),
+    Column("form_id", Integer, primary_key=True),
+    Column("user_id", String(255)),
+    Column("weight_kg", Float),
+)
+
+
+def _e1rm(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    """
+    Mean of the formula estimates; a single rep is the 1RM itself
+    """
+    valid = (reps >= 1) & (reps <= MAX_REPS)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        estimates = [np.where(valid, np.where(reps == 1, weight, formula(weight, reps)), np.nan) for formula in FORMULAS.values()]
+        return np.mean(np.vstack(estimates), axis=0)
+
+
+def _optional(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def _entry_rows(user_ids: Sequence[str], recorded_at: Sequence[datetime], lifts: Sequence[str],
+                weight: Sequence, reps: Sequence, bodyweight: Sequence) -> List[dict]:
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    load = weight + np.where(
+        [lift in BODYWEIGHT_LIFTS for lift in lifts], np.asarray(bodyweight, dtype=np.float64), 0.0
+    )
+    e1rm = _e1rm(load, reps) if len(lifts) else np.empty(0)
+    return [
+        {
+            "user_id": user_ids[i],
+            "lift": LIFTS.index(lifts[i]),
+            "recorded_at": recorded_at[i],
+            "weight_kg": _optional(weight[i]),
+            "reps": None if np.isnan(reps[i]) else int(reps[i]),
+            "e1rm_kg": _optional(e1rm[i]),
+        }
+        for i in range(len(lifts))
+    ]
+
+
+def _rollup_rows(entries: List[dict]) -> List[dict]:
+    """
+    Weekly and monthly rollups of seeded entries, each the only one for its user, lift and period
+    """
+    rows = []
+    for entry in entries:
+        day = entry["recorded_at"].date()
+        e1rm = entry["e1rm_kg"]
+        for period, start in (("week", day - timedelta(days=day.weekday())), ("month", day.replace(day=1))):
+            rows.append({
+                "user_id": entry["user_id"], "lift": entry["lift"], "period": period, "period_start": start,
+                "entries": 1, "e1rm_entries": int(e1rm is not None), "e1rm_sum_kg": e1rm or 0.0,
+                "best_e1rm_kg": e1rm, "max_weight_kg": entry["weight_kg"],
+                "last_e1rm_kg": e1rm, "last_at": entry["recorded_at"],
+            })
+    return rows
+
+
+def _import_current_measurements(conn) -> int:
+    """
+    Append every user's current strength measurements, dated by their last_updated,
+    with their rollups
+    """
+    numeric = [strength.c[f"{lift}_{suffix}"] for lift in LIFTS for suffix in ("weight_kg", "reps_count")]
+    statement = (
+        select(strength.c.measurement_id, strength.c.user_id, strength.c.last_updated, forms.c.weight_kg, *numeric)
+        .select_from(strength.outerjoin(forms, forms.c.user_id == strength.c.user_id))
+        .order_by(strength.c.measurement_id)
+        .limit(BATCH_SIZE)
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    total = 0
+    last_key = None
+    while True:
+        batch = statement if last_key is None else statement.where(strength.c.measurement_id > last_key)
+        rows = conn.execute(batch).all()
+        if not rows:
+            break
+        user_ids, recorded_at, lifts, weight, reps, bodyweight = [], [], [], [], [], []
+        for row in rows:
+            for i, lift in enumerate(LIFTS):
+                lift_weight, lift_reps = row[4 + 2 * i], row[5 + 2 * i]
+                if lift_weight is None and lift_reps is None:
+                    continue
+                user_ids.append(row.user_id)
+                recorded_at.append(row.last_updated or now)
+                lifts.append(lift)
+                weight.append(lift_weight)
+                reps.append(lift_reps)
+                bodyweight.append(row.weight_kg)
+        entries = _entry_rows(user_ids, recorded_at, lifts, weight, reps, bodyweight)
+        if entries:
+            conn.execute(insert(history), entries)
+            conn.execute(insert(rollups_table), _rollup_rows(entries))
+        total += len(entries)
+        last_key = rows[-1].measurement_id
+    logger.info("Imported %d strength history entries", total)
+    return total
+
+
+def upgrade(conn):
+    history.create(conn, checkfirst=True)
+    rollups_table.create(conn, checkfirst=True)
+    # Only seed an empty history, so re-running cannot duplicate entries; a
+    # non-empty one was written by app.strength_history along with its rollups
+    if conn.execute(select(history.c.entry_id).limit(1)).first() is None:
+        conn.execute(delete(rollups_table))
+        _import_current_measurements(conn)
@@ -0,0 +1,31 @@
+"""
+Upload metadata and resized variant URLs on body_photos (see app.photos).
+Existing photos, registered by URL only, keep these columns empty.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+from app.migrations.ops import add_column, create_index
+
+description = "Add content hash, size and variant URL columns to body_photos"
+
+# Frozen copy of the columns this migration adds
+body_photos = Table(
+    "body_photos",
+    MetaData(),
+    Column("photo_id", Integer, primary_key=True),
+    Column("content_hash", String(64)),
+    Column("content_type", String(32)),
+    Column("byte_size", Integer),
+    Column("variants_status", String(16)),
+    Column("thumbnail_url", String(255)),
+    Column("medium_url", String(255)),
+    Column("large_url", String(255)),
+)
+
+COLUMNS = ["content_hash", "content_type", "byte_size", "variants_status", "thumbnail_url", "medium_url", "large_url"]
+
+
+def upgrade(conn):
+    for column in COLUMNS:
+        add_column(conn, body_photos, column)
+    create_index(conn, body_photos, "ix_body_photos_content_hash", ["content_hash"])
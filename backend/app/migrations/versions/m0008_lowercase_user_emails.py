@@ -0,0 +1,40 @@
+"""
+Store user emails lowercased, the form lookups and the user cache normalize to
+(see app.dependencies.normalize_email).
+
+Case-insensitive collations (MySQL's default) already match these rows, so only
+case-sensitive databases find anything to rewrite. An email whose lowercase form
+belongs to another user is left as it is and logged.
+"""
+import logging
+
+from sqlalchemy import Column, MetaData, String, Table, func, select, update
+
+logger = logging.getLogger(__name__)
+
+description = "Lowercase user emails"
+
+# Frozen copy of the columns this migration touches
+users = Table(
+    "users",
+    MetaData(),
+    Column("user_id", String(255), primary_key=True),
+    Column("email", String(255)),
+)
+
+
+def upgrade(conn):
+    rows = conn.execute(
+        select(users.c.user_id, users.c.email).where(users.c.email != func.lower(users.c.email))
+    ).all()
+    if not rows:
+        return
+    lowered = {row.email.strip().lower() for row in rows}
+    taken = set(conn.execute(select(users.c.email).where(users.c.email.in_(lowered))).scalars())
+    for row in rows:
+        email = row.email.strip().lower()
+        if email in taken:
+            logger.warning("Leaving email of user %s as is: %s is already registered", row.user_id, email)
+            continue
+        conn.execute(update(users).where(users.c.user_id == row.user_id).values(email=email))
+        taken.add(email)
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+Per-form change counter the intake form ETag and cached documents are derived
+from (see app.data_versions.touch_intake_form). Existing forms start at 0.
+"""
+from sqlalchemy import Column, Integer, MetaData, Table
+
+from app.migrations.ops import add_column
+
+description = "Add intake_forms.version"
+
+# Frozen copy of the column this migration adds
+intake_forms = Table(
+    "intake_forms",
+    MetaData(),
+    Column("version", Integer, nullable=False, server_default="0"),
+)
+
+
+def upgrade(conn):
+    add_column(conn, intake_forms, "version")
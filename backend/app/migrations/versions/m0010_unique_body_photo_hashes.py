@@ -0,0 +1,39 @@
+"""
+One body_photos row per (user_id, content_hash), so concurrent uploads of the same
+image cannot both insert (see app.routers.intake_forms._save_body_photo).
+
+Duplicates created before the constraint existed point at the same stored file;
+the oldest row of each is kept. Photos registered by URL only have no
+content_hash and are not affected.
+"""
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, select
+
+from app.migrations.ops import create_index
+
+description = "Make body photo content hashes unique per user"
+
+# Frozen copy of the columns this migration touches
+body_photos = Table(
+    "body_photos",
+    MetaData(),
+    Column("photo_id", Integer, primary_key=True),
+    Column("user_id", String(255)),
+    Column("content_hash", String(64)),
+)
+
+
+def upgrade(conn):
+    earlier = body_photos.alias("earlier")
+    # Selected first: MySQL can't delete from a table it reads in a subquery
+    duplicates = list(conn.execute(
+        select(body_photos.c.photo_id).where(
+            select(earlier.c.photo_id).where(
+                earlier.c.user_id == body_photos.c.user_id,
+                earlier.c.content_hash == body_photos.c.content_hash,
+                earlier.c.photo_id < body_photos.c.photo_id,
+            ).exists()
+        )
+    ).scalars())
+    if duplicates:
+        conn.execute(delete(body_photos).where(body_photos.c.photo_id.in_(duplicates)))
+    create_index(conn, body_photos, "uq_body_photos_user_content_hash", ["user_id", "content_hash"], unique=True)
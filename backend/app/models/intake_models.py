@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, TIMESTAMP, Float, Text, Enum
+from sqlalchemy import Boolean, Column, Date, ForeignKey, Index, Integer, SmallInteger, String, TIMESTAMP, Float, Text, Enum
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -23,6 +23,12 @@ class IntakeForm(Base):
     body_fat = Column(String(20))  # Added body_fat column
     measurement_system = Column(Enum('metric', 'imperial', name='measurement_system'))
     weight_height_completed = Column(Boolean, default=False)
+
+    # The section above in SI units, derived from the raw input by app.units on write
+    age_years = Column(Integer)
+    weight_kg = Column(Float)
+    height_m = Column(Float)
+    body_fat_pct = Column(Float)
     
     # Goals section
     goal1 = Column(String(255))
@@ -100,7 +106,10 @@ class IntakeForm(Base):
     
     # Meta fields
     intake_form_completed = Column(Boolean, default=False)
-    last_updated = Column(TIMESTAMP, server_default=func.now())
+    last_updated = Column(TIMESTAMP, server_default=func.now(), index=True)
+    # Bumped by every write to the form or its sections (app.data_versions); the
+    # ETag and cached document are derived from it
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Sleep quality
     sleep_quality = Column(String(50))  # <-- Add this line
@@ -120,8 +129,8 @@ class StrengthMeasurement(Base):
     __tablename__ = "strength_measurements"
     
     measurement_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Measurements
     squat_weight = Column(String(20))
@@ -134,6 +143,19 @@ class StrengthMeasurement(Base):
     overhead_press_reps = Column(String(10))
     chin_up_weight = Column(String(20))
     chin_up_reps = Column(String(10))
+
+    # The measurements above in kg / repetitions, derived by app.units on write
+    # using the intake form's measurement_system
+    squat_weight_kg = Column(Float)
+    squat_reps_count = Column(Integer)
+    bench_press_weight_kg = Column(Float)
+    bench_press_reps_count = Column(Integer)
+    deadlift_weight_kg = Column(Float)
+    deadlift_reps_count = Column(Integer)
+    overhead_press_weight_kg = Column(Float)
+    overhead_press_reps_count = Column(Integer)
+    chin_up_weight_kg = Column(Float)
+    chin_up_reps_count = Column(Integer)
     
     # Completion status
     strength1_completed = Column(Boolean, default=False)
@@ -150,8 +172,8 @@ class Genetics(Base):
     __tablename__ = "genetics"
     
     genetics_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Genetics measurements (body_fat moved to intake_forms)
     wrist_circumference = Column(String(20))
@@ -169,8 +191,8 @@ class DumbbellInfo(Base):
     __tablename__ = "dumbbell_info"
     
     dumbbell_id = Column(Integer, primary_key=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Dumbbell data
     is_full_set = Column(Boolean)
@@ -186,8 +208,8 @@ class GymEquipment(Base):
     __tablename__ = "gym_equipment"
     
     equipment_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Equipment type
     equipment_type = Column(String(255))
@@ -200,8 +222,8 @@ class CardioEquipment(Base):
     __tablename__ = "cardio_equipment"
     
     equipment_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Equipment type
     equipment_type = Column(String(255))
@@ -214,8 +236,8 @@ class Address(Base):
     __tablename__ = "addresses"
     
     address_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Address details
     house_number = Column(String(100))
@@ -235,12 +257,90 @@ class BodyPhoto(Base):
     __tablename__ = "body_photos"
     
     photo_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    form_id = Column(Integer, ForeignKey("intake_forms.form_id"), nullable=True, index=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     
     # Photo URL
     photo_url = Column(String(255))
     upload_date = Column(TIMESTAMP, server_default=func.now())
+
+    # Set for photos uploaded through the API (app.photos): the original is stored
+    # once per SHA-256, however many times it is uploaded
+    content_hash = Column(String(64), index=True)
+    content_type = Column(String(32))
+    byte_size = Column(Integer)
+
+    # Resized copies, written by a background job after the upload returns
+    variants_status = Column(String(16))  # pending, ready or failed
+    thumbnail_url = Column(String(255))
+    medium_url = Column(String(255))
+    large_url = Column(String(255))
     
     # Relationships
-    intake_form = relationship("IntakeForm", back_populates="body_photos")
\ No newline at end of file
+    intake_form = relationship("IntakeForm", back_populates="body_photos")
+
+    __table_args__ = (
+        # One row per image per user, also when the same image is uploaded concurrently
+        Index("uq_body_photos_user_content_hash", "user_id", "content_hash", unique=True),
+    )
+
+
+# Onboarding funnel summary counters, kept up to date by app.funnel on intake form writes
+class FunnelCounter(Base):
+    __tablename__ = "intake_funnel_counters"
+
+    # e.g. ("completed", "goals_completed"), ("activity_level", "sedentary"), ("forms", "total")
+    metric = Column(String(64), primary_key=True)
+    bucket = Column(String(64), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Change counters for results derived from whole tables, so every worker can tell
+# when its cached copy is stale. Bumped once after a write commits, in a short
+# transaction of its own (app.data_versions.mark_changed)
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Append-only log of strength results: one row per lift each time a save changes
+# it, written by app.strength_history. Kept narrow (lift as a code into
+# app.units.LIFTS, SI numbers only) since it grows with every save.
+class StrengthHistoryEntry(Base):
+    __tablename__ = "strength_history"
+
+    entry_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    lift = Column(SmallInteger, nullable=False)
+    recorded_at = Column(TIMESTAMP, nullable=False)
+    weight_kg = Column(Float)
+    reps = Column(SmallInteger)
+    # Mean formula estimate, as in app.strength
+    e1rm_kg = Column(Float)
+
+    __table_args__ = (
+        # Range queries over all lifts, and latest / range per lift
+        Index("ix_strength_history_user_time", "user_id", "recorded_at"),
+        Index("ix_strength_history_user_lift_time", "user_id", "lift", "recorded_at"),
+    )
+
+
+# Weekly and monthly aggregates of strength_history, updated with every append
+class StrengthHistoryRollup(Base):
+    __tablename__ = "strength_history_rollups"
+
+    user_id = Column(String(255), primary_key=True)
+    lift = Column(SmallInteger, primary_key=True)
+    # "week" (starting Monday) or "month"
+    period = Column(String(8), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+
+    entries = Column(Integer, nullable=False, default=0)
+    e1rm_entries = Column(Integer, nullable=False, default=0)
+    e1rm_sum_kg = Column(Float, nullable=False, default=0)
+    best_e1rm_kg = Column(Float)
+    max_weight_kg = Column(Float)
+    last_e1rm_kg = Column(Float)
+    last_at = Column(TIMESTAMP)
\ No newline at end of file
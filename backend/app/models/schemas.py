@@ -1,7 +1,7 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
-from datetime import datetime
+from datetime import date, datetime
 
 # Define enums
 class MeasurementSystem(str, Enum):
@@ -87,6 +87,7 @@ class DumbbellInfoCreate(BaseModel):
     is_full_set: bool
     min_weight: Optional[str] = None
     max_weight: Optional[str] = None
+    specific_weights: Optional[str] = None
 
 class DumbbellInfoResponse(BaseModel):
     dumbbell_id: int
@@ -116,6 +117,12 @@ class GymEquipmentResponse(BaseModel):
 class CardioEquipmentCreate(BaseModel):
     equipment_type: str
 
+class EquipmentListUpdate(BaseModel):
+    equipment_list: List[str] = []
+
+class GymEquipmentListUpdate(EquipmentListUpdate):
+    leg_curl_type: Optional[str] = None
+
 class CardioEquipmentResponse(BaseModel):
     equipment_id: int
     form_id: Optional[int] = None
@@ -135,6 +142,14 @@ class BodyPhotoResponse(BaseModel):
     user_id: str
     photo_url: str
     upload_date: Optional[datetime] = None
+    content_hash: Optional[str] = None
+    content_type: Optional[str] = None
+    byte_size: Optional[int] = None
+    # pending until the resized variants below have been generated
+    variants_status: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
+    large_url: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -172,6 +187,18 @@ class StrengthMeasurementsResponse(BaseModel):
     strength2_completed: bool = False
     last_updated: Optional[datetime] = None
 
+    # Normalized values (kg, repetitions); None when the raw input can't be parsed
+    squat_weight_kg: Optional[float] = None
+    squat_reps_count: Optional[int] = None
+    bench_press_weight_kg: Optional[float] = None
+    bench_press_reps_count: Optional[int] = None
+    deadlift_weight_kg: Optional[float] = None
+    deadlift_reps_count: Optional[int] = None
+    overhead_press_weight_kg: Optional[float] = None
+    overhead_press_reps_count: Optional[int] = None
+    chin_up_weight_kg: Optional[float] = None
+    chin_up_reps_count: Optional[int] = None
+
     class Config:
         from_attributes = True
 
@@ -296,6 +323,11 @@ class IntakeFormResponse(BaseModel):
     body_fat: Optional[str] = None  # Added body_fat field
     measurement_system: Optional[str] = None
     weight_height_completed: bool = False
+    # Normalized values (SI units); None when the raw input can't be parsed
+    age_years: Optional[int] = None
+    weight_kg: Optional[float] = None
+    height_m: Optional[float] = None
+    body_fat_pct: Optional[float] = None
     
     # Goals section
     goal1: Optional[str] = None
@@ -421,6 +453,143 @@ class GoalResponse(BaseModel):
 class GoalsResponse(GoalResponse):
     pass  # For compatibility with old code
 
+# Multi-section intake submit
+class IntakeSubmit(BaseModel):
+    intake: Optional[IntakeFormUpdate] = None
+    goals: Optional[GoalsCreate] = None
+    strength_measurements: Optional[StrengthMeasurementsCreate] = None
+    genetics: Optional[GeneticsUpdate] = None
+    cardio_equipment: Optional[EquipmentListUpdate] = None
+    gym_equipment: Optional[GymEquipmentListUpdate] = None
+    dumbbell_info: Optional[DumbbellInfoCreate] = None
+
+# Bulk client import: one NDJSON line per client, the user plus any intake sections
+class ClientImport(IntakeSubmit):
+    user: UserCreate
+
+class ImportRowError(BaseModel):
+    # 1-based line number in the uploaded NDJSON
+    line: int
+    email: Optional[str] = None
+    detail: str
+
+class ImportReport(BaseModel):
+    lines: int
+    imported: int
+    failed: int
+    # The first IMPORT_MAX_ERRORS failures
+    errors: List[ImportRowError]
+
+# Client listing (one lightweight row per client)
+class ClientSummary(BaseModel):
+    form_id: int
+    user_id: str
+    email: Optional[str] = None
+    full_name: Optional[str] = None
+    is_signup_only: Optional[bool] = None
+    age: Optional[str] = None
+    weight: Optional[str] = None
+    height: Optional[str] = None
+    activity_level: Optional[str] = None
+    goals_completed: Optional[bool] = None
+    intake_form_completed: Optional[bool] = None
+    last_updated: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ClientPage(BaseModel):
+    items: List[ClientSummary]
+    next_cursor: Optional[str] = None
+
+# Onboarding funnel analytics
+class FunnelStage(BaseModel):
+    stage: str
+    completed: int
+    # Share of all intake forms that completed this stage
+    completion_rate: float
+    # Forms lost since the previous stage (negative when more completed this one)
+    drop_off: int
+
+class FunnelReport(BaseModel):
+    total_forms: int
+    stages: List[FunnelStage]
+    activity_level: Dict[str, int]
+    stress_level: Dict[str, int]
+    dedication_level: Dict[str, int]
+
+# Strength analytics
+class StrengthLiftAnalytics(BaseModel):
+    lift: str
+    # Lifted load (chin-ups include bodyweight) and reps the estimates are based on
+    load_kg: float
+    reps: int
+    # Mean of the formula estimates
+    e1rm_kg: float
+    estimates_kg: Dict[str, float]
+    # e1RM / bodyweight
+    relative_strength: Optional[float] = None
+    # Percentile rank per cohort, e.g. {"age_band": {"e1rm": 71.5, "relative": 64.0}}
+    percentiles: Dict[str, Dict[str, Optional[float]]]
+
+class UserStrengthAnalytics(BaseModel):
+    user_id: str
+    bodyweight_kg: Optional[float] = None
+    # The user's group in each cohort, e.g. {"all": "all", "age_band": "25-34"}
+    cohorts: Dict[str, str]
+    lifts: List[StrengthLiftAnalytics]
+    version: int
+
+class StrengthCohortRow(BaseModel):
+    group: str
+    lift: str
+    users: int
+    # Quantiles, e.g. {"p10": 60.0, ..., "p90": 140.0}
+    e1rm_kg: Dict[str, Optional[float]]
+    relative_strength: Dict[str, Optional[float]]
+
+class StrengthCohortTable(BaseModel):
+    cohort: str
+    rows: List[StrengthCohortRow]
+    version: int
+
+# Strength history
+class StrengthHistoryPoint(BaseModel):
+    lift: str
+    recorded_at: datetime
+    weight_kg: Optional[float] = None
+    reps: Optional[int] = None
+    e1rm_kg: Optional[float] = None
+
+class StrengthHistoryPage(BaseModel):
+    user_id: str
+    entries: List[StrengthHistoryPoint]
+    next_cursor: Optional[str] = None
+
+class StrengthLatest(BaseModel):
+    user_id: str
+    # Most recent entry for each lift that has one
+    lifts: List[StrengthHistoryPoint]
+
+class StrengthTrendPoint(BaseModel):
+    period_start: date
+    entries: int
+    best_e1rm_kg: Optional[float] = None
+    mean_e1rm_kg: Optional[float] = None
+    max_weight_kg: Optional[float] = None
+    # e1RM of the period's last entry
+    last_e1rm_kg: Optional[float] = None
+
+class StrengthTrendSeries(BaseModel):
+    lift: str
+    points: List[StrengthTrendPoint]
+
+class StrengthTrend(BaseModel):
+    user_id: str
+    period: str
+    series: List[StrengthTrendSeries]
+
 # Update forward references
 StrengthMeasurementsResponse.update_forward_refs()
 IntakeFormResponse.update_forward_refs()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, TIMESTAMP, Float, Text
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, TIMESTAMP
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
@@ -23,7 +23,7 @@ class UserAddress(Base):
     __tablename__ = "user_addresses"
 
     address_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False)
+    user_id = Column(String(255), ForeignKey("users.user_id"), nullable=False, index=True)
     house_number = Column(String(255))
     street = Column(String(255))
     city = Column(String(255))
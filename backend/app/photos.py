@@ -0,0 +1,227 @@
+"""
+Body photo storage and resized variants.
+
+Uploads are streamed to PHOTO_STORAGE_DIR one chunk at a time while being
+hashed, then moved to a path derived from their SHA-256, so an image uploaded
+several times is stored once. Thumbnails and resized copies are rendered by a
+process pool after the upload request has returned, keeping image decoding off
+both the event loop and the request path.
+
+This module stays free of database imports: variant rendering runs in spawned
+worker processes, which import it.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import AsyncIterator, Coroutine, Dict, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException
+
+from app.config import env_int
+
+logger = logging.getLogger(__name__)
+
+PHOTO_STORAGE_DIR = os.getenv("PHOTO_STORAGE_DIR", "media/photos")
+PHOTO_URL_PREFIX = os.getenv("PHOTO_URL_PREFIX", "/media/photos").rstrip("/")
+PHOTO_MAX_BYTES = env_int("PHOTO_MAX_BYTES", 20 * 1024 * 1024)
+PHOTO_WORKERS = env_int("PHOTO_WORKERS", 2)
+
+# Accepted upload types and the extension the original is stored with
+CONTENT_TYPES = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+# Variant name -> longest side in pixels; each has a <name>_url column on BodyPhoto
+VARIANTS = {"thumbnail": 200, "medium": 800, "large": 1600}
+VARIANT_QUALITY = 85
+
+
+@dataclass
+class StoredPhoto:
+    content_hash: str
+    content_type: str
+    byte_size: int
+    path: str
+
+    @property
+    def url(self) -> str:
+        return photo_url(self.path)
+
+
+def photo_url(path: str) -> str:
+    return f"{PHOTO_URL_PREFIX}/{path}"
+
+
+def original_path(content_hash: str, extension: str) -> str:
+    # Fanned out by hash prefix so no directory grows too large
+    return f"{content_hash[:2]}/{content_hash}.{extension}"
+
+
+def variant_path(content_hash: str, variant: str) -> str:
+    return f"{content_hash[:2]}/{content_hash}_{variant}.jpg"
+
+
+def _storage_path(path: str) -> str:
+    return os.path.join(PHOTO_STORAGE_DIR, path)
+
+
+def _open_temp_file() -> Tuple[object, str]:
+    os.makedirs(PHOTO_STORAGE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=PHOTO_STORAGE_DIR, suffix=".part")
+    return os.fdopen(fd, "wb"), temp_path
+
+
+def _move_into_place(temp_path: str, path: str) -> None:
+    target = _storage_path(path)
+    if os.path.exists(target):
+        # Same content already stored
+        os.unlink(temp_path)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(temp_path, target)
+
+
+def _discard(temp_path: str) -> None:
+    try:
+        os.unlink(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def store_upload(chunks: AsyncIterator[bytes], content_type: str) -> StoredPhoto:
+    """
+    Write an uploaded image to storage as it arrives, hashing it on the way.
+
+    Only one chunk is held in memory at a time; uploads over PHOTO_MAX_BYTES are
+    rejected as soon as they cross the limit.
+    """
+    extension = CONTENT_TYPES.get(content_type)
+    if extension is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type: {content_type}. Expected one of: {', '.join(CONTENT_TYPES)}",
+        )
+
+    raw_file, temp_path = await anyio.to_thread.run_sync(_open_temp_file)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with anyio.wrap_file(raw_file) as file:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > PHOTO_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Photo exceeds {PHOTO_MAX_BYTES} bytes")
+                digest.update(chunk)
+                await file.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+
+        content_hash = digest.hexdigest()
+        path = original_path(content_hash, extension)
+        await anyio.to_thread.run_sync(_move_into_place, temp_path, path)
+    except BaseException:
+        await anyio.to_thread.run_sync(_discard, temp_path)
+        raise
+
+    return StoredPhoto(content_hash=content_hash, content_type=content_type, byte_size=size, path=path)
+
+
+def render_variants(path: str, content_hash: str) -> Dict[str, str]:
+    """
+    Write every missing variant of a stored original as JPEG; returns variant -> path.
+
+    Runs in a worker process.
+    """
+    # Imported here so only the worker processes pay for it
+    from PIL import Image, ImageOps
+
+    paths = {name: variant_path(content_hash, name) for name in VARIANTS}
+    missing = {name: size for name, size in VARIANTS.items() if not os.path.exists(_storage_path(paths[name]))}
+    if not missing:
+        return paths
+
+    with Image.open(_storage_path(path)) as image:
+        # Let the JPEG decoder downscale while decoding when the variants are much smaller
+        image.draft("RGB", (max(missing.values()),) * 2)
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for name, size in missing.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            target = _storage_path(paths[name])
+            temp_path = f"{target}.{os.getpid()}.part"
+            variant.save(temp_path, "JPEG", quality=VARIANT_QUALITY, optimize=True)
+            os.replace(temp_path, target)
+    return paths
+
+
+class PhotoProcessor:
+    """
+    Process pool for variant rendering plus the background tasks waiting on it
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks = set()
+        self.completed = 0
+        self.failed = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first use; "spawn" because the server process has threads running
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def render(self, path: str, content_hash: str) -> Tuple[Dict[str, str], str]:
+        """
+        Render the variants of a stored original; returns (variant -> URL, status)
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            paths = await loop.run_in_executor(self._pool(), render_variants, path, content_hash)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool for later jobs
+            logger.exception("Photo worker pool broke while rendering %s", content_hash)
+            self._executor = None
+            self.failed += 1
+            return {}, "failed"
+        except Exception:
+            logger.exception("Rendering variants of photo %s failed", content_hash)
+            self.failed += 1
+            return {}, "failed"
+        self.completed += 1
+        return {name: photo_url(variant) for name, variant in paths.items()}, "ready"
+
+    def spawn(self, job: Coroutine) -> None:
+        """
+        Run a job in the background, keeping a reference until it finishes
+        """
+        task = asyncio.get_running_loop().create_task(job)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+photo_processor = PhotoProcessor(PHOTO_WORKERS)
\ No newline at end of file
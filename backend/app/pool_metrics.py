@@ -0,0 +1,135 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """
+    Counters fed by connection pool events
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.connects = 0
+            self.checkouts = 0
+            self.checkins = 0
+            self.invalidations = 0
+            self.soft_invalidations = 0
+            self.timeouts = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.soft_invalidations += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            data = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "timeouts": self.timeouts,
+                "wait": {
+                    "count": self.wait_count,
+                    "total_seconds": round(self.wait_total, 6),
+                    "avg_seconds": round(self.wait_total / self.wait_count, 6) if self.wait_count else 0.0,
+                    "max_seconds": round(self.wait_max, 6),
+                },
+            }
+
+        # Live pool state, only available on queue-based pools
+        if pool is not None:
+            data["pool_class"] = type(pool).__name__
+            if isinstance(pool, QueuePool):
+                data["pool_size"] = pool.size()
+                data["checked_in"] = pool.checkedin()
+                data["overflow"] = pool.overflow()
+                data["max_overflow"] = pool._max_overflow
+                data["timeout"] = pool.timeout()
+        return data
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckoutMixin:
+    """
+    Measures how long callers spend acquiring a connection from the pool
+    (waiting on the queue plus opening a new connection when needed)
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(engine):
+    """
+    Attach pool event listeners to an Engine or AsyncEngine
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "connect", pool_stats.on_connect)
+    event.listen(sync_engine, "checkout", pool_stats.on_checkout)
+    event.listen(sync_engine, "checkin", pool_stats.on_checkin)
+    event.listen(sync_engine, "invalidate", pool_stats.on_invalidate)
+    event.listen(sync_engine, "soft_invalidate", pool_stats.on_soft_invalidate)
+
+
+def pool_snapshot(engine) -> dict:
+    sync_engine = getattr(engine, "sync_engine", engine)
+    return pool_stats.snapshot(sync_engine.pool)
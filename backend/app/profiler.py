@@ -0,0 +1,166 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import env_bool, env_float, env_int
+from app.metrics import UNMATCHED_ROUTE
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: when off, no engine listeners or middleware are installed at all
+SQL_PROFILE = env_bool("SQL_PROFILE", False)
+# Statements slower than this are written to the slow-query log
+SQL_SLOW_QUERY_MS = env_float("SQL_SLOW_QUERY_MS", 100)
+# The same statement run this many times in one request is reported as a likely N+1
+SQL_N_PLUS_ONE_THRESHOLD = env_int("SQL_N_PLUS_ONE_THRESHOLD", 5)
+# How many of the slowest statements a request summary keeps
+SQL_PROFILE_TOP = env_int("SQL_PROFILE_TOP", 3)
+
+
+def _short(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+class QueryProfile:
+    """
+    Statements executed while handling one request
+    """
+
+    def __init__(self, method: str, scope: dict):
+        self.method = method
+        # Routing runs after this middleware and records the matched route on the scope
+        self._scope = scope
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest: List[Tuple[float, str]] = []
+        self.repeats: Dict[str, int] = {}
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        # Parameters are bound separately, so a lazy load repeated per row
+        # (e.g. IntakeForm.user, GymEquipment.intake_form) has identical SQL text
+        self.repeats[statement] = self.repeats.get(statement, 0) + 1
+
+        self.slowest.append((duration, statement))
+        if len(self.slowest) > SQL_PROFILE_TOP:
+            self.slowest.sort(reverse=True)
+            del self.slowest[SQL_PROFILE_TOP:]
+
+    @property
+    def route(self) -> str:
+        """
+        Route template, e.g. /intake/{email}: raw paths would put user emails in
+        the logs and split one route into a series per user
+        """
+        return getattr(self._scope.get("route"), "path", UNMATCHED_ROUTE)
+
+    def repeated_statements(self) -> List[Tuple[str, int]]:
+        """
+        Statements run at least SQL_N_PLUS_ONE_THRESHOLD times, most frequent first
+        """
+        repeated = [(statement, count) for statement, count in self.repeats.items() if count >= SQL_N_PLUS_ONE_THRESHOLD]
+        return sorted(repeated, key=lambda item: item[1], reverse=True)
+
+    def summary(self) -> dict:
+        return {
+            "route": f"{self.method} {self.route}",
+            "queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "slowest": [
+                {"ms": round(duration * 1000, 2), "statement": _short(statement)}
+                for duration, statement in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+
+# Profile of the request being handled. The object is mutated in place, so it is
+# shared with threadpool workers and greenlets that copy the context.
+_current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("sql_profile", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.record(statement, duration)
+
+    if duration * 1000 >= SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s",
+            duration * 1000,
+            _short(statement),
+            extra={
+                "duration_ms": round(duration * 1000, 2),
+                "route": f"{profile.method} {profile.route}" if profile else None,
+            },
+        )
+
+
+def instrument_engine(engine):
+    """
+    Time every statement run through the engine (the sync engine behind an AsyncEngine)
+    """
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryProfilerMiddleware:
+    """
+    Pure ASGI middleware that collects a QueryProfile per request.
+
+    Adds X-DB-Queries / X-DB-Time (ms) response headers, plus X-DB-Repeated with the
+    number of distinct statements that look like N+1 patterns. Each of those is logged
+    as a warning; the full summary with the slowest statements is logged at DEBUG.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(scope["method"], scope)
+        token = _current_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(profile.count).encode("latin-1")))
+                headers.append((b"x-db-time", f"{profile.total_time * 1000:.2f}".encode("latin-1")))
+                repeated = profile.repeated_statements()
+                if repeated:
+                    headers.append((b"x-db-repeated", str(len(repeated)).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_profile.reset(token)
+            self._report(profile)
+
+    def _report(self, profile: QueryProfile) -> None:
+        for statement, count in profile.repeated_statements():
+            logger.warning(
+                "Possible N+1: statement ran %d times in %s %s: %s",
+                count,
+                profile.method,
+                profile.route,
+                _short(statement),
+                extra={"repeat_count": count},
+            )
+
+        if logger.isEnabledFor(logging.DEBUG) and profile.count:
+            logger.debug("Request SQL profile", extra=profile.summary())
\ No newline at end of file
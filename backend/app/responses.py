@@ -0,0 +1,37 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+
+# One compiled List[...] serializer per item type
+_list_adapters: Dict[type, TypeAdapter] = {}
+
+
+def dump_json(model: BaseModel) -> bytes:
+    """
+    JSON bytes straight from pydantic's compiled (Rust) serializer
+    """
+    return model.__pydantic_serializer__.to_json(model)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    Response for an already built response model.
+
+    Returning a Response skips FastAPI's response_model handling (re-validating the
+    model, dumping it to Python primitives, then json.dumps); routes keep
+    response_model= so the OpenAPI schema is unchanged.
+    """
+    return Response(dump_json(model), status_code=status_code, headers=headers, media_type=JSON_MEDIA_TYPE)
+
+
+def list_response(item_type: type, items: List[Any], status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    Response for a list of response models, serialized in one call
+    """
+    adapter = _list_adapters.get(item_type)
+    if adapter is None:
+        adapter = _list_adapters[item_type] = TypeAdapter(List[item_type])
+    return Response(adapter.dump_json(items), status_code=status_code, headers=headers, media_type=JSON_MEDIA_TYPE)
\ No newline at end of file
@@ -1,13 +1,20 @@
 # Create this file if it doesn't exist
 
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from sqlalchemy.sql import func
+from typing import List
 
-from app.database import get_db
-from app.models import intake_models, user_models
+from app.data_versions import bump_form_version
+from app.database import DbSession, get_db
+from app.dependencies import get_optional_intake_form, get_user_id, intake_form_cache
+from app.models import intake_models
 from app.models.schemas import AddressResponse, AddressCreate  # Add AddressCreate here
+from app.responses import list_response, model_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/address",
@@ -16,69 +23,68 @@ router = APIRouter(
 )
 
 @router.get("/user/{email}", response_model=List[AddressResponse])
-def get_user_address(email: str, db: Session = Depends(get_db)):
+async def get_user_address(email: str, user_id: str = Depends(get_user_id), db: DbSession = Depends(get_db)):
     """
     Get addresses for a user by email
     """
+    return list_response(AddressResponse, await db.run_sync(_get_user_address, user_id))
+
+def _get_user_address(db: Session, user_id: str):
     try:
-        # Find the user first
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
         # Get addresses directly by user ID
         addresses = db.query(intake_models.Address).filter(
-            intake_models.Address.user_id == user.user_id
+            intake_models.Address.user_id == user_id
         ).all()
         
-        print(f"Found {len(addresses)} addresses for user {user.user_id}")
-        for a in addresses:
-            print(f"  - Address: {a.house_number} {a.street}, {a.city}, {a.country}")
+        logger.debug("Found %d addresses for user %s", len(addresses), user_id)
         
-        return addresses
+        return [AddressResponse.model_validate(a) for a in addresses]
     except Exception as e:
-        print(f"Error getting address: {str(e)}")
+        logger.exception("Error getting address: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/user/{email}", response_model=AddressResponse)
-def create_user_address(email: str, address_data: AddressCreate, db: Session = Depends(get_db)):
+async def create_user_address(email: str, address_data: AddressCreate, resolved: tuple = Depends(get_optional_intake_form), db: DbSession = Depends(get_db)):
     """
     Create or update an address for a user
     """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_create_user_address, address_data, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return model_response(result)
+
+def _create_user_address(db: Session, address_data: AddressCreate, resolved: tuple):
     try:
-        # Find the user first
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form to get the form_id
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
+        # The intake form (if any) provides the form_id
+        user, intake_form = resolved
+        user_id = user.user_id
         
         # Find existing address
         existing_address = db.query(intake_models.Address).filter(
-            intake_models.Address.user_id == user.user_id
+            intake_models.Address.user_id == user_id
         ).first()
         
         if existing_address:
             # Update existing address
             for key, value in address_data.dict().items():
                 setattr(existing_address, key, value)
+            existing_address.address_updated_at = func.now()
             address = existing_address
         else:
             # Create new address
             address = intake_models.Address(
-                user_id=user.user_id,
+                user_id=user_id,
                 form_id=intake_form.form_id if intake_form else None,
                 **address_data.dict()
             )
             db.add(address)
+        # The address is part of the intake form document
+        bump_form_version(db, user_id)
             
         db.commit()
         db.refresh(address)
-        return address
+        return AddressResponse.model_validate(address)
     except Exception as e:
         db.rollback()
-        print(f"Error creating/updating address: {str(e)}")
+        logger.exception("Error creating/updating address: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,159 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.database import DbSession, get_db
+from app.dependencies import get_user_id
+from app.funnel import funnel_report
+from app.models.schemas import (
+    FunnelReport, StrengthCohortTable, StrengthHistoryPage, StrengthLatest, StrengthTrend, UserStrengthAnalytics,
+)
+from app.responses import model_response
+from app.strength import COHORTS, cohort_table, strength_cache, user_analytics
+from app.strength_history import PERIODS, history_page, latest_entries, trend
+from app.units import LIFTS
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+)
+
+@router.get("/funnel", response_model=FunnelReport)
+async def get_onboarding_funnel(db: DbSession = Depends(get_db)):
+    """
+    Onboarding funnel: how many intake forms completed each section, in form order,
+    plus activity, stress and dedication level distributions
+
+    Served from counters maintained on every intake form write, not a scan of intake_forms.
+    """
+    report = await db.run_sync(_get_onboarding_funnel)
+    return model_response(report)
+
+def _get_onboarding_funnel(db: Session):
+    return funnel_report(db)
+
+def _check_lifts(lifts: List[str]):
+    unknown = [name for name in lifts if name not in LIFTS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown lift(s): {', '.join(unknown)}. Expected one of: {', '.join(LIFTS)}")
+
+@router.get("/strength/cohorts", response_model=StrengthCohortTable)
+async def get_strength_cohorts(
+    cohort: str = Query("all", description=f"One of: {', '.join(COHORTS)}"),
+    lift: List[str] = Query([], description="Lifts to include (default: all)"),
+    db: DbSession = Depends(get_db),
+):
+    """
+    e1RM and bodyweight-relative strength quantiles per cohort group and lift
+    """
+    if cohort not in COHORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown cohort: {cohort}. Expected one of: {', '.join(COHORTS)}")
+    _check_lifts(lift)
+
+    snapshot = await strength_cache.get(db)
+    # Quantiles are computed once per snapshot, off the event loop
+    table = await run_in_threadpool(cohort_table, snapshot, cohort, lift or LIFTS)
+    return model_response(table)
+
+def encode_history_cursor(recorded_at: datetime, entry_id: int) -> str:
+    """
+    Opaque cursor for the history page that starts after this entry
+    """
+    raw = json.dumps({"recorded_at": recorded_at.isoformat(), "entry_id": entry_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(raw["recorded_at"]), int(raw["entry_id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/strength/{email}/history", response_model=StrengthHistoryPage)
+async def get_strength_history(
+    email: str,
+    lift: List[str] = Query([], description="Lifts to include (default: all)"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_user_id),
+    db: DbSession = Depends(get_db),
+):
+    """
+    A user's strength history entries recorded in [start, end), oldest first
+
+    Uses keyset pagination: pass the returned next_cursor to get the following page.
+    """
+    _check_lifts(lift)
+    after = decode_history_cursor(cursor) if cursor else None
+
+    page = await db.run_sync(_get_strength_history, user_id, lift or LIFTS, start, end, after, limit)
+    return model_response(page)
+
+def _get_strength_history(db: Session, user_id: str, lifts: List[str], start: Optional[datetime], end: Optional[datetime], after: Optional[Tuple[datetime, int]], limit: int):
+    entries, next_key = history_page(db, user_id, lifts, start, end, after, limit)
+    return StrengthHistoryPage(
+        user_id=user_id,
+        entries=entries,
+        next_cursor=encode_history_cursor(*next_key) if next_key else None,
+    )
+
+@router.get("/strength/{email}/latest", response_model=StrengthLatest)
+async def get_latest_strength(
+    email: str,
+    lift: List[str] = Query([], description="Lifts to include (default: all)"),
+    user_id: str = Depends(get_user_id),
+    db: DbSession = Depends(get_db),
+):
+    """
+    A user's most recent history entry for each lift
+    """
+    _check_lifts(lift)
+    latest = await db.run_sync(_get_latest_strength, user_id, lift or LIFTS)
+    return model_response(latest)
+
+def _get_latest_strength(db: Session, user_id: str, lifts: List[str]):
+    return StrengthLatest(user_id=user_id, lifts=latest_entries(db, user_id, lifts))
+
+@router.get("/strength/{email}/trend", response_model=StrengthTrend)
+async def get_strength_trend(
+    email: str,
+    period: str = Query("week", description=f"One of: {', '.join(PERIODS)}"),
+    lift: List[str] = Query([], description="Lifts to include (default: all)"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    user_id: str = Depends(get_user_id),
+    db: DbSession = Depends(get_db),
+):
+    """
+    Weekly or monthly e1RM series per lift, for periods overlapping [start, end]
+
+    Served from rollups maintained on every strength save, not a scan of the history.
+    """
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unknown period: {period}. Expected one of: {', '.join(PERIODS)}")
+    _check_lifts(lift)
+
+    report = await db.run_sync(_get_strength_trend, user_id, period, lift or LIFTS, start, end)
+    return model_response(report)
+
+def _get_strength_trend(db: Session, user_id: str, period: str, lifts: List[str], start: Optional[date], end: Optional[date]):
+    return StrengthTrend(user_id=user_id, period=period, series=trend(db, user_id, period, lifts, start, end))
+
+@router.get("/strength/{email}", response_model=UserStrengthAnalytics)
+async def get_user_strength(email: str, user_id: str = Depends(get_user_id), db: DbSession = Depends(get_db)):
+    """
+    A user's estimated 1RMs (per formula and combined), relative strength and
+    percentile ranks within their cohorts
+    """
+    analytics = user_analytics(await strength_cache.get(db), user_id)
+    if analytics is None:
+        raise HTTPException(status_code=404, detail="No strength measurements found")
+    return model_response(analytics)
\ No newline at end of file
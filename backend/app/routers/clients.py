@@ -0,0 +1,181 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import false, or_, select, true
+from sqlalchemy.orm import Session
+
+from app.bulk_import import import_clients
+from app.database import DbSession, get_db
+from app.export import FORMATS, export_query, stream_export
+from app.models import intake_models, user_models
+from app.models.schemas import ActivityLevel, ClientPage, ClientSummary, ImportReport
+from app.responses import model_response
+
+router = APIRouter(
+    prefix="/clients",
+    tags=["clients"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Boolean section flags that can be filtered on, e.g. goals_completed
+COMPLETION_FLAGS = sorted(
+    column.name for column in intake_models.IntakeForm.__table__.columns if column.name.endswith("_completed")
+)
+
+# Columns of the listing row; nothing else is loaded
+_SUMMARY_COLUMNS = [
+    intake_models.IntakeForm.form_id,
+    user_models.User.user_id,
+    user_models.User.email,
+    user_models.User.full_name,
+    user_models.User.is_signup_only,
+    intake_models.IntakeForm.age,
+    intake_models.IntakeForm.weight,
+    intake_models.IntakeForm.height,
+    intake_models.IntakeForm.activity_level,
+    intake_models.IntakeForm.goals_completed,
+    intake_models.IntakeForm.intake_form_completed,
+    intake_models.IntakeForm.last_updated,
+    user_models.User.created_at,
+]
+
+def encode_cursor(form_id: int) -> str:
+    """
+    Opaque cursor for the page that starts after form_id
+    """
+    raw = json.dumps({"form_id": form_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return int(json.loads(raw)["form_id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _check_flags(flags: List[str]):
+    unknown = [flag for flag in flags if flag not in COMPLETION_FLAGS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown completion flag(s): {', '.join(unknown)}. Expected one of: {', '.join(COMPLETION_FLAGS)}",
+        )
+
+@router.get("/", response_model=ClientPage)
+async def list_clients(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    completed: List[str] = Query([], description="Flags that must be set, e.g. goals_completed"),
+    incomplete: List[str] = Query([], description="Flags that must not be set"),
+    activity_level: List[ActivityLevel] = Query([]),
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    db: DbSession = Depends(get_db),
+):
+    """
+    List clients (intake forms joined with their users), newest first
+
+    Uses keyset pagination on form_id: pass the returned next_cursor to get the
+    following page. Each page is one indexed range scan, however deep it is.
+    """
+    _check_flags(completed)
+    _check_flags(incomplete)
+    after_form_id = decode_cursor(cursor) if cursor else None
+
+    page = await db.run_sync(
+        _list_clients, limit, after_form_id, completed, incomplete, activity_level, updated_after, updated_before
+    )
+    return model_response(page)
+
+def _list_clients(db: Session, limit: int, after_form_id: Optional[int], completed: List[str], incomplete: List[str], activity_level: List[ActivityLevel], updated_after: Optional[datetime], updated_before: Optional[datetime]):
+    IntakeForm = intake_models.IntakeForm
+
+    query = (
+        select(*_SUMMARY_COLUMNS)
+        .join(user_models.User, user_models.User.user_id == IntakeForm.user_id)
+        .order_by(IntakeForm.form_id.desc())
+        # One extra row tells us whether there is a next page
+        .limit(limit + 1)
+    )
+
+    if after_form_id is not None:
+        query = query.where(IntakeForm.form_id < after_form_id)
+    query = _filter_clients(query, completed, incomplete, activity_level, updated_after, updated_before)
+
+    rows = db.execute(query).all()
+    items = [ClientSummary.model_validate(row._mapping) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1].form_id) if len(rows) > limit else None
+
+    return ClientPage(items=items, next_cursor=next_cursor)
+
+def _filter_clients(query, completed: List[str], incomplete: List[str], activity_level: List[ActivityLevel], updated_after: Optional[datetime], updated_before: Optional[datetime]):
+    """
+    Apply the client list filters to a query over intake_forms
+    """
+    IntakeForm = intake_models.IntakeForm
+    for flag in completed:
+        query = query.where(getattr(IntakeForm, flag) == true())
+    for flag in incomplete:
+        column = getattr(IntakeForm, flag)
+        query = query.where(or_(column.is_(None), column == false()))
+    if activity_level:
+        query = query.where(IntakeForm.activity_level.in_([level.value for level in activity_level]))
+    if updated_after is not None:
+        query = query.where(IntakeForm.last_updated >= updated_after)
+    if updated_before is not None:
+        query = query.where(IntakeForm.last_updated < updated_before)
+    return query
+
+@router.get("/export")
+async def export_clients(
+    fmt: str = Query("csv", alias="format", description=f"One of: {', '.join(FORMATS)}"),
+    gzip: bool = Query(False, description="Compress the export on the fly (.gz download)"),
+    completed: List[str] = Query([], description="Flags that must be set, e.g. goals_completed"),
+    incomplete: List[str] = Query([], description="Flags that must not be set"),
+    activity_level: List[ActivityLevel] = Query([]),
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+):
+    """
+    Download every matching client's intake data (user, intake form, latest
+    strength measurements, genetics, dumbbell info and equipment lists), one row
+    per client, as CSV or NDJSON
+
+    Rows are read, encoded and sent batch by batch, so the export never holds
+    more than one batch in memory, nor a database connection between batches.
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {fmt}. Expected one of: {', '.join(FORMATS)}")
+    _check_flags(completed)
+    _check_flags(incomplete)
+
+    query = _filter_clients(export_query(), completed, incomplete, activity_level, updated_after, updated_before)
+    filename = f"intake-export-{date.today().isoformat()}.{fmt}"
+    media_type = FORMATS[fmt]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        stream_export(query, fmt, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post("/import", response_model=ImportReport)
+async def import_clients_ndjson(request: Request, db: DbSession = Depends(get_db)):
+    """
+    Create clients in bulk from an NDJSON body (Content-Type application/x-ndjson),
+    one client per line: {"user": {...}, "intake": {...}, "goals": {...}, ...}
+    with the same sections as /intake/{email}/submit
+
+    Lines are validated and inserted in batches, each batch in its own
+    transaction. Invalid lines and clients that already exist are reported by
+    line number in the response; they don't stop the rest of the import.
+    """
+    return model_response(await import_clients(db, request.stream()))
\ No newline at end of file
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.orm import Session
-from sqlalchemy.sql import func  # Import func directly
-from typing import List
 
-from app.database import get_db
-from app.models import intake_models, user_models
+from app.data_versions import touch_intake_form
+from app.database import DbSession, get_db
+from app.dependencies import intake_form_cache, require_intake_form
+from app.etag import etag_matches, make_etag, not_modified
 from app.models.schemas import GoalsCreate, GoalsUpdate, GoalsResponse
+from app.responses import model_response
 
 router = APIRouter(
     prefix="/goals",
@@ -13,71 +14,73 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@router.post("/", response_model=GoalsResponse)
-def create_goals(goals: GoalsCreate, email: str, db: Session = Depends(get_db)):
+def apply_goals(intake_form, goals: GoalsCreate):
     """
-    Create or update goals for a user
+    Set the goals section on an intake form without committing
     """
-    # First get the user to ensure we have the user_id
-    user = db.query(user_models.User).filter(user_models.User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    # Check if the user has an intake form
-    intake_form = db.query(intake_models.IntakeForm).filter(intake_models.IntakeForm.user_id == user.user_id).first()
-    if not intake_form:
-        raise HTTPException(status_code=404, detail="Intake form not found")
-    
-    # Update goals
     intake_form.goal1 = goals.goal1
     intake_form.goal2 = goals.goal2
     intake_form.goal3 = goals.goal3
     intake_form.obstacle = goals.obstacle
     intake_form.goals_completed = True
-    intake_form.last_updated = func.now()  # Use func.now() directly, not db.func.now()
-    
+    touch_intake_form(intake_form)
+
+@router.post("/", response_model=GoalsResponse)
+async def create_goals(goals: GoalsCreate, email: str, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
+    """
+    Create or update goals for a user
+    """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_create_goals, goals, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return model_response(result)
+
+def _create_goals(db: Session, goals: GoalsCreate, resolved: tuple):
+    # User and intake form are resolved together by the dependency
+    user, intake_form = resolved
+    apply_goals(intake_form, goals)
+
     db.commit()
     db.refresh(intake_form)
-    
-    return intake_form
+
+    return GoalsResponse.model_validate(intake_form)
 
 @router.get("/{email}", response_model=GoalsResponse)
-def get_goals(email: str, db: Session = Depends(get_db)):
+async def get_goals(email: str, request: Request, resolved: tuple = Depends(require_intake_form)):
     """
     Get goals for a user by email
+
+    Supports If-None-Match; the ETag is a hash of the goals themselves.
     """
-    # First get the user to ensure we have the user_id
-    user = db.query(user_models.User).filter(user_models.User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    intake_form = db.query(intake_models.IntakeForm).filter(intake_models.IntakeForm.user_id == user.user_id).first()
-    if not intake_form:
-        raise HTTPException(status_code=404, detail="Intake form not found")
-    
-    return intake_form
+    user, intake_form = resolved
+    goals = GoalsResponse.model_validate(intake_form)
+
+    etag = make_etag(*goals.model_dump().values())
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    return model_response(goals, headers={"ETag": etag})
 
 @router.put("/{email}", response_model=GoalsResponse)
-def update_goals(email: str, goals: GoalsUpdate, db: Session = Depends(get_db)):
+async def update_goals(email: str, goals: GoalsUpdate, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
     """
     Update goals for a user
     """
-    # First get the user to ensure we have the user_id
-    user = db.query(user_models.User).filter(user_models.User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-        
-    intake_form = db.query(intake_models.IntakeForm).filter(intake_models.IntakeForm.user_id == user.user_id).first()
-    if not intake_form:
-        raise HTTPException(status_code=404, detail="Intake form not found")
-    
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_update_goals, goals, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return model_response(result)
+
+def _update_goals(db: Session, goals: GoalsUpdate, resolved: tuple):
+    user, intake_form = resolved
+
     # Update with provided values
     for key, value in goals.dict(exclude_unset=True).items():
         setattr(intake_form, key, value)
-    
-    intake_form.last_updated = func.now()  # Use func.now() directly, not db.func.now()
-    
+
+    touch_intake_form(intake_form)
+
     db.commit()
     db.refresh(intake_form)
-    
-    return intake_form
\ No newline at end of file
+
+    return GoalsResponse.model_validate(intake_form)
\ No newline at end of file
@@ -1,12 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, selectinload
+import logging
+from functools import lru_cache
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, load_only, selectinload
 from sqlalchemy.sql import func
-from typing import List, Optional
+from typing import List, Optional, Tuple, Type
 from sqlalchemy.exc import IntegrityError
 
-from app.database import get_db
-from app.models import intake_models, user_models
-from app.models.schemas import IntakeFormResponse, IntakeFormUpdate, StrengthMeasurementsCreate, StrengthMeasurementsResponse, GeneticsUpdate, GeneticsResponse
+from app.data_versions import bump_form_version, touch_intake_form
+from app.database import DbSession, SessionLocal, get_db
+from app.dependencies import get_optional_intake_form, get_or_create_intake_form, get_user_id, intake_form_cache, normalize_email, require_intake_form
+from app.etag import etag_matches, make_etag, not_modified
+from app.models import intake_models
+from app.models.schemas import BodyPhotoResponse, IntakeFormResponse, IntakeFormUpdate, IntakeSubmit, StrengthMeasurementsCreate, StrengthMeasurementsResponse, GeneticsUpdate, GeneticsResponse
+from app.photos import PHOTO_MAX_BYTES, VARIANTS, StoredPhoto, photo_processor, store_upload
+from app.responses import dump_json, model_response
+from app.routers.goals import apply_goals
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/intake",
@@ -14,134 +27,346 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Section writers. They stage changes on the session without committing so the
+# single-section endpoints and /submit can share them. Each one bumps the form's
+# version, which the GET ETag is derived from.
+
+def _touch(intake_form: intake_models.IntakeForm):
+    touch_intake_form(intake_form)
+
+def _apply_form_update(intake_form: intake_models.IntakeForm, form_data: IntakeFormUpdate):
+    # Field dumps are debug-only; building them is skipped entirely otherwise
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received form data: %s", form_data.dict())
+    
+    # Before the fields, so an explicit last_updated in the update wins
+    _touch(intake_form)
+
+    # body_fat is set even when the client didn't mark it as explicitly set
+    if hasattr(form_data, 'body_fat') and form_data.body_fat is not None:
+        intake_form.body_fat = form_data.body_fat
+        
+    # Update the intake form with form_data
+    for key, value in form_data.dict(exclude_unset=True).items():
+        if key != 'body_fat' and hasattr(intake_form, key):  # Skip body_fat since we already set it
+            logger.debug("Setting %s = %s", key, value)
+            setattr(intake_form, key, value)
+
+def _apply_strength_measurements(db: Session, intake_form: intake_models.IntakeForm, strength_data: StrengthMeasurementsCreate):
+    # Check if strength measurements already exist
+    existing_measurements = db.query(intake_models.StrengthMeasurement).filter(
+        intake_models.StrengthMeasurement.user_id == intake_form.user_id
+    ).first()
+    
+    if existing_measurements:
+        # Update existing measurements
+        logger.debug("Updating existing strength measurements for user %s", intake_form.user_id)
+        for key, value in strength_data.dict().items():
+            if hasattr(existing_measurements, key):
+                setattr(existing_measurements, key, value)
+        
+        existing_measurements.last_updated = func.now()
+        measurement = existing_measurements
+    else:
+        # Create new strength measurements
+        logger.debug("Creating new strength measurements for user %s", intake_form.user_id)
+        measurement = intake_models.StrengthMeasurement(
+            user_id=intake_form.user_id,
+            form_id=intake_form.form_id,
+            **strength_data.dict(),
+            last_updated=func.now()
+        )
+        db.add(measurement)
+    
+    # Update strength2_completed in the intake form if needed
+    if strength_data.strength2_completed:
+        intake_form.strength2_completed = True
+    _touch(intake_form)
+    
+    return measurement
+
+def _apply_genetics(db: Session, intake_form: intake_models.IntakeForm, genetics_data: GeneticsUpdate):
+    user_id = intake_form.user_id
+    
+    # Check if genetics data already exists
+    existing_genetics = db.query(intake_models.Genetics).filter(
+        intake_models.Genetics.user_id == user_id
+    ).first()
+    
+    if existing_genetics:
+        # Update existing genetics data
+        logger.debug("Updating existing genetics data for user %s", user_id)
+        for key, value in genetics_data.dict(exclude_unset=True).items():
+            if hasattr(existing_genetics, key):
+                setattr(existing_genetics, key, value)
+        genetics = existing_genetics
+    else:
+        # Create new genetics data
+        logger.debug("Creating new genetics data for user %s", user_id)
+        genetics = intake_models.Genetics(
+            user_id=user_id,
+            form_id=intake_form.form_id,
+            **genetics_data.dict()
+        )
+        db.add(genetics)
+    
+    _touch(intake_form)
+    return genetics
+
+def _sync_equipment(db: Session, model, intake_form: intake_models.IntakeForm, equipment_list: List[str]):
+    """
+    Make a user's rows in an equipment table match equipment_list.
+
+    Only added types are inserted (one executemany) and only removed types are
+    deleted, so re-submitting an unchanged list writes nothing.
+    """
+    user_id = intake_form.user_id
+    # Skip empty entries and duplicates, keeping the submitted order
+    wanted = list(dict.fromkeys(e for e in equipment_list if e))
+
+    existing = {
+        row.equipment_type
+        for row in db.query(model.equipment_type).filter(model.user_id == user_id)
+    }
+    added = [e for e in wanted if e not in existing]
+    removed = [e for e in existing if e not in wanted and e is not None]
+
+    if removed:
+        db.query(model).filter(
+            model.user_id == user_id,
+            model.equipment_type.in_(removed)
+        ).delete(synchronize_session=False)
+
+    if added:
+        db.execute(insert(model), [
+            {"form_id": intake_form.form_id, "user_id": user_id, "equipment_type": e}
+            for e in added
+        ])
+
+    if added or removed:
+        _touch(intake_form)
+    return added, removed
+
+def _apply_cardio_equipment(db: Session, intake_form: intake_models.IntakeForm, equipment_list: List[str]):
+    added, removed = _sync_equipment(db, intake_models.CardioEquipment, intake_form, equipment_list)
+    logger.debug("Cardio equipment for user %s added: %s, removed: %s", intake_form.user_id, added, removed)
+
+def _apply_gym_equipment(db: Session, intake_form: intake_models.IntakeForm, equipment_list: List[str], leg_curl_type: Optional[str] = None):
+    # Save leg curl type in intake_forms
+    if leg_curl_type and leg_curl_type != intake_form.leg_curl_type:
+        intake_form.leg_curl_type = leg_curl_type
+        _touch(intake_form)
+
+    _sync_equipment(db, intake_models.GymEquipment, intake_form, equipment_list)
+
+def _apply_dumbbell_info(db: Session, intake_form: intake_models.IntakeForm, dumbbell_data: dict):
+    # Delete previous dumbbell info
+    db.query(intake_models.DumbbellInfo).filter(
+        intake_models.DumbbellInfo.user_id == intake_form.user_id
+    ).delete()
+
+    # Insert new dumbbell info
+    new_dumbbell = intake_models.DumbbellInfo(
+        form_id=intake_form.form_id,
+        user_id=intake_form.user_id,
+        is_full_set=dumbbell_data.get("is_full_set"),
+        min_weight=dumbbell_data.get("min_weight"),
+        max_weight=dumbbell_data.get("max_weight"),
+        specific_weights=dumbbell_data.get("specific_weights"),  # <-- Store free weights
+    )
+    db.add(new_dumbbell)
+    _touch(intake_form)
+
+
+def _intake_form_etag(form_id: int, version: int) -> str:
+    return make_etag(form_id, version)
+
+def _current_etag(db: Session, user_id: str) -> Optional[str]:
+    """
+    ETag of a user's intake form from its version (one indexed lookup), or None
+    when there is no intake form
+    """
+    row = db.query(intake_models.IntakeForm.form_id, intake_models.IntakeForm.version).filter(
+        intake_models.IntakeForm.user_id == user_id
+    ).first()
+    return _intake_form_etag(*row) if row else None
+
+def _query_document(db: Session):
+    """
+    Intake form query loading every section of the document up front. Validating
+    the document must not lazy-load: in async mode a lazy load switches greenlets
+    in the middle of pydantic's validator, which crashes under concurrent requests.
+    """
+    return db.query(intake_models.IntakeForm).options(
+        selectinload(intake_models.IntakeForm.cardio_equipment),
+        selectinload(intake_models.IntakeForm.gym_equipment),
+        selectinload(intake_models.IntakeForm.dumbbell_info),
+        selectinload(intake_models.IntakeForm.genetics),
+        selectinload(intake_models.IntakeForm.strength_measurements),
+        selectinload(intake_models.IntakeForm.address),
+        selectinload(intake_models.IntakeForm.body_photos),
+    )
+
+def _reload_document(db: Session, intake_form: intake_models.IntakeForm) -> Tuple[IntakeFormResponse, str]:
+    """
+    Document of an intake form just written, read back with all its sections
+    """
+    intake_form = _query_document(db).populate_existing().filter(
+        intake_models.IntakeForm.form_id == intake_form.form_id
+    ).one()
+    return _intake_form_document(intake_form)
+
+def _intake_form_document(intake_form: intake_models.IntakeForm) -> Tuple[IntakeFormResponse, str]:
+    """
+    Serialize a loaded intake form with the ETag of the version it was loaded at.
+    Sections are read after the form row, so the ETag can only be older than the
+    document, never newer.
+    """
+    etag = _intake_form_etag(intake_form.form_id, intake_form.version)
+    return IntakeFormResponse.model_validate(intake_form), etag
+
+def _document_response(body: bytes, etag: str) -> Response:
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+async def _cache_document(user_id: str, document: IntakeFormResponse, etag: str) -> Response:
+    """
+    Write a freshly built intake form document through to the cache and return it
+    """
+    body = dump_json(document)
+    await intake_form_cache.set(user_id, etag, body)
+    return _document_response(body, etag)
+
+# Projectable parts of the intake form document (GET ?fields=&include=)
+_FORM_MAPPER = intake_models.IntakeForm.__mapper__
+PROJECTION_COLUMNS = [name for name in IntakeFormResponse.model_fields if name in _FORM_MAPPER.column_attrs]
+PROJECTION_RELATIONSHIPS = [name for name in IntakeFormResponse.model_fields if name in _FORM_MAPPER.relationships]
+
+def _parse_names(value: Optional[str]) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()] if value else []
+
+def parse_projection(fields: Optional[str], include: Optional[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split ?fields= (columns and/or relationships) and ?include= (relationships)
+    into the columns and relationships to load.
+
+    Without fields every column is returned; relationships are only returned when named.
+    """
+    field_names, include_names = _parse_names(fields), _parse_names(include)
+    unknown = [name for name in field_names if name not in PROJECTION_COLUMNS and name not in PROJECTION_RELATIONSHIPS]
+    unknown += [name for name in include_names if name not in PROJECTION_RELATIONSHIPS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Expected columns: {', '.join(PROJECTION_COLUMNS)}; "
+                   f"relationships: {', '.join(PROJECTION_RELATIONSHIPS)}",
+        )
+
+    columns = [name for name in field_names if name in PROJECTION_COLUMNS] if field_names else list(PROJECTION_COLUMNS)
+    # An empty column list (fields naming only relationships) still needs a row, keyed by form_id
+    columns = columns or ["form_id"]
+    relationships = [name for name in PROJECTION_RELATIONSHIPS if name in field_names or name in include_names]
+    return columns, relationships
+
+@lru_cache(maxsize=128)
+def _projection_model(names: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Response model holding only the given IntakeFormResponse fields, so validation
+    reads just the loaded attributes and the compiled serializer can be used
+    """
+    return create_model(
+        "IntakeFormProjection",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (IntakeFormResponse.model_fields[name].annotation, IntakeFormResponse.model_fields[name]) for name in names},
+    )
+
+def _get_intake_form_projection(db: Session, user_id: str, columns: List[str], relationships: List[str]):
+    """
+    Load only the requested columns in one query, plus one selectin query per
+    requested relationship
+    """
+    form = intake_models.IntakeForm
+    intake_form = db.query(form).options(
+        load_only(*(getattr(form, name) for name in columns)),
+        *(selectinload(getattr(form, name)) for name in relationships),
+    ).filter(
+        form.user_id == user_id
+    ).first()
+
+    if not intake_form:
+        raise HTTPException(status_code=404, detail="Intake form not found")
+
+    return _projection_model(tuple(columns + relationships)).model_validate(intake_form)
+
 @router.put("/{email}", response_model=IntakeFormResponse)
-def update_intake_form(email: str, form_data: IntakeFormUpdate, db: Session = Depends(get_db)):
+async def update_intake_form(email: str, form_data: IntakeFormUpdate, resolved: tuple = Depends(get_or_create_intake_form), db: DbSession = Depends(get_db)):
     """
     Update an intake form
     """
+    # Read before the commit expires the user, which can't lazy-load outside run_sync
+    user_id = resolved[0].user_id
+    document, etag = await db.run_sync(_update_intake_form, email, form_data, resolved)
+    return await _cache_document(user_id, document, etag)
+
+def _update_intake_form(db: Session, email: str, form_data: IntakeFormUpdate, resolved: tuple):
     try:
-        # Find the user
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
-        
-        if not intake_form:
-            # Create new intake form if it doesn't exist
-            intake_form = intake_models.IntakeForm(
-                user_id=user.user_id,
-                email=email.lower()
-            )
-            db.add(intake_form)
-            
-        # Debug: Print the form_data
-        print(f"Received form data: {form_data.dict()}")
-        
-        # Special handling for body_fat to debug
-        if hasattr(form_data, 'body_fat') and form_data.body_fat is not None:
-            print(f"Setting body_fat directly = {form_data.body_fat}")
-            intake_form.body_fat = form_data.body_fat
-            
-        # Update the intake form with form_data
-        for key, value in form_data.dict(exclude_unset=True).items():
-            if key != 'body_fat' and hasattr(intake_form, key):  # Skip body_fat since we already set it
-                print(f"Setting {key} = {value}")
-                setattr(intake_form, key, value)
+        # The dependency creates the intake form if it doesn't exist
+        user, intake_form = resolved
+        _apply_form_update(intake_form, form_data)
         
         db.commit()
-        db.refresh(intake_form)
-        
-        # Debug: Print the intake form after update
-        print(f"After update: body_fat = {intake_form.body_fat}")
-        
-        return intake_form
+
+        return _reload_document(db, intake_form)
     except Exception as e:
         db.rollback()
-        print(f"Error updating intake form: {str(e)}")
+        logger.exception("Error updating intake form: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/{email}/strength-measurements", response_model=StrengthMeasurementsResponse)
-def save_strength_measurements(email: str, strength_data: StrengthMeasurementsCreate, db: Session = Depends(get_db)):
+async def save_strength_measurements(email: str, strength_data: StrengthMeasurementsCreate, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
     """
     Save strength measurements for a user
     """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_save_strength_measurements, email, strength_data, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return model_response(result)
+
+def _save_strength_measurements(db: Session, email: str, strength_data: StrengthMeasurementsCreate, resolved: tuple):
     try:
-        # Find the user
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
-        
-        if not intake_form:
-            raise HTTPException(status_code=404, detail="Intake form not found")
-            
-        # Check if strength measurements already exist
-        existing_measurements = db.query(intake_models.StrengthMeasurement).filter(
-            intake_models.StrengthMeasurement.user_id == user.user_id
-        ).first()
-        
-        if existing_measurements:
-            # Update existing measurements
-            print("Updating existing strength measurements")
-            for key, value in strength_data.dict().items():
-                if hasattr(existing_measurements, key):
-                    setattr(existing_measurements, key, value)
-            
-            existing_measurements.last_updated = func.now()
-            measurement = existing_measurements
-        else:
-            # Create new strength measurements
-            print("Creating new strength measurements")
-            measurement = intake_models.StrengthMeasurement(
-                user_id=user.user_id,
-                form_id=intake_form.form_id,
-                **strength_data.dict(),
-                last_updated=func.now()
-            )
-            db.add(measurement)
-        
-        # Update strength2_completed in the intake form if needed
-        if strength_data.strength2_completed:
-            intake_form.strength2_completed = True
-            intake_form.last_updated = func.now()
+        # User and intake form are resolved together by the dependency
+        user, intake_form = resolved
+        measurement = _apply_strength_measurements(db, intake_form, strength_data)
         
         db.commit()
         db.refresh(measurement)
         
-        return measurement
+        return StrengthMeasurementsResponse.model_validate(measurement)
     except Exception as e:
         db.rollback()
-        print(f"Error saving strength measurements: {str(e)}")
+        logger.exception("Error saving strength measurements: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/initialize/{email}")
-def initialize_intake_form(email: str, db: Session = Depends(get_db)):
+async def initialize_intake_form(email: str, resolved: tuple = Depends(get_optional_intake_form), db: DbSession = Depends(get_db)):
     """
     Initialize an empty intake form for a user
     """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_initialize_intake_form, email, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return result
+
+def _initialize_intake_form(db: Session, email: str, resolved: tuple):
     try:
-        # Check if user exists
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
         # Check if form already exists
-        form = db.query(intake_models.IntakeForm).filter(intake_models.IntakeForm.user_id == user.user_id).first()
+        user, form = resolved
         if form:
             return {"message": "Intake form already exists"}
         
         # Create new form with correct func.now() usage
         new_form = intake_models.IntakeForm(
             user_id=user.user_id,
-            email=email.lower(),
+            email=normalize_email(email),
             last_updated=func.now(),  # Use func.now() directly, not db.func.now()
             # Set default values for all non-nullable fields
             goals_completed=False,
@@ -161,235 +386,325 @@ def initialize_intake_form(email: str, db: Session = Depends(get_db)):
         return {"message": "Intake form initialized successfully"}
     except IntegrityError as e:
         db.rollback()
-        print(f"IntegrityError: {str(e)}")
+        logger.warning("IntegrityError initializing form: %s", e)
         raise HTTPException(status_code=400, detail="Database integrity error. Form might already exist.")
     except Exception as e:
         db.rollback()
-        print(f"Error initializing form: {str(e)}")
+        logger.exception("Error initializing form: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/{email}", response_model=IntakeFormResponse)
-def get_intake_form(email: str, db: Session = Depends(get_db)):
+async def get_intake_form(
+    email: str,
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated columns and/or relationships to return, e.g. goal1,goal2,goal3"),
+    include: Optional[str] = Query(None, description="Comma-separated relationships to return, e.g. strength_measurements"),
+    user_id: str = Depends(get_user_id),
+    db: DbSession = Depends(get_db),
+):
     """
     Get an intake form by user email
+
+    Supports If-None-Match: an unchanged form returns 304 without loading it.
+    Otherwise the cached document is served if it was built for the current ETag.
+
+    With fields= or include= only that part of the form is loaded and returned,
+    from a single narrow query (plus one per included relationship); partial
+    documents carry no ETag and are not cached.
     """
+    if fields or include:
+        columns, relationships = parse_projection(fields, include)
+        projection = await db.run_sync(_get_intake_form_projection, user_id, columns, relationships)
+        return model_response(projection)
+
+    # Validate first against the stored version. A document cached by a request
+    # that raced a write carries an older version's ETag and is not served.
+    etag = await db.run_sync(_current_etag, user_id)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Intake form not found")
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+
+    body = await intake_form_cache.get(user_id, etag)
+    if body is not None:
+        return _document_response(body, etag)
+
+    document, etag = await db.run_sync(_get_intake_form, email, user_id)
+    return await _cache_document(user_id, document, etag)
+
+def _get_intake_form(db: Session, email: str, user_id: str):
     try:
-        # Find the user by email
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
         # Find the intake form and eagerly load relationships
-        intake_form = db.query(intake_models.IntakeForm).options(
-            selectinload(intake_models.IntakeForm.cardio_equipment),
-            selectinload(intake_models.IntakeForm.gym_equipment),
-            selectinload(intake_models.IntakeForm.dumbbell_info),
-            selectinload(intake_models.IntakeForm.genetics),
-            selectinload(intake_models.IntakeForm.strength_measurements),
-            selectinload(intake_models.IntakeForm.address),
-            selectinload(intake_models.IntakeForm.body_photos),
-        ).filter(
-            intake_models.IntakeForm.user_id == user.user_id
+        intake_form = _query_document(db).filter(
+            intake_models.IntakeForm.user_id == user_id
         ).first()
         
         if not intake_form:
             raise HTTPException(status_code=404, detail="Intake form not found")
         
-        # Debug: Check cardio equipment
-        cardio_count = len(intake_form.cardio_equipment) if intake_form.cardio_equipment else 0
-        print(f"Found {cardio_count} cardio equipment items for user {user.user_id}")
-        for eq in (intake_form.cardio_equipment or []):
-            print(f"  - {eq.equipment_type}")
+        logger.debug("Found %d cardio equipment items for user %s", len(intake_form.cardio_equipment), user_id)
         
-        return intake_form
+        return _intake_form_document(intake_form)
     except Exception as e:
-        print(f"Error getting form: {str(e)}")
+        logger.exception("Error getting form: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/{email}/cardio-equipment")
-def save_user_cardio_equipment(email: str, equipment_data: dict, db: Session = Depends(get_db)):
+async def save_user_cardio_equipment(email: str, equipment_data: dict, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
     """
     Save user's cardio equipment selections
     """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_save_user_cardio_equipment, email, equipment_data, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return result
+
+def _save_user_cardio_equipment(db: Session, email: str, equipment_data: dict, resolved: tuple):
     try:
-        # Find the user
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
-        
-        if not intake_form:
-            raise HTTPException(status_code=404, detail="Intake form not found")
+        # User and intake form are resolved together by the dependency
+        user, intake_form = resolved
 
         # Get equipment list from request data
         equipment_list = equipment_data.get("equipment_list", [])
-        print(f"Saving cardio equipment for user {user.user_id}: {equipment_list}")
-        # Delete existing cardio equipment for this user
-        db.query(intake_models.CardioEquipment).filter(
-            intake_models.CardioEquipment.user_id == user.user_id
-        ).delete(synchronize_session=False)
-        
-        # Add new cardio equipment entries
-        for equipment_type in equipment_list:
-            if equipment_type:  # Only add non-empty equipment types
-                cardio_eq = intake_models.CardioEquipment(
-                    form_id=intake_form.form_id,
-                    user_id=user.user_id,
-                    equipment_type=equipment_type
-                )
-                db.add(cardio_eq)
-                print(f"Adding cardio equipment: {equipment_type}")
+        _apply_cardio_equipment(db, intake_form, equipment_list)
                 
         db.commit()
         
         return {"message": f"Successfully saved {len(equipment_list)} cardio equipment items"}
     except Exception as e:
         db.rollback()
-        print(f"Error saving cardio equipment: {str(e)}")
+        logger.exception("Error saving cardio equipment: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/{email}/gym-equipment")
-def save_user_gym_equipment(email: str, equipment_data: dict, db: Session = Depends(get_db)):
+async def save_user_gym_equipment(email: str, equipment_data: dict, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
     """
     Save user's gym equipment selections
     """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_save_user_gym_equipment, email, equipment_data, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return result
+
+def _save_user_gym_equipment(db: Session, email: str, equipment_data: dict, resolved: tuple):
     try:
-        # Find the user
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
-        
-        if not intake_form:
-            raise HTTPException(status_code=404, detail="Intake form not found")
+        # User and intake form are resolved together by the dependency
+        user, intake_form = resolved
         
         equipment_list = equipment_data.get("equipment_list", [])
         leg_curl_type = equipment_data.get("leg_curl_type")
-
-        # Save leg curl type in intake_forms
-        if leg_curl_type:
-            intake_form.leg_curl_type = leg_curl_type
-            db.commit()
-
-        # Delete previous gym equipment
-        db.query(intake_models.GymEquipment).filter(
-            intake_models.GymEquipment.user_id == user.user_id
-        ).delete()
-        # Insert new equipment
-        for equipment_type in equipment_list:
-            new_equipment = intake_models.GymEquipment(
-                form_id=intake_form.form_id,
-                user_id=user.user_id,
-                equipment_type=equipment_type
-            )
-            db.add(new_equipment)
+        _apply_gym_equipment(db, intake_form, equipment_list, leg_curl_type)
         db.commit()
         return {"success": True}
     except Exception as e:
         db.rollback()
-        print(f"Error saving gym equipment: {str(e)}")
+        logger.exception("Error saving gym equipment: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.post("/{email}/dumbbell-info")
-def save_user_dumbbell_info(email: str, dumbbell_data: dict, db: Session = Depends(get_db)):
+async def save_user_dumbbell_info(email: str, dumbbell_data: dict, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
     """
     Save user's dumbbell information
     """
-    try:
-        # Find the user
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
-        
-        if not intake_form:
-            raise HTTPException(status_code=404, detail="Intake form not found")
-
-        # Delete previous dumbbell info
-        db.query(intake_models.DumbbellInfo).filter(
-            intake_models.DumbbellInfo.user_id == user.user_id
-        ).delete()
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_save_user_dumbbell_info, email, dumbbell_data, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return result
 
-        # Insert new dumbbell info
-        new_dumbbell = intake_models.DumbbellInfo(
-            form_id=intake_form.form_id,
-            user_id=user.user_id,
-            is_full_set=dumbbell_data.get("is_full_set"),
-            min_weight=dumbbell_data.get("min_weight"),
-            max_weight=dumbbell_data.get("max_weight"),
-            specific_weights=dumbbell_data.get("specific_weights"),  # <-- Store free weights
-        )
-        db.add(new_dumbbell)
+def _save_user_dumbbell_info(db: Session, email: str, dumbbell_data: dict, resolved: tuple):
+    try:
+        # User and intake form are resolved together by the dependency
+        user, intake_form = resolved
+        _apply_dumbbell_info(db, intake_form, dumbbell_data)
         db.commit()
 
         return {"success": True}
     except Exception as e:
         db.rollback()
-        print(f"Error saving dumbbell info: {str(e)}")
+        logger.exception("Error saving dumbbell info: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Add this genetics endpoint if it doesn't exist
 
 @router.post("/{email}/genetics", response_model=GeneticsResponse)
-def save_genetics_data(email: str, genetics_data: GeneticsUpdate, db: Session = Depends(get_db)):
+async def save_genetics_data(email: str, genetics_data: GeneticsUpdate, resolved: tuple = Depends(require_intake_form), db: DbSession = Depends(get_db)):
     """
     Save genetics data for a user
     """
+    user_id = resolved[0].user_id
+    result = await db.run_sync(_save_genetics_data, email, genetics_data, resolved)
+    await intake_form_cache.invalidate(user_id)
+    return model_response(result)
+
+def _save_genetics_data(db: Session, email: str, genetics_data: GeneticsUpdate, resolved: tuple):
     try:
-        # Find the user
-        user = db.query(user_models.User).filter(user_models.User.email == email).first()
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-            
-        # Find the intake form
-        intake_form = db.query(intake_models.IntakeForm).filter(
-            intake_models.IntakeForm.user_id == user.user_id
-        ).first()
-        
-        if not intake_form:
-            raise HTTPException(status_code=404, detail="Intake form not found")
-            
-        # Check if genetics data already exists
-        existing_genetics = db.query(intake_models.Genetics).filter(
-            intake_models.Genetics.user_id == user.user_id
-        ).first()
-        
-        if existing_genetics:
-            # Update existing genetics data
-            print(f"Updating existing genetics data for user {user.user_id}")
-            for key, value in genetics_data.dict(exclude_unset=True).items():
-                if hasattr(existing_genetics, key):
-                    setattr(existing_genetics, key, value)
-            genetics = existing_genetics
-        else:
-            # Create new genetics data
-            print(f"Creating new genetics data for user {user.user_id}")
-            genetics = intake_models.Genetics(
-                user_id=user.user_id,
-                form_id=intake_form.form_id,
-                **genetics_data.dict()
-            )
-            db.add(genetics)
+        # User and intake form are resolved together by the dependency
+        user, intake_form = resolved
+        genetics = _apply_genetics(db, intake_form, genetics_data)
         
         db.commit()
         db.refresh(genetics)
         
-        print(f"Saved genetics data: {genetics.wrist_circumference}, {genetics.ankle_circumference}")
-        return genetics
+        return GeneticsResponse.model_validate(genetics)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error saving genetics data: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/{email}/body-photos", response_model=BodyPhotoResponse, status_code=status.HTTP_201_CREATED)
+async def upload_body_photo(email: str, request: Request, db: DbSession = Depends(get_db)):
+    """
+    Upload a body photo sent as the raw request body (Content-Type image/jpeg,
+    image/png or image/webp)
+
+    The body is streamed to storage rather than read into memory, before the user
+    and intake form are looked up, so a slow upload holds no database connection.
+    The photo is returned with variants_status "pending" while its thumbnail and
+    resized copies are rendered in the background. Uploading an image the user
+    already has returns the existing photo with 200.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > PHOTO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Photo exceeds {PHOTO_MAX_BYTES} bytes")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    # Stored by content hash, so a file left behind by a 404 below is reused by
+    # the next upload of the same image
+    stored = await store_upload(request.stream(), content_type)
+    photo, created, render = await db.run_sync(_save_body_photo, stored, email)
+    await intake_form_cache.invalidate(photo.user_id)
+    if render:
+        photo_processor.spawn(_render_body_photo_variants(stored))
+    return model_response(photo, status_code=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+def _user_photo(db: Session, user_id: str, content_hash: str) -> Optional[intake_models.BodyPhoto]:
+    BodyPhoto = intake_models.BodyPhoto
+    return db.query(BodyPhoto).filter(
+        BodyPhoto.user_id == user_id,
+        BodyPhoto.content_hash == content_hash
+    ).first()
+
+def _save_body_photo(db: Session, stored: StoredPhoto, email: str):
+    """
+    Record an upload; returns (photo, whether a row was created, whether variants must be rendered)
+    """
+    BodyPhoto = intake_models.BodyPhoto
+    user, intake_form = require_intake_form.resolve(db, email)
+    user_id = intake_form.user_id
+    try:
+        photo = _user_photo(db, user_id, stored.content_hash)
+        if photo is not None:
+            # Re-uploading retries variants that failed to render
+            render = photo.variants_status == "failed"
+            if render:
+                photo.variants_status = "pending"
+                _touch(intake_form)
+                db.commit()
+            return BodyPhotoResponse.model_validate(photo), False, render
+
+        # Identical image uploaded by someone else: its variants can be reused
+        rendered = db.query(BodyPhoto).filter(
+            BodyPhoto.content_hash == stored.content_hash,
+            BodyPhoto.variants_status == "ready"
+        ).first()
+        photo = BodyPhoto(
+            form_id=intake_form.form_id,
+            user_id=user_id,
+            photo_url=stored.url,
+            content_hash=stored.content_hash,
+            content_type=stored.content_type,
+            byte_size=stored.byte_size,
+            variants_status="ready" if rendered else "pending",
+            **{f"{name}_url": getattr(rendered, f"{name}_url") if rendered else None for name in VARIANTS},
+        )
+        db.add(photo)
+        _touch(intake_form)
+
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same image by this user inserted it first
+            # (unique on user_id, content_hash); that request renders the variants
+            db.rollback()
+            return BodyPhotoResponse.model_validate(_user_photo(db, user_id, stored.content_hash)), False, False
+        db.refresh(photo)
+
+        return BodyPhotoResponse.model_validate(photo), True, rendered is None
     except Exception as e:
         db.rollback()
-        print(f"Error saving genetics data: {str(e)}")
+        logger.exception("Error saving body photo: %s", e)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+async def _render_body_photo_variants(stored: StoredPhoto):
+    """
+    Background job: render the variants in the process pool, then record them on
+    every photo row with this content that is still waiting for them
+    """
+    urls, variants_status = await photo_processor.render(stored.path, stored.content_hash)
+    db = DbSession(SessionLocal())
+    try:
+        user_ids = await db.run_sync(_record_body_photo_variants, stored.content_hash, urls, variants_status)
+    finally:
+        await db.close()
+    for user_id in user_ids:
+        await intake_form_cache.invalidate(user_id)
+
+def _record_body_photo_variants(db: Session, content_hash: str, urls: dict, variants_status: str) -> List[str]:
+    BodyPhoto = intake_models.BodyPhoto
+    waiting = [BodyPhoto.content_hash == content_hash, BodyPhoto.variants_status == "pending"]
+    user_ids = [row.user_id for row in db.query(BodyPhoto.user_id).filter(*waiting).distinct()]
+    db.query(BodyPhoto).filter(*waiting).update(
+        {"variants_status": variants_status, **{f"{name}_url": url for name, url in urls.items()}},
+        synchronize_session=False,
+    )
+    for user_id in user_ids:
+        bump_form_version(db, user_id)
+    db.commit()
+    return user_ids
+
+
+
+@router.post("/{email}/submit", response_model=IntakeFormResponse)
+async def submit_intake_sections(email: str, submission: IntakeSubmit, resolved: tuple = Depends(get_or_create_intake_form), db: DbSession = Depends(get_db)):
+    """
+    Save any subset of intake sections in one request and one transaction
+    """
+    user_id = resolved[0].user_id
+    document, etag = await db.run_sync(_submit_intake_sections, submission, resolved)
+    return await _cache_document(user_id, document, etag)
+
+def _submit_intake_sections(db: Session, submission: IntakeSubmit, resolved: tuple):
+    try:
+        # The dependency creates the intake form if it doesn't exist
+        user, intake_form = resolved
+        if intake_form.form_id is None:
+            # Child rows need the form_id of a newly created form
+            db.flush()
+
+        if submission.intake is not None:
+            _apply_form_update(intake_form, submission.intake)
+        if submission.goals is not None:
+            apply_goals(intake_form, submission.goals)
+        if submission.strength_measurements is not None:
+            _apply_strength_measurements(db, intake_form, submission.strength_measurements)
+        if submission.genetics is not None:
+            _apply_genetics(db, intake_form, submission.genetics)
+        if submission.cardio_equipment is not None:
+            _apply_cardio_equipment(db, intake_form, submission.cardio_equipment.equipment_list)
+        if submission.gym_equipment is not None:
+            _apply_gym_equipment(
+                db,
+                intake_form,
+                submission.gym_equipment.equipment_list,
+                submission.gym_equipment.leg_curl_type
+            )
+        if submission.dumbbell_info is not None:
+            _apply_dumbbell_info(db, intake_form, submission.dumbbell_info.dict())
+
+        db.commit()
+
+        return _reload_document(db, intake_form)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Error submitting intake sections: %s", e)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.database import DbSession, engine, get_db
+from app.dependencies import intake_form_cache, user_id_cache
+from app.funnel import rebuild_counters
+from app.idempotency import idempotency_store
+from app.photos import photo_processor
+from app.pool_metrics import pool_snapshot
+from app.startup import startup_report
+from app.strength import strength_cache
+from app.strength_history import rebuild_rollups
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    include_in_schema=False,
+)
+
+@router.get("/pool")
+async def get_pool_metrics():
+    """
+    Connection pool counters and live pool state
+    """
+    return pool_snapshot(engine)
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """
+    Hit/miss counters and sizes of the in-process caches
+    """
+    return {
+        "user_id": user_id_cache.stats(),
+        "intake_form": intake_form_cache.stats(),
+        "strength_analytics": strength_cache.stats(),
+        "idempotency": idempotency_store.stats(),
+    }
+
+@router.get("/photos")
+async def get_photo_processing_metrics():
+    """
+    Body photo variant jobs: pool size, jobs in flight, completed and failed
+    """
+    return photo_processor.stats()
+
+@router.get("/ready")
+async def get_readiness():
+    """
+    200 once the database is reachable and the pool is warm, 503 until then
+    """
+    summary = startup_report.summary()
+    body = {key: summary[key] for key in ("ready", "ready_after_ms", "db_attempts", "db_error", "pending_migrations")}
+    body["pool"] = pool_snapshot(engine)
+    return JSONResponse(body, status_code=200 if startup_report.ready else 503)
+
+@router.get("/startup")
+async def get_startup_report():
+    """
+    Import and initialization cost per module / step, slowest first
+    """
+    return startup_report.summary()
+
+@router.post("/funnel/rebuild")
+async def rebuild_funnel_counters(db: DbSession = Depends(get_db)):
+    """
+    Recompute the onboarding funnel counters with a full scan of intake_forms,
+    e.g. after a bulk load that bypassed the ORM
+    """
+    forms = await db.run_sync(_rebuild_funnel_counters)
+    return {"total_forms": forms}
+
+def _rebuild_funnel_counters(db: Session):
+    forms = rebuild_counters(db.connection())
+    db.commit()
+    return forms
+
+@router.post("/strength-history/rebuild")
+async def rebuild_strength_history_rollups(db: DbSession = Depends(get_db)):
+    """
+    Recompute the weekly/monthly strength history rollups from strength_history,
+    e.g. after entries were loaded outside the ORM
+    """
+    rollups = await db.run_sync(_rebuild_strength_history_rollups)
+    return {"rollups": rollups}
+
+def _rebuild_strength_history_rollups(db: Session):
+    rollups = rebuild_rollups(db.connection())
+    db.commit()
+    return rollups
\ No newline at end of file
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import request_metrics
+
+router = APIRouter(
+    tags=["internal"],
+    include_in_schema=False,
+)
+
+# Content type Prometheus expects for the text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Per-route request counts, in-flight requests and latency histograms for Prometheus
+    """
+    return PlainTextResponse(request_metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
\ No newline at end of file
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
-from typing import List
 
-from app.database import get_db
+from app.data_versions import bump_form_version
+from app.database import DbSession, get_db
+from app.dependencies import get_user_id, intake_form_cache, normalize_email
 from app.models import user_models, schemas, intake_models
+from app.responses import model_response
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/users",
@@ -13,15 +19,19 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.UserResponse)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: schemas.UserCreate, db: DbSession = Depends(get_db)):
     """
     Create a new user
     """
-    # Print for debugging
-    print(f"Creating user with data: {user}")
+    return model_response(await db.run_sync(_create_user, user))
+
+def _create_user(db: Session, user: schemas.UserCreate):
+    logger.debug("Creating user with data: %s", user)
     
+    email = normalize_email(user.email)
+
     # Check if user exists
-    db_user = db.query(user_models.User).filter(user_models.User.email == user.email).first()
+    db_user = db.query(user_models.User).filter(user_models.User.email == email).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -29,65 +39,63 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         # Create new user
         db_user = user_models.User(
             user_id=user.user_id,
-            email=user.email,
+            email=email,
             full_name=user.full_name,
             phone_number=user.phone_number
         )
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
-        print(f"User created successfully: {db_user.user_id}")
+        logger.info("User created successfully: %s", db_user.user_id)
         
-        return db_user
+        return schemas.UserResponse.model_validate(db_user)
     except Exception as e:
         db.rollback()
-        print(f"Error creating user: {str(e)}")
+        logger.exception("Error creating user: %s", e)
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @router.get("/{email}", response_model=schemas.UserResponse)
-def get_user(email: str, db: Session = Depends(get_db)):
+async def get_user(email: str, db: DbSession = Depends(get_db)):
     """
     Get user by email
     """
-    user = db.query(user_models.User).filter(user_models.User.email == email).first()
+    return model_response(await db.run_sync(_get_user, email))
+
+def _get_user(db: Session, email: str):
+    user = db.query(user_models.User).filter(user_models.User.email == normalize_email(email)).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return user
+    return schemas.UserResponse.model_validate(user)
 
 @router.post("/{email}/address", response_model=schemas.AddressResponse)
-def create_user_address(email: str, address: schemas.AddressCreate, db: Session = Depends(get_db)):
+async def create_user_address(email: str, address: schemas.AddressCreate, user_id: str = Depends(get_user_id), db: DbSession = Depends(get_db)):
     """
     Create or update address for a user
     """
-    # Print debugging info
-    print(f"Creating address for email: {email}")
-    print(f"Address data: {address}")
-    
-    # Check if user exists
-    user = db.query(user_models.User).filter(user_models.User.email == email).first()
-    if not user:
-        print(f"User not found with email: {email}")
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    print(f"Found user with ID: {user.user_id}")
+    result = await db.run_sync(_create_user_address, email, address, user_id)
+    await intake_form_cache.invalidate(user_id)
+    return model_response(result)
+
+def _create_user_address(db: Session, email: str, address: schemas.AddressCreate, user_id: str):
+    logger.debug("Creating address for email: %s (user %s): %s", email, user_id, address)
     
     # Check if address exists in addresses table
-    db_address = db.query(intake_models.Address).filter(intake_models.Address.user_id == user.user_id).first()
+    db_address = db.query(intake_models.Address).filter(intake_models.Address.user_id == user_id).first()
     
     try:
         if db_address:
-            print("Updating existing address in addresses table")
+            logger.debug("Updating existing address in addresses table")
             # Update existing address
             for key, value in address.dict().items():
                 if hasattr(db_address, key):
                     setattr(db_address, key, value)
             db_address.address_updated_at = func.now()
         else:
-            print("Creating new address in addresses table")
+            logger.debug("Creating new address in addresses table")
             # Create new address with just user_id
             db_address = intake_models.Address(
-                user_id=user.user_id,
+                user_id=user_id,
                 house_number=address.house_number,
                 street=address.street,
                 postal_code=address.postal_code,
@@ -97,7 +105,7 @@ def create_user_address(email: str, address: schemas.AddressCreate, db: Session
             db.add(db_address)
         
         # Also update/create in user_addresses table for backward compatibility
-        user_address = db.query(user_models.UserAddress).filter(user_models.UserAddress.user_id == user.user_id).first()
+        user_address = db.query(user_models.UserAddress).filter(user_models.UserAddress.user_id == user_id).first()
         if user_address:
             for key, value in address.dict().items():
                 if hasattr(user_address, key):
@@ -105,7 +113,7 @@ def create_user_address(email: str, address: schemas.AddressCreate, db: Session
             user_address.address_updated_at = func.now()
         else:
             user_address = user_models.UserAddress(
-                user_id=user.user_id,
+                user_id=user_id,
                 house_number=address.house_number,
                 street=address.street,
                 postal_code=address.postal_code,
@@ -113,13 +121,15 @@ def create_user_address(email: str, address: schemas.AddressCreate, db: Session
                 country=address.country
             )
             db.add(user_address)
+        # The address is part of the intake form document
+        bump_form_version(db, user_id)
         
         db.commit()
         db.refresh(db_address)
-        print("Address saved successfully")
+        logger.debug("Address saved successfully")
         
-        return db_address
+        return schemas.AddressResponse.model_validate(db_address)
     except Exception as e:
         db.rollback()
-        print(f"Error saving address: {str(e)}")
+        logger.exception("Error saving address: %s", e)
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,132 @@
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import env_float, env_int
+
+# Taken when app.main first imports this module, i.e. as early as the app can measure
+PROCESS_START = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+# Connections opened concurrently at boot so the first requests find a warm pool
+DB_WARM_CONNECTIONS = env_int("DB_WARM_CONNECTIONS", 2)
+# Backoff between attempts while the database is unreachable
+DB_CONNECT_RETRY_INITIAL = env_float("DB_CONNECT_RETRY_INITIAL", 0.5)
+DB_CONNECT_RETRY_MAX = env_float("DB_CONNECT_RETRY_MAX", 10)
+
+
+class StartupReport:
+    """
+    Wall-clock cost of each import and initialization step, plus readiness state
+    """
+
+    def __init__(self):
+        self.phases: List[dict] = []
+        self.ready = False
+        self.ready_at: Optional[float] = None
+        self.db_attempts = 0
+        self.db_error: Optional[str] = None
+        self.pending_migrations: List[str] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({
+                "name": name,
+                "start_ms": round((start - PROCESS_START) * 1000, 2),
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+            })
+
+    def import_module(self, name: str):
+        """
+        Import a module, recording its (and its not-yet-imported dependencies') cost
+        """
+        with self.phase(f"import {name}"):
+            return importlib.import_module(name)
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        self.ready_at = time.perf_counter()
+        self.db_error = None
+
+    def summary(self) -> dict:
+        return {
+            "ready": self.ready,
+            "ready_after_ms": round((self.ready_at - PROCESS_START) * 1000, 2) if self.ready_at else None,
+            "db_attempts": self.db_attempts,
+            "db_error": self.db_error,
+            "pending_migrations": self.pending_migrations,
+            "phases": sorted(self.phases, key=lambda phase: phase["ms"], reverse=True),
+        }
+
+
+startup_report = StartupReport()
+
+
+async def _open_connections(engine, count: int) -> None:
+    """
+    Check out `count` connections at once and return them, leaving them pooled
+    """
+    if hasattr(engine, "sync_engine"):
+        connections = [await engine.connect() for _ in range(count)]
+        for conn in connections:
+            await conn.close()
+        return
+
+    def _open():
+        connections = [engine.connect() for _ in range(count)]
+        for conn in connections:
+            conn.close()
+
+    await run_in_threadpool(_open)
+
+
+async def warm_up(engine, report: StartupReport = startup_report) -> None:
+    """
+    Connect to the database in the background, retrying with backoff, then warm the pool.
+
+    The app serves requests (and /internal/ready answers 503) while this runs, so a
+    database that is briefly unavailable delays readiness instead of failing the boot.
+    """
+    from app.migrations import pending_migrations, run_migrations
+
+    delay = DB_CONNECT_RETRY_INITIAL
+    while True:
+        report.db_attempts += 1
+        try:
+            with report.phase("database connect + migration check"):
+                pending = await run_migrations(engine, pending_migrations)
+            # SQLite's default pool does not keep several connections around
+            warm = 1 if engine.dialect.name == "sqlite" else DB_WARM_CONNECTIONS
+            with report.phase(f"warm pool ({warm} connections)"):
+                await _open_connections(engine, warm)
+            break
+        except Exception as e:
+            report.db_error = f"{type(e).__name__}: {e}"
+            logger.warning("Database not reachable (attempt %d), retrying in %.1fs: %s", report.db_attempts, delay, report.db_error)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DB_CONNECT_RETRY_MAX)
+
+    report.pending_migrations = [migration.name for migration in pending]
+    if pending:
+        logger.warning(
+            "Database schema is behind: %d pending migration(s) (%s); run `python -m app.migrations upgrade`",
+            len(pending),
+            ", ".join(report.pending_migrations),
+        )
+
+    report.mark_ready()
+    logger.info(
+        "Ready %.0f ms after process start",
+        (report.ready_at - PROCESS_START) * 1000,
+        extra={"phases": {phase["name"]: phase["ms"] for phase in report.phases}},
+    )
\ No newline at end of file
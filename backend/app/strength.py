@@ -0,0 +1,389 @@
+"""
+Strength analytics computed for every user at once.
+
+All strength measurements (with the owner's bodyweight and age) are loaded into
+NumPy arrays, and each metric is one array expression over all users:
+- estimated 1RM per lift with several formulas, plus their mean
+- strength relative to bodyweight
+- percentile ranks within cohorts (everyone, age band, weight class)
+- per-cohort quantile tables
+
+The result is cached in-process and rebuilt only when the "strength" data version
+changes; writes to strength measurements, or to a form's weight/age, bump it
+after they commit. One request at a time rebuilds it; the others keep being
+served the previous snapshot meanwhile.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import object_session
+
+from app.data_versions import mark_changed, read_version
+from app.database import DbSession, SessionLocal
+from app.models import intake_models
+from app.models.schemas import StrengthCohortRow, StrengthCohortTable, StrengthLiftAnalytics, UserStrengthAnalytics
+from app.units import LIFTS
+
+logger = logging.getLogger(__name__)
+
+STRENGTH_VERSION = "strength"
+
+# e1RM = f(weight, reps); reps outside 1..MAX_REPS give no estimate
+FORMULAS = {
+    "epley": lambda weight, reps: weight * (1 + reps / 30),
+    "brzycki": lambda weight, reps: weight * 36 / (37 - reps),
+    "lander": lambda weight, reps: 100 * weight / (101.3 - 2.67123 * reps),
+    "lombardi": lambda weight, reps: weight * reps ** 0.10,
+    "mayhew": lambda weight, reps: 100 * weight / (52.2 + 41.9 * np.exp(-0.055 * reps)),
+    "oconner": lambda weight, reps: weight * (1 + reps / 40),
+    "wathen": lambda weight, reps: 100 * weight / (48.8 + 53.8 * np.exp(-0.075 * reps)),
+}
+MAX_REPS = 15
+
+# Chin-up weight is load added to the body, so the lifted load includes bodyweight
+BODYWEIGHT_LIFTS = {"chin_up"}
+
+# Cohort dimensions: lower bin edges (age in years, bodyweight in kg)
+AGE_BANDS = [18, 25, 35, 45, 55, 65]
+WEIGHT_CLASSES = [60, 70, 80, 90, 100, 110, 120]
+COHORTS = ["all", "age_band", "weight_class"]
+QUANTILES = [10, 25, 50, 75, 90]
+
+_STRENGTH = intake_models.StrengthMeasurement.__table__
+_FORMS = intake_models.IntakeForm.__table__
+
+
+def estimate_1rm(weight: np.ndarray, reps: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Estimated one-rep max per formula; a single rep is the 1RM itself
+    """
+    valid = (reps >= 1) & (reps <= MAX_REPS)
+    estimates = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, formula in FORMULAS.items():
+            estimate = np.where(reps == 1, weight, formula(weight, reps))
+            estimates[name] = np.where(valid, estimate, np.nan)
+    return estimates
+
+
+def combined_1rm(estimates: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    The reported e1RM: mean of the formula estimates
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.mean(np.vstack(list(estimates.values())), axis=0)
+
+
+@dataclass
+class Cohort:
+    # Group index per user (-1: unknown) and the group names
+    codes: np.ndarray
+    names: List[str]
+
+    def label(self, i: int) -> Optional[str]:
+        return self.names[self.codes[i]] if self.codes[i] >= 0 else None
+
+
+def _binned(values: np.ndarray, edges: List[float], unit: str) -> Cohort:
+    """
+    Bin values into ranges such as "25-34" / "80-89kg"; NaN is unknown
+    """
+    names = [f"<{edges[0]}{unit}"]
+    names += [f"{low}-{high - 1}{unit}" for low, high in zip(edges, edges[1:])]
+    names += [f"{edges[-1]}+{unit}"]
+    codes = np.where(np.isnan(values), -1, np.digitize(np.nan_to_num(values), edges))
+    return Cohort(codes=codes, names=names)
+
+
+def percentile_ranks(values: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """
+    Percentile rank (0-100, ties share the mean rank) of each value within its group.
+
+    One sort by (group, value) ranks every group at once.
+    """
+    ranks = np.full(len(values), np.nan)
+    positions = np.flatnonzero(~np.isnan(values) & (groups >= 0))
+    if not len(positions):
+        return ranks
+    order = np.lexsort((values[positions], groups[positions]))
+    positions = positions[order]
+    sorted_groups, sorted_values = groups[positions], values[positions]
+    count = len(positions)
+
+    # Runs of equal values within a group, and the groups themselves
+    new_group = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    new_run = new_group | np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    group_starts = np.flatnonzero(new_group)
+    group_sizes = np.diff(np.r_[group_starts, count])
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.r_[run_starts[1:], count]
+    group_of = np.cumsum(new_group) - 1
+    run_of = np.cumsum(new_run) - 1
+
+    below = run_starts[run_of] - group_starts[group_of]
+    at_or_below = run_ends[run_of] - group_starts[group_of]
+    ranks[positions] = (below + at_or_below) / 2 / group_sizes[group_of] * 100
+    return ranks
+
+
+@dataclass
+class StrengthSnapshot:
+    version: int
+    user_ids: np.ndarray
+    bodyweight: np.ndarray
+    cohorts: Dict[str, Cohort]
+    weight: Dict[str, np.ndarray]
+    reps: Dict[str, np.ndarray]
+    estimates: Dict[str, Dict[str, np.ndarray]]
+    e1rm: Dict[str, np.ndarray]
+    relative: Dict[str, np.ndarray]
+    # percentiles[lift][cohort] -> {"e1rm": ranks, "relative": ranks}
+    percentiles: Dict[str, Dict[str, Dict[str, np.ndarray]]]
+    index: Dict[str, int]
+    computed_ms: float
+    # Cohort tables built from this snapshot, by (cohort, lifts)
+    tables: Dict[tuple, StrengthCohortTable] = field(default_factory=dict)
+
+
+def _load(db) -> Dict[str, np.ndarray]:
+    """
+    One row per user with strength data (the latest measurement row if there are several)
+    """
+    columns = [_STRENGTH.c.user_id, _FORMS.c.weight_kg, _FORMS.c.age_years]
+    for lift in LIFTS:
+        columns += [_STRENGTH.c[f"{lift}_weight_kg"], _STRENGTH.c[f"{lift}_reps_count"]]
+    rows = db.execute(
+        select(*columns)
+        .select_from(_STRENGTH.outerjoin(_FORMS, _FORMS.c.user_id == _STRENGTH.c.user_id))
+        .order_by(_STRENGTH.c.measurement_id)
+    ).all()
+
+    names = [column.name for column in columns]
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    # Later rows win, so this keeps each user's latest measurement
+    latest = np.fromiter({user_id: i for i, user_id in enumerate(values[0])}.values(), dtype=np.intp)
+    arrays = {"user_id": np.asarray(values[0], dtype=object)[latest]}
+    for name, column in zip(names[1:], values[1:]):
+        # None becomes NaN
+        arrays[name] = np.asarray(column, dtype=np.float64)[latest]
+    return arrays
+
+
+def compute(db, version: int) -> StrengthSnapshot:
+    started = time.perf_counter()
+    data = _load(db)
+    user_ids = data["user_id"]
+    bodyweight = data["weight_kg"]
+    cohorts = {
+        "all": Cohort(codes=np.zeros(len(user_ids), dtype=np.intp), names=["all"]),
+        "age_band": _binned(data["age_years"], AGE_BANDS, ""),
+        "weight_class": _binned(bodyweight, WEIGHT_CLASSES, "kg"),
+    }
+
+    weight, reps, estimates, e1rm, relative, percentiles = {}, {}, {}, {}, {}, {}
+    for lift in LIFTS:
+        load = data[f"{lift}_weight_kg"]
+        if lift in BODYWEIGHT_LIFTS:
+            load = load + bodyweight
+        weight[lift] = load
+        reps[lift] = data[f"{lift}_reps_count"]
+        estimates[lift] = estimate_1rm(load, reps[lift])
+        e1rm[lift] = combined_1rm(estimates[lift])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            relative[lift] = e1rm[lift] / bodyweight
+        percentiles[lift] = {
+            cohort: {
+                "e1rm": percentile_ranks(e1rm[lift], groups.codes),
+                "relative": percentile_ranks(relative[lift], groups.codes),
+            }
+            for cohort, groups in cohorts.items()
+        }
+
+    return StrengthSnapshot(
+        version=version,
+        user_ids=user_ids,
+        bodyweight=bodyweight,
+        cohorts=cohorts,
+        weight=weight,
+        reps=reps,
+        estimates=estimates,
+        e1rm=e1rm,
+        relative=relative,
+        percentiles=percentiles,
+        index={user_id: i for i, user_id in enumerate(user_ids.tolist())},
+        computed_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
+
+
+def _number(value, decimals: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), decimals)
+
+
+def user_analytics(snapshot: StrengthSnapshot, user_id: str) -> Optional[UserStrengthAnalytics]:
+    i = snapshot.index.get(user_id)
+    if i is None:
+        return None
+
+    lifts = []
+    for lift in LIFTS:
+        if np.isnan(snapshot.e1rm[lift][i]):
+            continue
+        lifts.append(StrengthLiftAnalytics(
+            lift=lift,
+            load_kg=_number(snapshot.weight[lift][i]),
+            reps=int(snapshot.reps[lift][i]),
+            e1rm_kg=_number(snapshot.e1rm[lift][i]),
+            estimates_kg={name: _number(values[i]) for name, values in snapshot.estimates[lift].items()},
+            relative_strength=_number(snapshot.relative[lift][i], 3),
+            percentiles={
+                cohort: {metric: _number(ranks[i], 1) for metric, ranks in metrics.items()}
+                for cohort, metrics in snapshot.percentiles[lift].items()
+                if snapshot.cohorts[cohort].codes[i] >= 0
+            },
+        ))
+
+    return UserStrengthAnalytics(
+        user_id=user_id,
+        bodyweight_kg=_number(snapshot.bodyweight[i]),
+        cohorts={name: cohort.label(i) for name, cohort in snapshot.cohorts.items() if cohort.codes[i] >= 0},
+        lifts=lifts,
+        version=snapshot.version,
+    )
+
+
+def cohort_table(snapshot: StrengthSnapshot, cohort: str, lifts: List[str]) -> StrengthCohortTable:
+    """
+    Per group and lift: user count and quantiles of e1RM and relative strength.
+    Built once per snapshot.
+    """
+    key = (cohort, tuple(lifts))
+    table = snapshot.tables.get(key)
+    if table is not None:
+        return table
+
+    groups = snapshot.cohorts[cohort]
+    rows = []
+    for code, group in enumerate(groups.names):
+        members = groups.codes == code
+        for lift in lifts:
+            e1rm = snapshot.e1rm[lift][members]
+            e1rm = e1rm[~np.isnan(e1rm)]
+            if not len(e1rm):
+                continue
+            relative = snapshot.relative[lift][members]
+            relative = relative[~np.isnan(relative)]
+            rows.append(StrengthCohortRow(
+                group=group,
+                lift=lift,
+                users=len(e1rm),
+                e1rm_kg=dict(zip((f"p{q}" for q in QUANTILES), np.round(np.percentile(e1rm, QUANTILES), 2).tolist())),
+                relative_strength=dict(zip(
+                    (f"p{q}" for q in QUANTILES),
+                    np.round(np.percentile(relative, QUANTILES), 3).tolist() if len(relative) else [None] * len(QUANTILES),
+                )),
+            ))
+    table = snapshot.tables[key] = StrengthCohortTable(cohort=cohort, rows=rows, version=snapshot.version)
+    return table
+
+
+class StrengthAnalyticsCache:
+    """
+    The latest snapshot, reused while the stored data version is unchanged.
+
+    Refreshes are single-flight: the request that finds the snapshot out of date
+    starts the computation and waits for it, requests arriving meanwhile get the
+    previous snapshot (or wait for the same computation when there is none yet).
+    The computation runs on its own session, so it outlives a cancelled request.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[StrengthSnapshot] = None
+        self._refresh: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    async def get(self, db: DbSession) -> StrengthSnapshot:
+        version = await db.run_sync(read_version, STRENGTH_VERSION)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version >= version:
+            self.hits += 1
+            return snapshot
+
+        refresh = self._refresh
+        if refresh is None:
+            self.misses += 1
+            refresh = self._refresh = asyncio.create_task(self._compute(version))
+            refresh.add_done_callback(self._refreshed)
+        elif snapshot is not None:
+            self.stale += 1
+            return snapshot
+        return await asyncio.shield(refresh)
+
+    async def _compute(self, version: int) -> StrengthSnapshot:
+        db = DbSession(SessionLocal())
+        try:
+            snapshot = await db.run_sync(compute, version)
+        finally:
+            await db.close()
+        logger.info("Computed strength analytics for %d users in %.0f ms (version %d)", len(snapshot.user_ids), snapshot.computed_ms, version)
+        if self._snapshot is None or self._snapshot.version <= version:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _refreshed(self, task: asyncio.Task) -> None:
+        self._refresh = None
+        # Retrieve a failure even when every waiter was cancelled; waiters get it raised
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Computing strength analytics failed", exc_info=task.exception())
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else None,
+            "users": len(snapshot.user_ids) if snapshot else 0,
+            "computed_ms": snapshot.computed_ms if snapshot else None,
+            "refreshing": self._refresh is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+        }
+
+
+strength_cache = StrengthAnalyticsCache()
+
+
+# Invalidation: any write the snapshot depends on bumps the version once it commits
+
+_STRENGTH_INPUTS = [f"{lift}_{suffix}" for lift in LIFTS for suffix in ("weight_kg", "reps_count")]
+# measurement_system changes re-derive the strength columns outside the ORM (app.units)
+_FORM_INPUTS = ["weight_kg", "age_years", "measurement_system"]
+
+
+def _changed(target, names: List[str]) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+@event.listens_for(intake_models.StrengthMeasurement, "after_insert")
+@event.listens_for(intake_models.StrengthMeasurement, "after_delete")
+@event.listens_for(intake_models.IntakeForm, "after_delete")
+def _strength_rows_changed(mapper, connection, target):
+    mark_changed(object_session(target), STRENGTH_VERSION)
+
+
+@event.listens_for(intake_models.StrengthMeasurement, "after_update")
+def _strength_updated(mapper, connection, target):
+    if _changed(target, _STRENGTH_INPUTS):
+        mark_changed(object_session(target), STRENGTH_VERSION)
+
+
+@event.listens_for(intake_models.IntakeForm, "after_update")
+def _form_updated(mapper, connection, target):
+    if _changed(target, _FORM_INPUTS):
+        mark_changed(object_session(target), STRENGTH_VERSION)
\ No newline at end of file
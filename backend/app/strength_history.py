@@ -0,0 +1,429 @@
+"""
+Append-only strength history with weekly and monthly rollups.
+
+strength_measurements keeps one row per user that every save overwrites. Each
+insert or update that changes a lift's numbers also appends a strength_history
+row for that lift, and folds it into the user's weekly and monthly rollup rows,
+in the same transaction as the save. Trend queries read the rollups, so their
+cost grows with the number of periods returned, not with the length of a
+user's history.
+
+Entries are dated by the database's clock, the one the TIMESTAMP server defaults
+(last_updated) use, so imported and live entries share one time base whatever the
+server's time zone. Rollups are merged with one INSERT ... ON DUPLICATE KEY UPDATE
+(MySQL) or ON CONFLICT DO UPDATE (SQLite), so concurrent first entries for a
+period cannot both insert it.
+
+Writes that bypass the ORM are not logged; bulk loads can append entry_rows()
+with append_entries(), or use import_current_measurements() and
+rebuild_rollups(), and in-place rewrites can log what they changed with
+append_changes() (app.units does when a measurement system changes).
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, literal, or_, select, update
+from sqlalchemy.dialects import mysql, sqlite
+
+from app.config import env_int
+from app.models import intake_models
+from app.models.schemas import StrengthHistoryPoint, StrengthTrendPoint, StrengthTrendSeries
+from app.strength import BODYWEIGHT_LIFTS, combined_1rm, estimate_1rm
+from app.units import LIFTS
+
+logger = logging.getLogger(__name__)
+
+HISTORY_BATCH_SIZE = env_int("STRENGTH_HISTORY_BATCH_SIZE", 5000)
+
+PERIODS = ["week", "month"]
+# Lifts are stored as their position in LIFTS
+LIFT_CODES = {lift: code for code, lift in enumerate(LIFTS)}
+
+_HISTORY = intake_models.StrengthHistoryEntry.__table__
+_ROLLUPS = intake_models.StrengthHistoryRollup.__table__
+_STRENGTH = intake_models.StrengthMeasurement.__table__
+_FORMS = intake_models.IntakeForm.__table__
+
+_ENTRY_COLUMNS = [_HISTORY.c.lift, _HISTORY.c.recorded_at, _HISTORY.c.weight_kg, _HISTORY.c.reps, _HISTORY.c.e1rm_kg]
+
+
+def period_start(period: str, day: date) -> date:
+    """
+    First day of the week (Monday) or month containing day
+    """
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def database_now(connection) -> datetime:
+    """
+    The database's current time, as the TIMESTAMP server defaults record it
+    """
+    return connection.execute(select(func.now())).scalar()
+
+
+def _optional(value) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def entry_rows(user_ids: Sequence[str], recorded_at: Sequence[datetime], lifts: Sequence[str],
+                weight: Sequence, reps: Sequence, bodyweight: Sequence) -> List[dict]:
+    """
+    strength_history rows for parallel sequences of results, e1RMs computed in one pass
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    load = weight + np.where(
+        [lift in BODYWEIGHT_LIFTS for lift in lifts], np.asarray(bodyweight, dtype=np.float64), 0.0
+    )
+    e1rm = combined_1rm(estimate_1rm(load, reps)) if len(lifts) else np.empty(0)
+    return [
+        {
+            "user_id": user_ids[i],
+            "lift": LIFT_CODES[lifts[i]],
+            "recorded_at": recorded_at[i],
+            "weight_kg": _optional(weight[i]),
+            "reps": None if np.isnan(reps[i]) else int(reps[i]),
+            "e1rm_kg": _optional(e1rm[i]),
+        }
+        for i in range(len(lifts))
+    ]
+
+
+def _greater(current: Optional[float], value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return current
+    return value if current is None or value > current else current
+
+
+def _accumulate(rollups: Dict[tuple, dict], entries: List[dict]) -> None:
+    """
+    Fold entries into rollup rows keyed by (user_id, lift, period, period_start)
+    """
+    for entry in entries:
+        e1rm = entry["e1rm_kg"]
+        day = entry["recorded_at"].date()
+        for period in PERIODS:
+            key = (entry["user_id"], entry["lift"], period, period_start(period, day))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = {
+                    "user_id": key[0], "lift": key[1], "period": key[2], "period_start": key[3],
+                    "entries": 0, "e1rm_entries": 0, "e1rm_sum_kg": 0.0,
+                    "best_e1rm_kg": None, "max_weight_kg": None, "last_e1rm_kg": None, "last_at": None,
+                }
+            rollup["entries"] += 1
+            if e1rm is not None:
+                rollup["e1rm_entries"] += 1
+                rollup["e1rm_sum_kg"] += e1rm
+            rollup["best_e1rm_kg"] = _greater(rollup["best_e1rm_kg"], e1rm)
+            rollup["max_weight_kg"] = _greater(rollup["max_weight_kg"], entry["weight_kg"])
+            if rollup["last_at"] is None or entry["recorded_at"] >= rollup["last_at"]:
+                rollup["last_e1rm_kg"] = e1rm
+                rollup["last_at"] = entry["recorded_at"]
+
+
+def _merged_values(new) -> dict:
+    """
+    Column updates adding new (the incoming row's values, by column name) to the stored rollup
+    """
+    columns = _ROLLUPS.c
+    values = {
+        "entries": columns.entries + new["entries"],
+        "e1rm_entries": columns.e1rm_entries + new["e1rm_entries"],
+        "e1rm_sum_kg": columns.e1rm_sum_kg + new["e1rm_sum_kg"],
+        # New entries are the latest ones
+        "last_e1rm_kg": new["last_e1rm_kg"],
+        "last_at": new["last_at"],
+    }
+    for name in ("best_e1rm_kg", "max_weight_kg"):
+        # A NULL new value compares as unknown, which keeps the stored one
+        values[name] = case((or_(columns[name].is_(None), columns[name] < new[name]), new[name]), else_=columns[name])
+    return values
+
+
+def _merge_rollup(connection, rollup: dict) -> None:
+    """
+    Add a rollup of new entries to the stored one (atomic column updates), or insert it
+    """
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        statement = mysql.insert(_ROLLUPS).values(**rollup)
+        connection.execute(statement.on_duplicate_key_update(_merged_values(statement.inserted)))
+        return
+    if dialect == "sqlite":
+        statement = sqlite.insert(_ROLLUPS).values(**rollup)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(_ROLLUPS.primary_key.columns),
+            set_=_merged_values(statement.excluded),
+        ))
+        return
+
+    # No upsert for other databases: update, then insert if there was nothing to update
+    columns = _ROLLUPS.c
+    values = _merged_values({name: literal(value, columns[name].type) for name, value in rollup.items()})
+    result = connection.execute(
+        update(_ROLLUPS)
+        .where(
+            columns.user_id == rollup["user_id"],
+            columns.lift == rollup["lift"],
+            columns.period == rollup["period"],
+            columns.period_start == rollup["period_start"],
+        )
+        .values(**values)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(_ROLLUPS).values(**rollup))
+
+
+def append_entries(connection, entries: List[dict], new_users: bool = False) -> None:
+    """
+    Append entry_rows() to the history and fold them into the rollups.
+
+    With new_users (none of the users has history yet, e.g. a bulk import) the
+    rollups are inserted with one executemany instead of merged row by row.
+    """
+    if not entries:
+        return
+    connection.execute(insert(_HISTORY), entries)
+
+    rollups = {}
+    _accumulate(rollups, entries)
+    if new_users:
+        connection.execute(insert(_ROLLUPS), list(rollups.values()))
+        return
+    for rollup in rollups.values():
+        _merge_rollup(connection, rollup)
+
+
+def _bodyweight(connection, user_id: str) -> Optional[float]:
+    return connection.execute(select(_FORMS.c.weight_kg).where(_FORMS.c.user_id == user_id)).scalar()
+
+
+def _append(connection, target, lifts: List[str]) -> None:
+    if not lifts:
+        return
+    bodyweight = _bodyweight(connection, target.user_id) if BODYWEIGHT_LIFTS.intersection(lifts) else None
+    entries = entry_rows(
+        [target.user_id] * len(lifts),
+        [database_now(connection)] * len(lifts),
+        lifts,
+        [getattr(target, f"{lift}_weight_kg") for lift in lifts],
+        [getattr(target, f"{lift}_reps_count") for lift in lifts],
+        [bodyweight] * len(lifts),
+    )
+    append_entries(connection, entries)
+
+
+def append_changes(connection, user_id: str, before: Dict[str, object], after: Dict[str, object],
+                   bodyweight: Optional[float]) -> None:
+    """
+    Log the lifts whose numbers differ between two sets of a measurement's
+    *_weight_kg / *_reps_count values, for writes that bypass the mapper events
+    (app.units renormalizing after a measurement system change)
+    """
+    lifts = [
+        lift for lift in LIFTS
+        if any(before[f"{lift}_{part}"] != after[f"{lift}_{part}"] for part in ("weight_kg", "reps_count"))
+    ]
+    if not lifts:
+        return
+    entries = entry_rows(
+        [user_id] * len(lifts),
+        [database_now(connection)] * len(lifts),
+        lifts,
+        [after[f"{lift}_weight_kg"] for lift in lifts],
+        [after[f"{lift}_reps_count"] for lift in lifts],
+        [bodyweight] * len(lifts),
+    )
+    append_entries(connection, entries)
+
+
+@event.listens_for(intake_models.StrengthMeasurement, "after_insert")
+def _log_inserted_strength(mapper, connection, target):
+    _append(connection, target, [
+        lift for lift in LIFTS
+        if getattr(target, f"{lift}_weight_kg") is not None or getattr(target, f"{lift}_reps_count") is not None
+    ])
+
+
+@event.listens_for(intake_models.StrengthMeasurement, "after_update")
+def _log_updated_strength(mapper, connection, target):
+    state = inspect(target)
+    _append(connection, target, [
+        lift for lift in LIFTS
+        if state.attrs[f"{lift}_weight_kg"].history.has_changes() or state.attrs[f"{lift}_reps_count"].history.has_changes()
+    ])
+
+
+# Bulk maintenance
+
+def import_current_measurements(conn, batch_size: int = HISTORY_BATCH_SIZE) -> int:
+    """
+    Append every user's current strength measurements to the history, dated by
+    their last_updated; returns the number of entries written.
+
+    Used to start the history from existing data; run rebuild_rollups() afterwards.
+    """
+    numeric = [_STRENGTH.c[f"{lift}_{suffix}"] for lift in LIFTS for suffix in ("weight_kg", "reps_count")]
+    statement = (
+        select(_STRENGTH.c.measurement_id, _STRENGTH.c.user_id, _STRENGTH.c.last_updated, _FORMS.c.weight_kg, *numeric)
+        .select_from(_STRENGTH.outerjoin(_FORMS, _FORMS.c.user_id == _STRENGTH.c.user_id))
+        .order_by(_STRENGTH.c.measurement_id)
+        .limit(batch_size)
+    )
+    now = database_now(conn)
+    total = 0
+    last_key = None
+    while True:
+        batch = statement if last_key is None else statement.where(_STRENGTH.c.measurement_id > last_key)
+        rows = conn.execute(batch).all()
+        if not rows:
+            break
+        user_ids, recorded_at, lifts, weight, reps, bodyweight = [], [], [], [], [], []
+        for row in rows:
+            for i, lift in enumerate(LIFTS):
+                lift_weight, lift_reps = row[4 + 2 * i], row[5 + 2 * i]
+                if lift_weight is None and lift_reps is None:
+                    continue
+                user_ids.append(row.user_id)
+                recorded_at.append(row.last_updated or now)
+                lifts.append(lift)
+                weight.append(lift_weight)
+                reps.append(lift_reps)
+                bodyweight.append(row.weight_kg)
+        entries = entry_rows(user_ids, recorded_at, lifts, weight, reps, bodyweight)
+        if entries:
+            conn.execute(insert(_HISTORY), entries)
+        total += len(entries)
+        last_key = rows[-1].measurement_id
+    logger.info("Imported %d strength history entries", total)
+    return total
+
+
+def rebuild_rollups(conn, batch_size: int = HISTORY_BATCH_SIZE) -> int:
+    """
+    Recompute every rollup row from strength_history, batch_size users at a time;
+    returns the number of rollup rows written.
+
+    Runs in the caller's transaction.
+    """
+    conn.execute(delete(_ROLLUPS))
+    users = select(_HISTORY.c.user_id).group_by(_HISTORY.c.user_id).order_by(_HISTORY.c.user_id).limit(batch_size)
+    total = 0
+    last_user = None
+    while True:
+        batch = users if last_user is None else users.where(_HISTORY.c.user_id > last_user)
+        user_ids = conn.execute(batch).scalars().all()
+        if not user_ids:
+            break
+        rows = conn.execute(
+            select(_HISTORY.c.user_id, *_ENTRY_COLUMNS)
+            .where(_HISTORY.c.user_id.in_(user_ids))
+            .order_by(_HISTORY.c.recorded_at, _HISTORY.c.entry_id)
+        ).mappings().all()
+        rollups = {}
+        _accumulate(rollups, rows)
+        conn.execute(insert(_ROLLUPS), list(rollups.values()))
+        total += len(rollups)
+        last_user = user_ids[-1]
+    logger.info("Rebuilt %d strength history rollups", total)
+    return total
+
+
+# Queries
+
+def _point(row) -> StrengthHistoryPoint:
+    return StrengthHistoryPoint(
+        lift=LIFTS[row.lift],
+        recorded_at=row.recorded_at,
+        weight_kg=row.weight_kg,
+        reps=row.reps,
+        e1rm_kg=None if row.e1rm_kg is None else round(row.e1rm_kg, 2),
+    )
+
+
+def history_page(db, user_id: str, lifts: List[str], start: Optional[datetime], end: Optional[datetime],
+                 after: Optional[Tuple[datetime, int]], limit: int) -> Tuple[List[StrengthHistoryPoint], Optional[Tuple[datetime, int]]]:
+    """
+    Entries in [start, end) in time order, after the (recorded_at, entry_id) key;
+    returns the page and the key to continue from (None on the last page)
+    """
+    query = (
+        select(_HISTORY.c.entry_id, *_ENTRY_COLUMNS)
+        .where(_HISTORY.c.user_id == user_id)
+        .order_by(_HISTORY.c.recorded_at, _HISTORY.c.entry_id)
+        # One extra row tells us whether there is a next page
+        .limit(limit + 1)
+    )
+    if len(lifts) < len(LIFTS):
+        query = query.where(_HISTORY.c.lift.in_([LIFT_CODES[lift] for lift in lifts]))
+    if start is not None:
+        query = query.where(_HISTORY.c.recorded_at >= start)
+    if end is not None:
+        query = query.where(_HISTORY.c.recorded_at < end)
+    if after is not None:
+        recorded_at, entry_id = after
+        query = query.where(or_(
+            _HISTORY.c.recorded_at > recorded_at,
+            and_(_HISTORY.c.recorded_at == recorded_at, _HISTORY.c.entry_id > entry_id),
+        ))
+
+    rows = db.execute(query).all()
+    page = rows[:limit]
+    next_key = (page[-1].recorded_at, page[-1].entry_id) if len(rows) > limit else None
+    return [_point(row) for row in page], next_key
+
+
+def latest_entries(db, user_id: str, lifts: List[str]) -> List[StrengthHistoryPoint]:
+    """
+    The most recent entry per lift: one index lookup each
+    """
+    points = []
+    for lift in lifts:
+        row = db.execute(
+            select(*_ENTRY_COLUMNS)
+            .where(_HISTORY.c.user_id == user_id, _HISTORY.c.lift == LIFT_CODES[lift])
+            .order_by(_HISTORY.c.recorded_at.desc(), _HISTORY.c.entry_id.desc())
+            .limit(1)
+        ).first()
+        if row is not None:
+            points.append(_point(row))
+    return points
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+
+def trend(db, user_id: str, period: str, lifts: List[str], start: Optional[date], end: Optional[date]) -> List[StrengthTrendSeries]:
+    """
+    Per-lift series of weekly or monthly aggregates for periods starting in [start, end]
+    """
+    columns = _ROLLUPS.c
+    query = (
+        select(_ROLLUPS)
+        .where(columns.user_id == user_id, columns.period == period)
+        .order_by(columns.lift, columns.period_start)
+    )
+    if len(lifts) < len(LIFTS):
+        query = query.where(columns.lift.in_([LIFT_CODES[lift] for lift in lifts]))
+    if start is not None:
+        query = query.where(columns.period_start >= period_start(period, start))
+    if end is not None:
+        query = query.where(columns.period_start <= end)
+
+    points: Dict[int, List[StrengthTrendPoint]] = {}
+    for row in db.execute(query):
+        points.setdefault(row.lift, []).append(StrengthTrendPoint(
+            period_start=row.period_start,
+            entries=row.entries,
+            best_e1rm_kg=_round(row.best_e1rm_kg),
+            mean_e1rm_kg=_round(row.e1rm_sum_kg / row.e1rm_entries) if row.e1rm_entries else None,
+            max_weight_kg=row.max_weight_kg,
+            last_e1rm_kg=_round(row.last_e1rm_kg),
+        ))
+    return [StrengthTrendSeries(lift=LIFTS[code], points=series) for code, series in sorted(points.items())]
\ No newline at end of file
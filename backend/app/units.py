@@ -0,0 +1,413 @@
+"""
+Numeric, SI-unit copies of the free-text body and strength inputs.
+
+age, weight, height, body_fat and the strength weight/reps pairs are stored as
+typed, in the units of the form's measurement_system. The *_kg, *_m, *_pct,
+*_years and *_count columns next to them hold the same values as numbers, so they
+can be computed on, range-queried and indexed.
+
+Each string is parsed once into a number and a unit code; unit resolution,
+conversion and range checks then run as NumPy array operations, so the same code
+normalizes one row on write and a whole batch during a backfill. Values that can't
+be parsed or are implausible become NULL; the raw input is always kept.
+"""
+import itertools
+import logging
+import re
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, event, inspect, select, update
+
+from app.config import env_int
+from app.models import intake_models
+
+logger = logging.getLogger(__name__)
+
+LB_TO_KG = 0.45359237
+INCH_TO_M = 0.0254
+FOOT_TO_M = 0.3048
+
+# The app shows imperial units until a measurement system has been picked
+DEFAULT_MEASUREMENT_SYSTEM = "imperial"
+
+# Rows per SELECT / executemany UPDATE when backfilling
+UNIT_BACKFILL_BATCH_SIZE = env_int("UNIT_BACKFILL_BATCH_SIZE", 5000)
+
+LIFTS = ["squat", "bench_press", "deadlift", "overhead_press", "chin_up"]
+FORM_INPUTS = ["age", "weight", "height", "body_fat", "measurement_system"]
+STRENGTH_INPUTS = [f"{lift}_{part}" for lift in LIFTS for part in ("weight", "reps")]
+# The numeric columns derived from them
+STRENGTH_NUMBERS = [f"{lift}_{part}" for lift in LIFTS for part in ("weight_kg", "reps_count")]
+
+# Plausible ranges in canonical units; anything outside becomes NULL
+AGE_RANGE = (5, 120)
+BODY_WEIGHT_RANGE = (20.0, 400.0)
+HEIGHT_RANGE = (0.5, 2.5)
+BODY_FAT_RANGE = (1.0, 75.0)
+# Chin-up weight is added to bodyweight, so 0 is valid
+LIFT_WEIGHT_RANGE = (0.0, 600.0)
+REPS_RANGE = (0, 100)
+
+# Unit codes produced by the parser
+NO_UNIT, KG, LB, CM, M, INCH, FEET_INCHES, PERCENT, YEARS = range(9)
+
+_UNITS = {
+    "": NO_UNIT,
+    "kg": KG, "kgs": KG, "kilo": KG, "kilos": KG,
+    "lb": LB, "lbs": LB, "pound": LB, "pounds": LB,
+    "cm": CM, "m": M,
+    "in": INCH, "inch": INCH, "inches": INCH, '"': INCH,
+    "%": PERCENT,
+    "y": YEARS, "yr": YEARS, "yrs": YEARS, "years": YEARS,
+}
+
+# A number with an optional unit: "77", "77.5 kg", "170lbs", "15%", "1,80 m"
+_QUANTITY = re.compile(r'^\s*(\d+(?:[.,]\d+)?)\s*([a-z%"]*)\.?\s*$', re.IGNORECASE)
+# Feet and inches: 5'10", 5' 10, 5ft 10in, 6 ft
+_FEET_INCHES = re.compile(
+    r"""^\s*(\d+)\s*(?:'|ft|feet|foot)\s*(?:(\d+(?:\.\d+)?)\s*(?:"|''|in|inch|inches)?)?\s*$""",
+    re.IGNORECASE,
+)
+
+
+def _parse_one(value) -> Tuple[float, int, float, float]:
+    """
+    (number, unit code, feet, inches) for one raw value; number is NaN if unparseable.
+
+    For a bare decimal like "5.10", feet/inches hold the ft.in reading (5 ft 10 in)
+    used by imperial height inputs.
+    """
+    if value is None:
+        return np.nan, NO_UNIT, np.nan, np.nan
+    text = str(value)
+    # Most inputs are plain numbers
+    try:
+        number = float(text)
+    except ValueError:
+        pass
+    else:
+        whole, _, fraction = text.strip().partition(".")
+        inches = float(fraction) if fraction.isdigit() else 0.0
+        return number, NO_UNIT, float(whole) if whole.isdigit() else np.nan, inches
+
+    match = _QUANTITY.match(text)
+    if match:
+        unit = _UNITS.get(match.group(2).lower())
+        if unit is not None:
+            return float(match.group(1).replace(",", ".")), unit, np.nan, np.nan
+
+    match = _FEET_INCHES.match(text)
+    if match:
+        feet = float(match.group(1))
+        inches = float(match.group(2)) if match.group(2) else 0.0
+        return feet * 12 + inches, FEET_INCHES, feet, inches
+
+    return np.nan, NO_UNIT, np.nan, np.nan
+
+
+def parse(values: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Parse raw values into parallel arrays: number, unit code, feet, inches.
+
+    Inputs repeat heavily ("80", "5", ...), so each distinct value is parsed once
+    and the results are expanded with one fancy-indexing step.
+    """
+    values = list(values)
+    # Position of each value's first occurrence, computed without a Python-level loop
+    distinct: Dict[object, int] = {}
+    first = np.fromiter(map(distinct.setdefault, values, itertools.count()), dtype=np.intp, count=len(values))
+
+    number = np.full(len(values), np.nan)
+    unit = np.zeros(len(values), dtype=np.int8)
+    feet = np.full(len(values), np.nan)
+    inches = np.full(len(values), np.nan)
+    if distinct:
+        positions = list(distinct.values())
+        parsed = list(zip(*map(_parse_one, distinct)))
+        number[positions], unit[positions], feet[positions], inches[positions] = parsed
+    return number[first], unit[first], feet[first], inches[first]
+
+
+def _imperial(systems: Sequence) -> np.ndarray:
+    names = [getattr(system, "value", system) or DEFAULT_MEASUREMENT_SYSTEM for system in systems]
+    return np.asarray(names, dtype=object) == "imperial"
+
+
+def _within(values: np.ndarray, bounds: Tuple[float, float]) -> np.ndarray:
+    low, high = bounds
+    with np.errstate(invalid="ignore"):
+        return np.where((values >= low) & (values <= high), values, np.nan)
+
+
+def _whole(values: np.ndarray) -> np.ndarray:
+    """
+    NaN for values that aren't whole numbers
+    """
+    with np.errstate(invalid="ignore"):
+        return np.where(values == np.round(values), values, np.nan)
+
+
+def ages(values: Sequence) -> np.ndarray:
+    number, unit, _, _ = parse(values)
+    return _within(_whole(np.where((unit == NO_UNIT) | (unit == YEARS), number, np.nan)), AGE_RANGE)
+
+
+def weights_kg(values: Sequence, systems: Sequence, bounds: Tuple[float, float] = BODY_WEIGHT_RANGE) -> np.ndarray:
+    """
+    Weights in kg: an explicit kg/lb suffix wins, otherwise the measurement system decides
+    """
+    number, unit, _, _ = parse(values)
+    pounds = (unit == LB) | ((unit == NO_UNIT) & _imperial(systems))
+    kg = np.where(pounds, number * LB_TO_KG, number)
+    kg = np.where((unit == NO_UNIT) | (unit == KG) | (unit == LB), kg, np.nan)
+    return _within(kg, bounds)
+
+
+def heights_m(values: Sequence, systems: Sequence) -> np.ndarray:
+    """
+    Heights in metres.
+
+    Bare numbers are read by magnitude: metric inputs under 3 are metres, otherwise
+    centimetres; imperial inputs under 9 are ft.in ("5.10" is 5 ft 10 in), otherwise inches.
+    """
+    number, unit, feet, inches = parse(values)
+    imperial = _imperial(systems)
+    bare = unit == NO_UNIT
+    metres = np.select(
+        [
+            unit == CM,
+            unit == M,
+            unit == INCH,
+            unit == FEET_INCHES,
+            bare & ~imperial & (number < 3),
+            bare & ~imperial,
+            bare & imperial & (number < 9) & (inches < 12),
+            bare & imperial & (number >= 9),
+        ],
+        [
+            number / 100,
+            number,
+            number * INCH_TO_M,
+            feet * FOOT_TO_M + inches * INCH_TO_M,
+            number,
+            number / 100,
+            feet * FOOT_TO_M + inches * INCH_TO_M,
+            number * INCH_TO_M,
+        ],
+        default=np.nan,
+    )
+    return _within(metres, HEIGHT_RANGE)
+
+
+def body_fat_pcts(values: Sequence) -> np.ndarray:
+    number, unit, _, _ = parse(values)
+    return _within(np.where((unit == NO_UNIT) | (unit == PERCENT), number, np.nan), BODY_FAT_RANGE)
+
+
+def rep_counts(values: Sequence) -> np.ndarray:
+    number, unit, _, _ = parse(values)
+    return _within(_whole(np.where(unit == NO_UNIT, number, np.nan)), REPS_RANGE)
+
+
+def _column(values: np.ndarray, integer: bool = False, decimals: int = 3) -> List:
+    """
+    Array -> list of Python values for the database, NaN as None
+    """
+    missing = np.isnan(values)
+    if integer:
+        column = np.where(missing, 0, values).astype(np.int64).astype(object)
+    else:
+        column = np.round(values, decimals).astype(object)
+    column[missing] = None
+    return column.tolist()
+
+
+def normalized_form_columns(columns: Dict[str, Sequence]) -> Dict[str, List]:
+    """
+    Normalized intake form columns from raw FORM_INPUTS columns
+    """
+    systems = columns["measurement_system"]
+    return {
+        "age_years": _column(ages(columns["age"]), integer=True),
+        "weight_kg": _column(weights_kg(columns["weight"], systems)),
+        "height_m": _column(heights_m(columns["height"], systems)),
+        "body_fat_pct": _column(body_fat_pcts(columns["body_fat"])),
+    }
+
+
+def normalized_strength_columns(columns: Dict[str, Sequence], systems: Sequence) -> Dict[str, List]:
+    """
+    Normalized strength measurement columns from raw STRENGTH_INPUTS columns
+    """
+    normalized = {}
+    for lift in LIFTS:
+        normalized[f"{lift}_weight_kg"] = _column(weights_kg(columns[f"{lift}_weight"], systems, LIFT_WEIGHT_RANGE))
+        normalized[f"{lift}_reps_count"] = _column(rep_counts(columns[f"{lift}_reps"]), integer=True)
+    return normalized
+
+
+# Keeping the columns in sync on write. Mapper events cover every ORM writer; the
+# values are set on the object before its INSERT/UPDATE is emitted.
+
+_FORMS = intake_models.IntakeForm.__table__
+_STRENGTH = intake_models.StrengthMeasurement.__table__
+
+
+def _current_values(connection, target, table, key_column, names: Sequence[str]) -> Dict[str, object]:
+    """
+    The target's values for names, reading columns this session never loaded from the database
+    """
+    loaded = inspect(target).dict
+    values = {name: loaded[name] for name in names if name in loaded}
+    missing = [name for name in names if name not in loaded]
+    if missing and inspect(target).persistent:
+        row = connection.execute(
+            select(*(table.c[name] for name in missing)).where(key_column == getattr(target, key_column.name))
+        ).first()
+        values.update(zip(missing, row or ()))
+    return {name: values.get(name) for name in names}
+
+
+def _changed(target, names: Sequence[str]) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.added for name in names)
+
+
+def _measurement_system(connection, user_id: str):
+    return connection.execute(
+        select(_FORMS.c.measurement_system).where(_FORMS.c.user_id == user_id)
+    ).scalar()
+
+
+def _renormalize_strength(connection, user_id: str, system, bodyweight) -> None:
+    """
+    Recompute a user's strength columns after their measurement system changed.
+
+    The rows are rewritten with a Core UPDATE, which skips the mapper events that
+    log strength history, so lifts whose numbers change are logged here.
+    """
+    rows = connection.execute(
+        select(_STRENGTH.c.measurement_id, *(_STRENGTH.c[name] for name in STRENGTH_INPUTS + STRENGTH_NUMBERS))
+        .where(_STRENGTH.c.user_id == user_id)
+    ).all()
+    if not rows:
+        return
+    normalized = _update_rows(
+        connection, _STRENGTH, _STRENGTH.c.measurement_id,
+        [(row.measurement_id, *(row._mapping[name] for name in STRENGTH_INPUTS)) for row in rows], STRENGTH_INPUTS,
+        lambda columns: normalized_strength_columns(columns, [system] * len(rows)),
+    )
+
+    # app.strength_history imports this module
+    from app.strength_history import append_changes
+
+    for i, row in enumerate(rows):
+        before = {name: row._mapping[name] for name in STRENGTH_NUMBERS}
+        after = {name: normalized[name][i] for name in STRENGTH_NUMBERS}
+        append_changes(connection, user_id, before, after, bodyweight)
+
+
+def _normalize_form(connection, target) -> None:
+    values = _current_values(connection, target, _FORMS, _FORMS.c.form_id, FORM_INPUTS)
+    for name, column in normalized_form_columns({name: [value] for name, value in values.items()}).items():
+        setattr(target, name, column[0])
+
+
+def _normalize_strength(connection, target) -> None:
+    values = _current_values(connection, target, _STRENGTH, _STRENGTH.c.measurement_id, STRENGTH_INPUTS)
+    system = _measurement_system(connection, target.user_id)
+    for name, column in normalized_strength_columns({name: [value] for name, value in values.items()}, [system]).items():
+        setattr(target, name, column[0])
+
+
+@event.listens_for(intake_models.IntakeForm, "before_insert")
+def _normalize_inserted_form(mapper, connection, target):
+    _normalize_form(connection, target)
+
+
+@event.listens_for(intake_models.IntakeForm, "before_update")
+def _normalize_updated_form(mapper, connection, target):
+    if not _changed(target, FORM_INPUTS):
+        return
+    _normalize_form(connection, target)
+    if _changed(target, ["measurement_system"]):
+        # weight_kg was just renormalized too; bodyweight lifts use it
+        _renormalize_strength(connection, target.user_id, target.measurement_system, target.weight_kg)
+
+
+@event.listens_for(intake_models.StrengthMeasurement, "before_insert")
+def _normalize_inserted_strength(mapper, connection, target):
+    _normalize_strength(connection, target)
+
+
+@event.listens_for(intake_models.StrengthMeasurement, "before_update")
+def _normalize_updated_strength(mapper, connection, target):
+    if _changed(target, STRENGTH_INPUTS):
+        _normalize_strength(connection, target)
+
+
+# Backfill
+
+def _update_rows(connection, table, key_column, rows, names: Sequence[str], normalize: Callable) -> Dict[str, List]:
+    """
+    Normalize (key, *names) rows and write them back with one executemany UPDATE;
+    returns the normalized columns
+    """
+    keys, *raw = zip(*rows)
+    normalized = normalize(dict(zip(names, raw)))
+    params = [
+        {"_key": key, **{name: column[i] for name, column in normalized.items()}}
+        for i, key in enumerate(keys)
+    ]
+    connection.execute(update(table).where(key_column == bindparam("_key")), params)
+    return normalized
+
+
+def _backfill_table(conn, statement, table, key_column, names: Sequence[str], normalize: Callable, batch_size: int, commit: bool) -> int:
+    """
+    Walk a table in key order batch_size rows at a time; returns the number of rows updated
+    """
+    total = 0
+    last_key = None
+    while True:
+        batch = statement.order_by(key_column).limit(batch_size)
+        if last_key is not None:
+            batch = batch.where(key_column > last_key)
+        rows = conn.execute(batch).all()
+        if not rows:
+            break
+        _update_rows(conn, table, key_column, rows, names, normalize)
+        if commit:
+            conn.commit()
+        total += len(rows)
+        last_key = rows[-1][0]
+        logger.info("Normalized %d %s rows", total, table.name)
+    return total
+
+
+def backfill(conn, batch_size: int = UNIT_BACKFILL_BATCH_SIZE, commit: bool = True) -> Dict[str, int]:
+    """
+    (Re)compute the numeric columns of every intake form and strength measurement.
+
+    Safe to re-run. With commit=True each batch is committed on its own so a large
+    table is not rewritten in one transaction.
+    """
+    forms = _backfill_table(
+        conn,
+        select(_FORMS.c.form_id, *(_FORMS.c[name] for name in FORM_INPUTS)),
+        _FORMS, _FORMS.c.form_id, FORM_INPUTS,
+        normalized_form_columns,
+        batch_size, commit,
+    )
+
+    # The last selected column is the owner's measurement system
+    strength = _backfill_table(
+        conn,
+        select(_STRENGTH.c.measurement_id, *(_STRENGTH.c[name] for name in STRENGTH_INPUTS), _FORMS.c.measurement_system)
+        .select_from(_STRENGTH.outerjoin(_FORMS, _FORMS.c.user_id == _STRENGTH.c.user_id)),
+        _STRENGTH, _STRENGTH.c.measurement_id, STRENGTH_INPUTS + ["measurement_system"],
+        lambda columns: normalized_strength_columns(columns, columns["measurement_system"]),
+        batch_size, commit,
+    )
+    return {"intake_forms": forms, "strength_measurements": strength}
\ No newline at end of file
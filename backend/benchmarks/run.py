@@ -0,0 +1,300 @@
+"""
+Endpoint benchmarks against a seeded SQLite database, driven in-process through the ASGI app.
+
+    cd backend
+    python -m benchmarks.run --users 10000 --requests 500
+    python -m benchmarks.run --users 1000000 --requests 2000 --concurrency 8 --save-baseline
+
+Reports throughput and p50/p95/p99 latency per endpoint and compares them with a
+stored baseline (benchmarks/baseline.json by default); exits 1 on a regression.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(BENCH_DIR, "bench.db")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: Callable[[str], str]
+    body: Optional[Callable[[int], dict]] = None
+    params: Optional[Callable[[str], dict]] = None
+
+
+def _submit_body(i: int) -> dict:
+    return {
+        "intake": {"age": str(20 + i % 40), "weight": str(60 + i % 50)},
+        "goals": {"goal1": f"Goal {i}"},
+        "genetics": {"wrist_circumference": str(15 + i % 5)},
+        "cardio_equipment": {"equipment_list": ["bike", "rower"] if i % 2 else ["treadmill"]},
+        "gym_equipment": {"equipment_list": ["squat_rack", "bench"], "leg_curl_type": "seated"},
+    }
+
+
+# Every router endpoint; names match the route templates used by /metrics
+ENDPOINTS: List[Endpoint] = [
+    Endpoint("GET /", "GET", lambda email: "/"),
+    Endpoint("POST /users/", "POST", lambda email: "/users/",
+             body=lambda i: {"user_id": f"bench-new-{uuid.uuid4().hex}", "email": f"{uuid.uuid4().hex}@new.bench.test", "full_name": "New User"}),
+    Endpoint("GET /users/{email}", "GET", lambda email: f"/users/{email}"),
+    Endpoint("POST /users/{email}/address", "POST", lambda email: f"/users/{email}/address",
+             body=lambda i: {"street": f"Street {i}", "city": "Bench City"}),
+    Endpoint("GET /goals/{email}", "GET", lambda email: f"/goals/{email}"),
+    Endpoint("POST /goals/", "POST", lambda email: "/goals/", params=lambda email: {"email": email},
+             body=lambda i: {"goal1": f"Goal {i}", "goal2": "Consistency"}),
+    Endpoint("PUT /goals/{email}", "PUT", lambda email: f"/goals/{email}", body=lambda i: {"goal3": f"Goal {i}"}),
+    Endpoint("GET /intake/{email}", "GET", lambda email: f"/intake/{email}"),
+    Endpoint("GET /intake/{email}?fields=goals", "GET", lambda email: f"/intake/{email}",
+             params=lambda email: {"fields": "goal1,goal2,goal3,obstacle"}),
+    Endpoint("PUT /intake/{email}", "PUT", lambda email: f"/intake/{email}",
+             body=lambda i: {"age": str(20 + i % 40), "occupation": f"Job {i % 10}"}),
+    Endpoint("POST /intake/initialize/{email}", "POST", lambda email: f"/intake/initialize/{email}"),
+    Endpoint("POST /intake/{email}/strength-measurements", "POST", lambda email: f"/intake/{email}/strength-measurements",
+             body=lambda i: {"squat_weight": str(60 + i % 100), "squat_reps": "5", "strength1_completed": True, "strength2_completed": True}),
+    Endpoint("POST /intake/{email}/genetics", "POST", lambda email: f"/intake/{email}/genetics",
+             body=lambda i: {"wrist_circumference": str(15 + i % 5), "ankle_circumference": "21"}),
+    Endpoint("POST /intake/{email}/cardio-equipment", "POST", lambda email: f"/intake/{email}/cardio-equipment",
+             body=lambda i: {"equipment_list": ["bike", "rower"] if i % 2 else ["treadmill"]}),
+    Endpoint("POST /intake/{email}/gym-equipment", "POST", lambda email: f"/intake/{email}/gym-equipment",
+             body=lambda i: {"equipment_list": ["squat_rack", "bench", "leg_press"][: 1 + i % 3], "leg_curl_type": "seated"}),
+    Endpoint("POST /intake/{email}/dumbbell-info", "POST", lambda email: f"/intake/{email}/dumbbell-info",
+             body=lambda i: {"is_full_set": i % 2 == 0, "min_weight": "2", "max_weight": "30"}),
+    Endpoint("POST /intake/{email}/submit", "POST", lambda email: f"/intake/{email}/submit", body=_submit_body),
+    Endpoint("GET /address/user/{email}", "GET", lambda email: f"/address/user/{email}"),
+    Endpoint("POST /address/user/{email}", "POST", lambda email: f"/address/user/{email}",
+             body=lambda i: {"street": f"Street {i}", "city": "Bench City"}),
+    Endpoint("GET /analytics/funnel", "GET", lambda email: "/analytics/funnel"),
+    Endpoint("GET /analytics/strength/{email}", "GET", lambda email: f"/analytics/strength/{email}"),
+    Endpoint("GET /analytics/strength/cohorts", "GET", lambda email: "/analytics/strength/cohorts",
+             params=lambda email: {"cohort": "weight_class"}),
+    Endpoint("GET /analytics/strength/{email}/history", "GET", lambda email: f"/analytics/strength/{email}/history",
+             params=lambda email: {"lift": "squat", "limit": 100}),
+    Endpoint("GET /analytics/strength/{email}/latest", "GET", lambda email: f"/analytics/strength/{email}/latest"),
+    Endpoint("GET /analytics/strength/{email}/trend", "GET", lambda email: f"/analytics/strength/{email}/trend",
+             params=lambda email: {"period": "month"}),
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, wall_time: float, serialization: Optional[float] = None) -> dict:
+    ordered = sorted(latencies)
+    stats = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall_time, 1) if wall_time else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+    if serialization is not None and ordered:
+        stats["serialization_ms"] = round(serialization / len(ordered) * 1000, 3)
+        stats["serialization_share"] = round(serialization / sum(ordered), 4)
+    return stats
+
+
+async def bench_endpoint(client, endpoint: Endpoint, emails: List[str], warmup: int, concurrency: int, timer=None) -> dict:
+    """
+    Send one request per email (after `warmup` unrecorded ones) from `concurrency` workers
+    """
+    latencies: List[float] = []
+    errors = 0
+
+    async def call(i: int, email: str, record: bool):
+        nonlocal errors
+        kwargs = {}
+        if endpoint.body is not None:
+            kwargs["json"] = endpoint.body(i)
+        if endpoint.params is not None:
+            kwargs["params"] = endpoint.params(email)
+        start = time.perf_counter()
+        response = await client.request(endpoint.method, endpoint.path(email), **kwargs)
+        elapsed = time.perf_counter() - start
+        if record:
+            latencies.append(elapsed)
+            if response.status_code >= 400:
+                errors += 1
+
+    for i, email in enumerate(emails[:warmup]):
+        await call(i, email, record=False)
+
+    queue = list(enumerate(emails[warmup:]))
+    queue.reverse()
+
+    async def worker():
+        while queue:
+            i, email = queue.pop()
+            await call(i, email, record=True)
+
+    if timer is not None:
+        timer.take()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_time = time.perf_counter() - started
+    return summarize(latencies, errors, wall_time, timer.take() if timer is not None else None)
+
+
+async def run_benchmarks(args) -> Dict[str, dict]:
+    import httpx
+
+    from app.main import app
+    from benchmarks.seed import sample_emails
+
+    timer = None
+    if args.serialization:
+        from benchmarks.serialization import serialization_timer
+
+        timer = serialization_timer
+        timer.install()
+
+    rng = random.Random(args.seed)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for endpoint in ENDPOINTS:
+            if args.only and not any(token in endpoint.name for token in args.only):
+                continue
+            emails = sample_emails(rng, args.users, args.warmup + args.requests)
+            results[endpoint.name] = await bench_endpoint(client, endpoint, emails, args.warmup, args.concurrency, timer)
+            stats = results[endpoint.name]
+            line = (f"{endpoint.name:<48} {stats['throughput_rps']:>9.1f} rps  p50 {stats['p50_ms']:>8.2f}  "
+                    f"p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}")
+            if timer is not None:
+                line += f"  serialization {stats['serialization_ms']:.2f} ms ({stats['serialization_share']:.1%})"
+            print(line)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """
+    Print the change against the baseline and return the endpoints that regressed
+    """
+    regressions = []
+    print(f"\nCompared with baseline (tolerance {tolerance:.0%}):")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<48} (not in baseline)")
+            continue
+
+        changes = []
+        regressed = False
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            before, after = previous[metric], current[metric]
+            delta = (after - before) / before if before else 0.0
+            changes.append(f"{metric[:3]} {delta:+7.1%}")
+            regressed = regressed or delta > tolerance
+        if current["errors"] > previous.get("errors", 0):
+            changes.append(f"errors {previous.get('errors', 0)} -> {current['errors']}")
+            regressed = True
+
+        print(f"{name:<48} {'  '.join(changes)}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users to seed (default 1000)")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint (default 200)")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint (default 20)")
+    parser.add_argument("--concurrency", type=int, default=1, help="concurrent in-flight requests (default 1)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="users inserted per seeding batch")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite file, reused across runs if already seeded")
+    parser.add_argument("--fresh", action="store_true", help="delete the database file and seed from scratch")
+    parser.add_argument("--mode", choices=("sync", "async"), default=os.getenv("DATABASE_MODE", "sync"))
+    parser.add_argument("--only", nargs="*", help="only endpoints whose name contains one of these strings")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the email sample")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (default 0.2)")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    parser.add_argument("--serialization", action="store_true",
+                        help="also measure the time spent building and encoding responses (adds a little overhead)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    if args.fresh and os.path.exists(args.db):
+        os.remove(args.db)
+
+    # The app reads its settings at import time, so configure it before importing
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    os.environ["DATABASE_MODE"] = args.mode
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from sqlalchemy import create_engine
+
+    from benchmarks.seed import create_schema, seed
+
+    seed_engine = create_engine(os.environ["DATABASE_URL"])
+    create_schema(seed_engine)
+    seed(seed_engine, args.users, batch_size=args.batch_size)
+    seed_engine.dispose()
+
+    results = asyncio.run(run_benchmarks(args))
+    report = {
+        "meta": {
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mode": args.mode,
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "endpoints": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ("users", "concurrency", "mode"):
+            if baseline["meta"].get(key) != report["meta"][key]:
+                print(f"\nNote: baseline {key} was {baseline['meta'].get(key)}, this run uses {report['meta'][key]}")
+        regressions = compare(results, baseline["endpoints"], args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} endpoint(s) regressed")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
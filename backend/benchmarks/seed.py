@@ -0,0 +1,193 @@
+"""
+Synthetic users with complete intake data, bulk-inserted for benchmarking
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+from sqlalchemy import event, func, insert, select
+
+from app.data_versions import bump_version
+from app.funnel import rebuild_counters
+from app.strength import STRENGTH_VERSION
+from app.strength_history import entry_rows, rebuild_rollups
+from app.units import backfill
+from app.models import user_models
+
+GYM_EQUIPMENT = ["squat_rack", "bench", "leg_press", "cable_machine", "pull_up_bar"]
+CARDIO_EQUIPMENT = ["treadmill", "bike", "rower", "elliptical"]
+
+# A year of weekly strength history per user, ending at the current measurements
+HISTORY_LIFTS = ["squat", "bench_press", "deadlift"]
+HISTORY_WEEKS = 52
+HISTORY_END = datetime(2024, 12, 30, 18, 0)
+
+
+def bench_email(index: int) -> str:
+    return f"user{index}@bench.test"
+
+
+def bench_user_id(index: int) -> str:
+    return f"bench-{index}"
+
+
+def _rows(start: int, stop: int) -> dict:
+    """
+    Rows for users [start, stop), keyed by table, with form_id = index + 1
+    """
+    rows = {table: [] for table in ("users", "user_addresses", "intake_forms", "strength_measurements",
+                                    "genetics", "dumbbell_info", "gym_equipment", "cardio_equipment", "addresses")}
+    history = {name: [] for name in ("user_ids", "recorded_at", "lifts", "weight", "reps", "bodyweight")}
+    for i in range(start, stop):
+        user_id = bench_user_id(i)
+        email = bench_email(i)
+        form_id = i + 1
+        address = {
+            "user_id": user_id,
+            "house_number": str(i % 500 + 1),
+            "street": f"Bench Street {i % 97}",
+            "city": f"City {i % 31}",
+            "postal_code": f"{i % 100000:05d}",
+            "country": "Testland",
+        }
+
+        rows["users"].append({"user_id": user_id, "email": email, "full_name": f"Bench User {i}", "is_signup_only": False})
+        rows["user_addresses"].append(address)
+        rows["intake_forms"].append({
+            "form_id": form_id,
+            "user_id": user_id,
+            "email": email,
+            "full_name": f"Bench User {i}",
+            "is_signup_only": False,
+            "age": str(18 + i % 50),
+            "weight": str(55 + i % 60),
+            "height": str(150 + i % 45),
+            "body_fat": str(10 + i % 25),
+            "measurement_system": "metric",
+            "weight_height_completed": True,
+            "goal1": "Build strength",
+            "goal2": "Lose fat",
+            "goal3": "Sleep better",
+            "obstacle": "Time",
+            "goals_completed": True,
+            "activity_level": "moderately_active",
+            "activity_level_completed": True,
+            "leg_curl_type": "seated",
+            "intake_form_completed": True,
+        })
+        rows["strength_measurements"].append({
+            "form_id": form_id,
+            "user_id": user_id,
+            "squat_weight": str(60 + i % 100),
+            "squat_reps": "5",
+            "bench_press_weight": str(40 + i % 80),
+            "bench_press_reps": "5",
+            "deadlift_weight": str(80 + i % 120),
+            "deadlift_reps": "5",
+            "strength1_completed": True,
+            "strength2_completed": True,
+        })
+        rows["genetics"].append({
+            "form_id": form_id,
+            "user_id": user_id,
+            "wrist_circumference": str(15 + i % 5),
+            "ankle_circumference": str(20 + i % 6),
+            "genetics_completed": True,
+        })
+        rows["dumbbell_info"].append({
+            "form_id": form_id,
+            "user_id": user_id,
+            "is_full_set": i % 2 == 0,
+            "min_weight": "2",
+            "max_weight": "30",
+        })
+        for offset in range(3):
+            rows["gym_equipment"].append({
+                "form_id": form_id,
+                "user_id": user_id,
+                "equipment_type": GYM_EQUIPMENT[(i + offset) % len(GYM_EQUIPMENT)],
+            })
+        for offset in range(2):
+            rows["cardio_equipment"].append({
+                "form_id": form_id,
+                "user_id": user_id,
+                "equipment_type": CARDIO_EQUIPMENT[(i + offset) % len(CARDIO_EQUIPMENT)],
+            })
+        rows["addresses"].append({"form_id": form_id, **address})
+
+        current = {"squat": 60 + i % 100, "bench_press": 40 + i % 80, "deadlift": 80 + i % 120}
+        for week in range(HISTORY_WEEKS):
+            weeks_ago = HISTORY_WEEKS - 1 - week
+            for lift in HISTORY_LIFTS:
+                history["user_ids"].append(user_id)
+                history["recorded_at"].append(HISTORY_END - timedelta(weeks=weeks_ago))
+                history["lifts"].append(lift)
+                history["weight"].append(current[lift] - weeks_ago * 0.5)
+                history["reps"].append(5)
+                history["bodyweight"].append(55 + i % 60)
+    rows["strength_history"] = entry_rows(**history)
+    return rows
+
+
+def _batches(users: int, batch_size: int) -> Iterator[range]:
+    for start in range(0, users, batch_size):
+        yield range(start, min(start + batch_size, users))
+
+
+def seeded_users(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(user_models.User.__table__)).scalar_one()
+
+
+def create_schema(engine) -> None:
+    """
+    Bring the benchmark database up to date with the app's migrations
+    """
+    from app.migrations import upgrade
+
+    with engine.connect() as conn:
+        upgrade(conn)
+
+
+def seed(engine, users: int, batch_size: int = 5000, log=print) -> None:
+    """
+    Insert users [already seeded, users) with one executemany per table per batch
+    """
+    existing = seeded_users(engine)
+    if existing >= users:
+        log(f"Reusing {existing} seeded users")
+        return
+
+    # Durability is irrelevant for a throwaway benchmark database
+    @event.listens_for(engine, "connect")
+    def _fast_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.close()
+
+    engine.dispose()
+    tables = {table.name: table for table in user_models.Base.metadata.sorted_tables}
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for batch in _batches(users - existing, batch_size):
+            rows = _rows(existing + batch.start, existing + batch.stop)
+            for name, values in rows.items():
+                conn.execute(insert(tables[name]), values)
+            done = existing + batch.stop
+            if done % (batch_size * 20) == 0 or done == users:
+                log(f"Seeded {done}/{users} users ({time.perf_counter() - started:.1f}s)")
+        # The bulk inserts bypass the ORM events that maintain the funnel counters,
+        # the numeric measurement columns, the strength analytics version and the
+        # strength history rollups
+        rebuild_counters(conn)
+        backfill(conn, commit=False)
+        bump_version(conn, STRENGTH_VERSION)
+        rebuild_rollups(conn)
+
+    event.remove(engine, "connect", _fast_pragmas)
+    engine.dispose()
+
+
+def sample_emails(rng, users: int, count: int) -> List[str]:
+    return [bench_email(rng.randrange(users)) for _ in range(count)]
\ No newline at end of file
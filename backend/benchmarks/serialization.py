@@ -0,0 +1,80 @@
+"""
+Time spent turning ORM rows into response bytes, for --serialization runs.
+
+Wraps the functions every response goes through, whichever path it takes:
+- BaseModel.model_validate: ORM row -> response model
+- fastapi.routing.serialize_response: response_model re-validation + encoding to primitives
+- Response.render for JSON responses: primitives -> bytes
+- BaseModel.model_dump_json / TypeAdapter.dump_json: model -> bytes in one compiled step
+Nested wrapped calls are only counted once.
+"""
+import functools
+import threading
+import time
+
+import fastapi.routing
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from starlette.responses import JSONResponse
+
+
+class SerializationTimer:
+    def __init__(self):
+        self.total = 0.0
+        self._lock = threading.Lock()
+        # Nesting depth per thread (sync-mode handlers serialize on threadpool threads)
+        self._local = threading.local()
+        self._installed = False
+
+    def _enter(self) -> float:
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        return time.perf_counter()
+
+    def _exit(self, start: float) -> None:
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.total += elapsed
+
+    def wrap(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = self._enter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._exit(start)
+        return wrapper
+
+    def wrap_async(self, fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = self._enter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self._exit(start)
+        return wrapper
+
+    def install(self) -> None:
+        if self._installed:
+            return
+        self._installed = True
+        fastapi.routing.serialize_response = self.wrap_async(fastapi.routing.serialize_response)
+        JSONResponse.render = self.wrap(JSONResponse.render)
+        ORJSONResponse.render = self.wrap(ORJSONResponse.render)
+        BaseModel.model_dump_json = self.wrap(BaseModel.model_dump_json)
+        BaseModel.model_validate = classmethod(self.wrap(BaseModel.model_validate.__func__))
+        TypeAdapter.dump_json = self.wrap(TypeAdapter.dump_json)
+
+    def take(self) -> float:
+        """
+        Seconds accumulated since the last call
+        """
+        with self._lock:
+            total, self.total = self.total, 0.0
+        return total
+
+
+serialization_timer = SerializationTimer()
\ No newline at end of file
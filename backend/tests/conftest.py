@@ -0,0 +1,115 @@
+"""
+Shared fixtures: the app runs against a migrated SQLite database in a temporary
+directory, emptied (along with the in-process caches) before every test.
+
+    cd backend
+    python -m pytest -q
+
+DATABASE_MODE=async runs the same tests on the async driver.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="cymron-tests-")
+# Set before anything imports app.database, which builds the engine at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ.setdefault("DATABASE_MODE", "sync")
+os.environ["PHOTO_STORAGE_DIR"] = os.path.join(_TMP, "photos")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, delete  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.cache import LocalCacheBackend  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import upgrade  # noqa: E402
+
+# The sync engine tests use to seed and inspect the database directly
+sync_engine = create_engine(os.environ["DATABASE_URL"])
+
+with sync_engine.connect() as connection:
+    upgrade(connection)
+
+# Rows kept between tests: data_versions holds counters created by the migrations
+_KEPT_TABLES = {"data_versions"}
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    with sync_engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            if table.name not in _KEPT_TABLES:
+                connection.execute(delete(table))
+
+    from app import dependencies, idempotency, strength
+
+    dependencies.user_id_cache.clear()
+    monkeypatch.setattr(dependencies.intake_form_cache, "backend", LocalCacheBackend(maxsize=100))
+    monkeypatch.setattr(idempotency.idempotency_store, "backend", LocalCacheBackend(maxsize=100))
+    monkeypatch.setattr(strength.strength_cache, "_snapshot", None)
+    monkeypatch.setattr(strength.strength_cache, "_refresh", None)
+    yield
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        # Let the warm-up task open the first connection before any test does:
+        # aiosqlite's NullPool serializes a fresh engine's first connect with a
+        # thread lock, which two coroutines on the event loop thread would deadlock on
+        while test_client.get("/internal/ready").status_code != 200:
+            time.sleep(0.01)
+        yield test_client
+
+
+@pytest.fixture
+def db_engine():
+    return sync_engine
+
+
+@pytest.fixture
+def db_connection():
+    with sync_engine.begin() as connection:
+        yield connection
+
+
+@pytest.fixture
+def db_session():
+    with Session(sync_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def make_user(client):
+    """
+    Create a user through the API and return the response body
+    """
+
+    def _make_user(email: str = "client@example.com", user_id: str = "user-1", **fields) -> dict:
+        response = client.post("/users/", json={"user_id": user_id, "email": email, **fields})
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return _make_user
+
+
+@pytest.fixture
+def user(make_user) -> dict:
+    return make_user()
+
+
+@pytest.fixture
+def intake_user(client, user) -> dict:
+    """
+    The default user with an initialized intake form
+    """
+    response = client.post(f"/intake/initialize/{user['email']}")
+    assert response.status_code == 200, response.text
+    return user
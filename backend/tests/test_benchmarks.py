@@ -0,0 +1,54 @@
+import random
+
+import httpx
+
+from app.main import app
+from benchmarks.run import ENDPOINTS, bench_endpoint, compare, percentile, summarize
+from benchmarks.seed import sample_emails, seed, seeded_users
+
+USERS = 12
+
+
+def test_every_benchmarked_endpoint_succeeds_on_seeded_data(client, db_engine):
+    seed(db_engine, USERS, batch_size=5, log=lambda message: None)
+    assert seeded_users(db_engine) == USERS
+    rng = random.Random(1)
+
+    async def run_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as bench_client:
+            return {
+                endpoint.name: await bench_endpoint(bench_client, endpoint, sample_emails(rng, USERS, 3), warmup=1, concurrency=2)
+                for endpoint in ENDPOINTS
+            }
+
+    results = client.portal.call(run_all)
+    assert {name: stats["errors"] for name, stats in results.items() if stats["errors"]} == {}
+    assert all(stats["requests"] == 2 for stats in results.values())
+
+
+def test_seeding_resumes_from_the_existing_users(db_engine):
+    seed(db_engine, 3, log=lambda message: None)
+    seed(db_engine, 5, batch_size=2, log=lambda message: None)
+    assert seeded_users(db_engine) == 5
+
+
+def test_percentiles_and_summary():
+    values = [i / 1000 for i in range(1, 101)]
+    assert (percentile(values, 50), percentile(values, 99), percentile([], 50)) == (0.05, 0.099, 0.0)
+    stats = summarize(values, errors=1, wall_time=2.0)
+    assert (stats["requests"], stats["errors"], stats["throughput_rps"], stats["p95_ms"]) == (100, 1, 50.0, 95.0)
+
+
+def test_compare_flags_slowdowns_and_new_errors():
+    baseline = {
+        "steady": {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 0},
+        "slower": {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 0},
+        "failing": {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 0},
+    }
+    results = {
+        "steady": {"p50_ms": 1.1, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 0},
+        "slower": {"p50_ms": 1.0, "p95_ms": 3.0, "p99_ms": 3.0, "errors": 0},
+        "failing": {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 2},
+        "new": {"p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "errors": 0},
+    }
+    assert compare(results, baseline, tolerance=0.2) == ["slower", "failing"]
@@ -0,0 +1,95 @@
+import orjson
+from sqlalchemy import select
+
+from app import bulk_import
+from app.models import intake_models, user_models
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def _line(email: str, user_id: str, **sections) -> bytes:
+    return orjson.dumps({"user": {"email": email, "user_id": user_id}, **sections})
+
+
+def _import(client, *lines: bytes):
+    response = client.post("/clients/import", content=b"\n".join(lines) + b"\n", headers=NDJSON)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_import_creates_clients_with_their_sections(client, db_engine):
+    report = _import(client, _line(
+        "new@example.com", "user-new",
+        intake={"weight": "80", "measurement_system": "metric", "activity_level": "sedentary"},
+        strength_measurements={"squat_weight": "100", "squat_reps": "5"},
+        gym_equipment={"equipment_list": ["bench"]},
+    ))
+    assert (report["lines"], report["imported"], report["failed"]) == (1, 1, 0)
+
+    form = client.get("/intake/new@example.com").json()
+    assert form["weight"] == "80"
+    assert client.get("/analytics/funnel").json()["activity_level"]["sedentary"] == 1
+    with db_engine.connect() as connection:
+        forms = intake_models.IntakeForm.__table__
+        assert connection.execute(select(forms.c.weight_kg)).scalar() == 80.0
+        assert connection.execute(select(intake_models.StrengthHistoryEntry.__table__.c.lift)).scalars().all() == [0]
+
+
+def test_bad_lines_are_reported_without_stopping_the_import(client):
+    report = _import(
+        client,
+        b"{not json",
+        orjson.dumps({"user": {"email": "missing-id@example.com"}}),
+        _line("good@example.com", "user-good"),
+    )
+    assert (report["imported"], report["failed"]) == (1, 2)
+    assert [error["line"] for error in report["errors"]] == [1, 2]
+    assert "user.user_id" in report["errors"][1]["detail"]
+
+
+def test_oversized_lines_are_reported(client, monkeypatch):
+    monkeypatch.setattr(bulk_import, "MAX_LINE_BYTES", 200)
+    report = _import(
+        client,
+        _line("long@example.com", "user-long", intake={"occupation": "x" * 500}),
+        _line("short@example.com", "user-short"),
+    )
+    assert (report["imported"], report["failed"]) == (1, 1)
+    assert report["errors"][0]["line"] == 1
+    assert "exceeds" in report["errors"][0]["detail"]
+
+
+def test_duplicates_are_rejected_case_insensitively(client, user):
+    report = _import(
+        client,
+        # Registered already, in another case
+        _line("CLIENT@example.com", "user-2"),
+        _line("Twice@Example.com", "user-3"),
+        # Repeats the previous line
+        _line("twice@example.com", "user-4"),
+        _line("other@example.com", user["user_id"]),
+    )
+    assert report["imported"] == 1
+    assert [(error["line"], error["detail"]) for error in report["errors"]] == [
+        (1, "Email already registered"),
+        (3, "Email already registered"),
+        (4, "User id already registered"),
+    ]
+    # Stored lowercased, so lookups in any case find it
+    assert client.get("/users/TWICE@example.com").json()["user_id"] == "user-3"
+
+
+def test_database_errors_fail_only_their_rows(client, db_engine, monkeypatch):
+    original = bulk_import._insert_clients
+
+    def failing_insert(db, clients):
+        if any(client.user.user_id == "user-bad" for client in clients):
+            # A constraint the pre-checks did not catch
+            db.execute(user_models.User.__table__.insert().values(user_id=None, email=None))
+        original(db, clients)
+
+    monkeypatch.setattr(bulk_import, "_insert_clients", failing_insert)
+    report = _import(client, _line("a@example.com", "user-a"), _line("bad@example.com", "user-bad"))
+    assert report["imported"] == 1
+    assert report["errors"][0]["line"] == 2
+    assert report["errors"][0]["detail"].startswith("Database error")
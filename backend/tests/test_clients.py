@@ -0,0 +1,62 @@
+from app.routers.clients import decode_cursor, encode_cursor
+
+
+def _clients(client, count: int) -> list:
+    emails = []
+    for index in range(count):
+        email = f"client{index}@example.com"
+        client.post("/users/", json={"user_id": f"user-{index}", "email": email, "full_name": f"Client {index}"})
+        client.post(f"/intake/initialize/{email}")
+        emails.append(email)
+    return emails
+
+
+def _pages(client, **params) -> list:
+    pages, cursor = [], None
+    while True:
+        response = client.get("/clients/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append([item["email"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_walk_every_client_newest_first(client):
+    emails = _clients(client, 5)
+    pages = _pages(client, limit=2)
+    assert pages == [emails[4:2:-1], emails[2:0:-1], emails[:1]]
+
+
+def test_last_full_page_has_no_cursor(client):
+    _clients(client, 4)
+    assert [len(page) for page in _pages(client, limit=2)] == [2, 2]
+
+
+def test_rows_added_while_paging_do_not_shift_pages(client):
+    emails = _clients(client, 3)
+    first = client.get("/clients/", params={"limit": 2}).json()
+    client.post("/users/", json={"user_id": "user-new", "email": "new@example.com"})
+    client.post("/intake/initialize/new@example.com")
+    second = client.get("/clients/", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [item["email"] for item in second["items"]] == [emails[0]]
+
+
+def test_filters_apply_to_every_page(client):
+    emails = _clients(client, 4)
+    for email in emails[1::2]:
+        client.post("/goals/", params={"email": email}, json={"goal1": "Run"})
+    pages = _pages(client, limit=1, completed="goals_completed")
+    assert pages == [[emails[3]], [emails[1]]]
+    assert [email for page in _pages(client, incomplete="goals_completed") for email in page] == [emails[2], emails[0]]
+
+
+def test_bad_input_is_rejected(client):
+    assert client.get("/clients/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/clients/", params={"completed": "no_such_flag"}).status_code == 400
+    assert client.get("/clients/", params={"limit": 0}).status_code == 422
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
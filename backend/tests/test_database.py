@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app import database
+from app.database import DbSession, SessionLocal, to_async_url
+from app.main import app
+
+
+def test_async_urls_use_the_async_drivers():
+    assert to_async_url("mysql+pymysql://user:pw@db/cymron") == "mysql+aiomysql://user:pw@db/cymron"
+    assert to_async_url("mysql://db/cymron") == "mysql+aiomysql://db/cymron"
+    assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    # Already async, or unknown: left alone
+    assert to_async_url("mysql+aiomysql://db/cymron") == "mysql+aiomysql://db/cymron"
+
+
+def test_engine_matches_the_configured_mode():
+    assert database.DATABASE_MODE == os.environ["DATABASE_MODE"]
+    assert isinstance(database.engine, AsyncEngine) == (database.DATABASE_MODE == "async")
+
+
+def test_run_sync_hands_the_function_a_sync_session(client):
+    async def run():
+        db = DbSession(SessionLocal())
+        try:
+            return db.is_async, await db.run_sync(lambda session, value: session.execute(text("SELECT :v"), {"v": value}).scalar(), 7)
+        finally:
+            await db.close()
+
+    is_async, value = client.portal.call(run)
+    assert is_async == (database.DATABASE_MODE == "async")
+    assert value == 7
+
+
+def test_routes_work_in_the_configured_mode(client, intake_user):
+    assert client.put("/intake/client@example.com", json={"occupation": "Nurse"}).status_code == 200
+    assert client.get("/intake/client@example.com").json()["occupation"] == "Nurse"
+
+
+def test_concurrent_document_writes(client, intake_user):
+    # Building the document must not lazy-load sections while pydantic validates it,
+    # which in async mode switches greenlets mid-validation and crashes the process
+    client.post("/intake/client@example.com/cardio-equipment", json={"equipment_list": ["bike"]})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.put("/intake/client@example.com", json={"occupation": f"Job {i}"}) for i in range(8)
+            ))
+
+    responses = client.portal.call(run)
+    assert [response.status_code for response in responses] == [200] * 8
+    assert all(response.json()["cardio_equipment"][0]["equipment_type"] == "bike" for response in responses)
@@ -0,0 +1,51 @@
+from sqlalchemy import event, select
+
+import pytest
+
+from app.models import intake_models
+
+EMAIL = "client@example.com"
+TABLES = {
+    "cardio-equipment": intake_models.CardioEquipment.__table__,
+    "gym-equipment": intake_models.GymEquipment.__table__,
+}
+
+
+def _rows(engine, table) -> dict:
+    with engine.connect() as connection:
+        return dict(connection.execute(select(table.c.equipment_type, table.c.equipment_id)).all())
+
+
+@pytest.mark.parametrize("section", list(TABLES))
+def test_only_the_difference_is_written(client, intake_user, db_engine, section):
+    table = TABLES[section]
+    path = f"/intake/{EMAIL}/{section}"
+    assert client.post(path, json={"equipment_list": ["bike", "rower", "", "bike"]}).status_code == 200
+    first = _rows(db_engine, table)
+    assert set(first) == {"bike", "rower"}
+
+    client.post(path, json={"equipment_list": ["rower", "treadmill"]})
+    second = _rows(db_engine, table)
+    assert set(second) == {"rower", "treadmill"}
+    # The kept row is the same row, not a delete and re-insert
+    assert second["rower"] == first["rower"]
+
+
+def test_unchanged_list_writes_nothing(client, intake_user, db_engine):
+    path = f"/intake/{EMAIL}/cardio-equipment"
+    client.post(path, json={"equipment_list": ["bike", "rower"]})
+    etag = client.get(f"/intake/{EMAIL}").headers["ETag"]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0].upper())
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        assert client.post(path, json={"equipment_list": ["rower", "bike"]}).status_code == 200
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+    # The form is not touched either, so its ETag still validates
+    assert client.get(f"/intake/{EMAIL}", headers={"If-None-Match": etag}).status_code == 304
+    assert not {"INSERT", "UPDATE", "DELETE"} & set(statements)
@@ -0,0 +1,100 @@
+import asyncio
+from collections import Counter
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.funnel import TOTAL, apply_deltas, rebuild_counters, rebuild_periodically
+from app.models import intake_models
+
+EMAIL = "client@example.com"
+COUNTERS = intake_models.FunnelCounter.__table__
+
+
+def _stored(engine) -> dict:
+    with engine.connect() as connection:
+        return {(row.metric, row.bucket): row[2] for row in connection.execute(select(COUNTERS)) if row[2]}
+
+
+def _rebuilt(engine) -> dict:
+    """
+    What a full recompute gives, without keeping it
+    """
+    with engine.connect() as connection:
+        rebuild_counters(connection)
+        counts = {(row.metric, row.bucket): row[2] for row in connection.execute(select(COUNTERS)) if row[2]}
+        connection.rollback()
+    return counts
+
+
+def test_writes_adjust_only_their_buckets(client, intake_user, db_engine):
+    assert _stored(db_engine) == {TOTAL: 1}
+
+    client.put(f"/intake/{EMAIL}", json={"activity_level": "sedentary", "goals_completed": True})
+    client.put(f"/intake/{EMAIL}", json={"activity_level": "very_active", "stress_level": "low_stress"})
+    report = client.get("/analytics/funnel").json()
+    assert report["total_forms"] == 1
+    assert report["activity_level"]["very_active"] == 1
+    assert report["activity_level"]["sedentary"] == 0
+    assert report["stress_level"]["low_stress"] == 1
+    assert {stage["stage"]: stage["completed"] for stage in report["stages"]}["goals_completed"] == 1
+    assert _stored(db_engine) == _rebuilt(db_engine)
+
+
+def test_update_from_a_stale_session_counts_the_stored_value(client, intake_user, db_engine):
+    client.put(f"/intake/{EMAIL}", json={"activity_level": "sedentary"})
+
+    with Session(db_engine) as stale:
+        form = stale.scalars(select(intake_models.IntakeForm)).one()
+        assert form.activity_level == "sedentary"
+        # Another writer changes the row after this session loaded it
+        client.put(f"/intake/{EMAIL}", json={"activity_level": "very_active"})
+        form.activity_level = "moderately_active"
+        stale.commit()
+
+    # very_active (stored) was subtracted, not sedentary (the session's stale copy)
+    assert _stored(db_engine) == _rebuilt(db_engine) == {TOTAL: 1, ("activity_level", "moderately_active"): 1}
+
+
+def test_deltas_are_applied_after_commit(client, intake_user, db_engine):
+    with Session(db_engine) as session:
+        form = session.scalars(select(intake_models.IntakeForm)).one()
+        form.activity_level = "sedentary"
+        session.flush()
+        # The write transaction has not touched the shared counter rows
+        assert _stored(db_engine) == {TOTAL: 1}
+        session.commit()
+    assert _stored(db_engine) == {TOTAL: 1, ("activity_level", "sedentary"): 1}
+
+
+def test_rolled_back_writes_are_not_counted(client, intake_user, db_engine):
+    with Session(db_engine) as session:
+        form = session.scalars(select(intake_models.IntakeForm)).one()
+        form.goals_completed = True
+        session.flush()
+        session.rollback()
+        # A later commit in the same session does not pick up the discarded deltas
+        session.commit()
+    assert _stored(db_engine) == _rebuilt(db_engine) == {TOTAL: 1}
+
+
+def test_deleting_a_form_removes_its_buckets(client, intake_user, db_engine, db_session):
+    client.put(f"/intake/{EMAIL}", json={"dedication_level": "maximum", "goals_completed": True})
+    db_session.delete(db_session.scalars(select(intake_models.IntakeForm)).one())
+    db_session.commit()
+    assert _stored(db_engine) == {}
+
+
+def test_periodic_rebuild_corrects_drift(client, intake_user, db_engine):
+    with db_engine.begin() as connection:
+        # A write that bypassed the ORM, and counters that drifted
+        connection.execute(update(intake_models.IntakeForm.__table__).values(stress_level="high_stress"))
+        apply_deltas(connection, Counter({TOTAL: 5}))
+
+    async def rebuild_once():
+        task = asyncio.create_task(rebuild_periodically(db_engine, interval=0.01))
+        while _stored(db_engine) != {TOTAL: 1, ("stress_level", "high_stress"): 1}:
+            await asyncio.sleep(0.01)
+        task.cancel()
+
+    asyncio.run(asyncio.wait_for(rebuild_once(), 5))
@@ -0,0 +1,154 @@
+import asyncio
+
+import httpx
+
+from app.cache import LocalCacheBackend
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+class CountingApp:
+    """
+    ASGI app echoing the request body, counting calls; waits for release when set
+    """
+
+    def __init__(self, status: int = 201):
+        self.status = status
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        message = await receive()
+        if self.release is not None:
+            await self.release.wait()
+        body = b'{"call": %d, "body": %s}' % (self.calls, message.get("body") or b"null")
+        await send({"type": "http.response.start", "status": self.status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _run(app, requests):
+    """
+    Send (method, kwargs) requests through the middleware concurrently
+    """
+    store = IdempotencyStore(LocalCacheBackend(maxsize=100))
+    middleware = IdempotencyMiddleware(app, store=store, max_body_bytes=64)
+
+    async def send_all():
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.request(method, "/items", **kwargs) for method, kwargs in requests))
+
+    return asyncio.run(send_all()), store
+
+
+def _keyed(key: str = "key-1", body: bytes = b'{"a": 1}', **headers):
+    return {"content": body, "headers": {"Idempotency-Key": key, "Content-Type": "application/json", **headers}}
+
+
+def _sequential(app, count: int, **headers):
+    """
+    Send the same keyed request count times, one after another
+    """
+    store = IdempotencyStore(LocalCacheBackend(maxsize=100))
+    middleware = IdempotencyMiddleware(app, store=store)
+
+    async def send_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+            return [await client.post("/items", **_keyed(**headers)) for _ in range(count)]
+
+    return asyncio.run(send_all()), store
+
+
+def test_retry_is_replayed():
+    app = CountingApp()
+    (first, second), store = _sequential(app, 2)
+    assert app.calls == 1
+    assert second.status_code == first.status_code == 201
+    assert second.content == first.content
+    assert second.headers["idempotent-replayed"] == "true"
+    assert store.stats()["replayed"] == 1
+
+
+def test_content_type_is_matched_case_insensitively():
+    app = CountingApp()
+    (first, second), _ = _sequential(app, 2, **{"Content-Type": "Application/JSON; charset=UTF-8"})
+    assert app.calls == 1
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_key_reused_for_another_body_conflicts():
+    app = CountingApp()
+    (first, second), store = _run(app, [("POST", _keyed()), ("POST", _keyed(body=b'{"a": 2}'))])
+    assert sorted([first.status_code, second.status_code]) == [201, 422]
+    assert app.calls == 1
+    assert store.stats()["conflicts"] == 1
+
+
+def test_concurrent_duplicate_waits_for_the_first():
+    app = CountingApp()
+    app.release = asyncio.Event()
+    store = IdempotencyStore(LocalCacheBackend(maxsize=100))
+    middleware = IdempotencyMiddleware(app, store=store)
+
+    async def duplicates():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/items", **_keyed()))
+            while app.calls == 0:
+                await asyncio.sleep(0.001)
+            second = asyncio.create_task(client.post("/items", **_keyed()))
+            while store.stats()["waited"] == 0:
+                await asyncio.sleep(0.001)
+            app.release.set()
+            return await first, await second
+
+    first, second = asyncio.run(duplicates())
+    assert app.calls == 1
+    assert second.content == first.content
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_server_errors_are_not_stored():
+    app = CountingApp(status=500)
+    _sequential(app, 2)
+    assert app.calls == 2
+
+
+def test_requests_without_a_json_content_type_pass_through():
+    app = CountingApp()
+    no_type = {"content": b"", "headers": {"Idempotency-Key": "key-1"}}
+    ndjson = {"content": b"{}\n", "headers": {"Idempotency-Key": "key-1", "Content-Type": "application/x-ndjson"}}
+    responses, store = _run(app, [("POST", no_type), ("POST", ndjson)])
+    assert [response.status_code for response in responses] == [201, 201]
+    assert "idempotent-replayed" not in responses[1].headers
+    assert app.calls == 2
+    assert store.stats()["stored"] == 0
+
+
+def test_oversized_bodies_are_rejected():
+    app = CountingApp()
+
+    async def chunked():
+        yield b'{"a": "' + b"x" * 40
+        yield b"x" * 40 + b'"}'
+
+    big = b'{"a": "' + b"x" * 100 + b'"}'
+    streamed = {"content": chunked(), "headers": {"Idempotency-Key": "key-2", "Content-Type": "application/json"}}
+    responses, _ = _run(app, [("POST", _keyed(body=big)), ("POST", streamed)])
+    assert [response.status_code for response in responses] == [413, 413]
+    assert app.calls == 0
+
+
+def test_invalid_key_is_rejected():
+    app = CountingApp()
+    (response, ), _ = _run(app, [("PUT", _keyed(key=""))])
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Idempotency-Key must be")
+
+
+def test_api_create_user_is_not_repeated(client):
+    kwargs = {"json": {"user_id": "user-1", "email": "client@example.com"}, "headers": {"Idempotency-Key": "signup-1"}}
+    first = client.post("/users/", **kwargs)
+    second = client.post("/users/", **kwargs)
+    # Without the key the retry would be rejected as a duplicate email
+    assert first.status_code == second.status_code == 200
+    assert second.headers["idempotent-replayed"] == "true"
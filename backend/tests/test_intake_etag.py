@@ -0,0 +1,108 @@
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy import insert
+
+from app.dependencies import intake_form_cache
+from app.models import intake_models
+from app.routers.intake_forms import _record_body_photo_variants
+
+EMAIL = "client@example.com"
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), (200, 30, 30)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+# Every endpoint that changes the intake form document: (method, path, request kwargs)
+WRITERS = [
+    ("PUT", f"/intake/{EMAIL}", {"json": {"occupation": "Nurse"}}),
+    ("POST", f"/intake/{EMAIL}/strength-measurements", {"json": {"squat_weight": "100", "squat_reps": "5", "strength1_completed": True}}),
+    ("POST", f"/intake/{EMAIL}/genetics", {"json": {"wrist_circumference": "17", "genetics_completed": True}}),
+    ("POST", f"/intake/{EMAIL}/cardio-equipment", {"json": {"equipment_list": ["bike"]}}),
+    ("POST", f"/intake/{EMAIL}/gym-equipment", {"json": {"equipment_list": ["bench"], "leg_curl_type": "seated"}}),
+    ("POST", f"/intake/{EMAIL}/dumbbell-info", {"json": {"is_full_set": True, "min_weight": "2", "max_weight": "30"}}),
+    ("POST", f"/intake/{EMAIL}/submit", {"json": {"goals": {"goal1": "Run"}, "cardio_equipment": {"equipment_list": ["rower"]}}}),
+    ("POST", "/goals/", {"params": {"email": EMAIL}, "json": {"goal1": "Lift"}}),
+    ("PUT", f"/goals/{EMAIL}", {"json": {"goal2": "Sleep"}}),
+    ("POST", f"/address/user/{EMAIL}", {"json": {"city": "Utrecht"}}),
+    ("POST", f"/users/{EMAIL}/address", {"json": {"city": "Delft"}}),
+    ("POST", f"/intake/{EMAIL}/body-photos", {"content": _png(), "headers": {"Content-Type": "image/png"}}),
+]
+
+
+def _get(client, etag=None):
+    return client.get(f"/intake/{EMAIL}", headers={"If-None-Match": etag} if etag else {})
+
+
+def test_unchanged_form_is_not_modified(client, intake_user):
+    etag = _get(client).headers["ETag"]
+    response = _get(client, etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+@pytest.mark.parametrize("method, path, kwargs", WRITERS, ids=[f"{method} {path}" for method, path, _ in WRITERS])
+def test_every_writer_changes_the_etag(client, intake_user, method, path, kwargs):
+    first = _get(client)
+    response = client.request(method, path, **kwargs)
+    assert response.status_code < 300, response.text
+
+    # Same second as the first read: only the version can tell them apart
+    second = _get(client, first.headers["ETag"])
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+    # The new document is served from the cache under the new ETag
+    assert _get(client, second.headers["ETag"]).status_code == 304
+    assert _get(client).json() == second.json()
+
+
+def test_replaced_dumbbell_info_changes_the_etag(client, intake_user):
+    path = f"/intake/{EMAIL}/dumbbell-info"
+    client.post(path, json={"is_full_set": False, "min_weight": "2", "max_weight": "20"})
+    etag = _get(client).headers["ETag"]
+
+    # Delete-and-reinsert can reuse the row id; the version still moves
+    client.post(path, json={"is_full_set": False, "min_weight": "4", "max_weight": "40"})
+    response = _get(client, etag)
+    assert response.status_code == 200
+    assert response.json()["dumbbell_info"][0]["max_weight"] == "40"
+
+
+def test_write_then_read_in_the_same_second_is_fresh(client, intake_user):
+    path = f"/intake/{EMAIL}/genetics"
+    client.post(path, json={"wrist_circumference": "16"})
+    assert _get(client).json()["genetics"][0]["wrist_circumference"] == "16"
+    client.post(path, json={"wrist_circumference": "18"})
+    assert _get(client).json()["genetics"][0]["wrist_circumference"] == "18"
+
+
+def test_racing_read_cannot_cache_an_old_document(client, intake_user):
+    old = _get(client)
+    client.post(f"/intake/{EMAIL}/genetics", json={"wrist_circumference": "19"})
+
+    # A GET that loaded the form before the write stores its document after the
+    # write's invalidation; it carries the old version's ETag and is not served
+    client.portal.call(intake_form_cache.set, intake_user["user_id"], old.headers["ETag"], old.content)
+    fresh = _get(client)
+    assert fresh.headers["ETag"] != old.headers["ETag"]
+    assert fresh.json()["genetics"][0]["wrist_circumference"] == "19"
+
+
+def test_background_variants_change_the_etag(client, intake_user, db_session):
+    form_id = client.get(f"/intake/{EMAIL}").json()["form_id"]
+    db_session.execute(insert(intake_models.BodyPhoto), {
+        "form_id": form_id, "user_id": intake_user["user_id"], "photo_url": "/media/photos/a.png",
+        "content_hash": "abc", "variants_status": "pending",
+    })
+    db_session.commit()
+    etag = _get(client).headers["ETag"]
+
+    user_ids = _record_body_photo_variants(db_session, "abc", {"thumbnail": "/media/photos/a_t.jpg"}, "ready")
+    assert user_ids == [intake_user["user_id"]]
+    response = _get(client, etag)
+    assert response.status_code == 200
+    assert response.json()["body_photos"][0]["variants_status"] == "ready"
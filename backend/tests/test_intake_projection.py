@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app import database
+from app.routers.intake_forms import PROJECTION_COLUMNS
+
+EMAIL = "client@example.com"
+
+
+@contextmanager
+def _statements():
+    engine = getattr(database.engine, "sync_engine", database.engine)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def _fill(client):
+    client.post(f"/intake/{EMAIL}/submit", json={
+        "goals": {"goal1": "Run", "goal2": "Lift", "obstacle": "Time"},
+        "cardio_equipment": {"equipment_list": ["bike"]},
+        "genetics": {"wrist_circumference": "17"},
+    })
+
+
+def test_fields_return_only_the_named_columns(client, intake_user):
+    _fill(client)
+    with _statements() as statements:
+        response = client.get(f"/intake/{EMAIL}", params={"fields": "goal1, goal2"})
+    assert response.status_code == 200
+    assert response.json() == {"goal1": "Run", "goal2": "Lift"}
+    # Partial documents are neither validated against nor stored under the ETag
+    assert "etag" not in response.headers
+
+    [form_query] = [statement for statement in statements if "FROM intake_forms" in statement]
+    assert "goal1" in form_query and "obstacle" not in form_query
+    assert not any("FROM cardio_equipment" in statement for statement in statements)
+
+
+def test_relationships_load_only_when_named(client, intake_user):
+    _fill(client)
+    with _statements() as statements:
+        body = client.get(f"/intake/{EMAIL}", params={"fields": "goal1,cardio_equipment"}).json()
+    assert set(body) == {"goal1", "cardio_equipment"}
+    assert [row["equipment_type"] for row in body["cardio_equipment"]] == ["bike"]
+    assert sum("FROM cardio_equipment" in statement for statement in statements) == 1
+    assert not any("FROM genetics" in statement for statement in statements)
+
+
+def test_include_adds_relationships_to_every_column(client, intake_user):
+    _fill(client)
+    body = client.get(f"/intake/{EMAIL}", params={"include": "genetics"}).json()
+    assert set(body) == set(PROJECTION_COLUMNS) | {"genetics"}
+    assert body["genetics"][0]["wrist_circumference"] == "17"
+
+
+def test_relationship_only_fields(client, intake_user):
+    _fill(client)
+    body = client.get(f"/intake/{EMAIL}", params={"fields": "cardio_equipment"}).json()
+    assert set(body) == {"form_id", "cardio_equipment"}
+
+
+def test_unknown_names_are_rejected(client, intake_user):
+    response = client.get(f"/intake/{EMAIL}", params={"fields": "goal1,password"})
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+    # include= only takes relationships
+    assert client.get(f"/intake/{EMAIL}", params={"include": "goal1"}).status_code == 400
+
+
+def test_missing_form(client, user):
+    assert client.get(f"/intake/{EMAIL}", params={"fields": "goal1"}).status_code == 404
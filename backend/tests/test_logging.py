@@ -0,0 +1,44 @@
+import json
+import logging
+
+from app.logging_config import DeferredQueueHandler, JsonFormatter, parse_levels
+
+
+def _record(msg, *args, **extra):
+    record = logging.LogRecord("app.routers.users", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(_record("Saved %s", "form", user_id="u-1", duration_ms=12.5))
+    data = json.loads(line)
+    assert data["message"] == "Saved form"
+    assert (data["level"], data["logger"]) == ("INFO", "app.routers.users")
+    assert (data["user_id"], data["duration_ms"]) == ("u-1", 12.5)
+    assert "args" not in data and "msg" not in data
+
+
+def test_queue_handler_leaves_formatting_to_the_listener():
+    class Unformattable:
+        def __str__(self):
+            raise AssertionError("formatted on the calling thread")
+
+    record = _record("Received %s", Unformattable())
+    prepared = DeferredQueueHandler(None).prepare(record)
+    assert prepared is record
+    assert prepared.msg == "Received %s"
+
+
+def test_parse_levels():
+    assert parse_levels(" app.routers = debug ,sqlalchemy.engine=WARNING,,broken,=INFO") == {
+        "app.routers": "DEBUG",
+        "sqlalchemy.engine": "WARNING",
+    }
+    assert parse_levels("") == {}
+
+
+def test_debug_dumps_are_off_by_default(client):
+    # configure_logging ran on import; the tests run with LOG_LEVEL=WARNING
+    assert not logging.getLogger("app.routers.intake_forms").isEnabledFor(logging.DEBUG)
+    assert logging.getLogger().level == logging.WARNING
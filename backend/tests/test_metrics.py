@@ -0,0 +1,48 @@
+from app.metrics import UNMATCHED_ROUTE, RequestMetrics
+
+EMAIL = "client@example.com"
+
+
+def _samples(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = RequestMetrics(buckets=(0.1, 1.0))
+    for duration in (0.05, 0.1, 0.5, 3.0):
+        metrics.started("GET")
+        metrics.finished("GET", "/intake/{email}", 200, duration)
+    samples = _samples(metrics.render())
+
+    series = 'method="GET",route="/intake/{email}"'
+    assert samples[f'http_request_duration_seconds_bucket{{{series},le="0.1"}}'] == "2"
+    assert samples[f'http_request_duration_seconds_bucket{{{series},le="1.0"}}'] == "3"
+    assert samples[f'http_request_duration_seconds_bucket{{{series},le="+Inf"}}'] == "4"
+    assert samples[f"http_request_duration_seconds_count{{{series}}}"] == "4"
+    assert float(samples[f"http_request_duration_seconds_sum{{{series}}}"]) == 3.65
+    assert samples[f'http_requests_total{{{series},status="200"}}'] == "4"
+    assert samples['http_requests_in_progress{method="GET"}'] == "0"
+
+
+def test_label_values_are_escaped():
+    metrics = RequestMetrics()
+    metrics.started("GET")
+    metrics.finished("GET", 'a"b\\c\nd', 404, 0.001)
+    assert 'route="a\\"b\\\\c\\nd"' in metrics.render()
+
+
+def test_endpoint_reports_route_templates(client, intake_user):
+    client.get(f"/intake/{EMAIL}")
+    client.get("/intake/other@example.com")
+    client.get("/no/such/path")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    samples = _samples(response.text)
+    routes = {key for key in samples if key.startswith("http_requests_total")}
+    # One series per template, never per email or raw path
+    assert any('route="/intake/{email}",status="200"' in key for key in routes)
+    assert any('route="/intake/{email}",status="404"' in key for key in routes)
+    assert any(f'route="{UNMATCHED_ROUTE}"' in key for key in routes)
+    assert not any(EMAIL in key or "/no/such/path" in key for key in samples)
@@ -0,0 +1,115 @@
+import ast
+import importlib
+import inspect as inspect_module
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, insert, select
+
+from app.database import Base
+from app import migrations
+from app.migrations import load_migrations, pending_migrations, upgrade
+from app.migrations.versions import m0001_initial_schema
+from app.models import intake_models, user_models
+from app.strength_history import rebuild_rollups
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _columns(engine):
+    inspector = inspect(engine)
+    return {table: {column["name"] for column in inspector.get_columns(table)} for table in inspector.get_table_names()}
+
+
+def test_upgrade_of_an_empty_database_builds_the_model_schema(engine):
+    with engine.connect() as connection:
+        applied = upgrade(connection)
+    assert [migration.version for migration in applied] == [migration.version for migration in load_migrations()]
+
+    columns = _columns(engine)
+    for table in Base.metadata.sorted_tables:
+        assert columns[table.name] == {column.name for column in table.columns}, table.name
+
+
+def test_upgrade_of_a_create_all_database(engine):
+    # Databases created by the old startup create_all already have the latest columns
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        upgrade(connection)
+        assert pending_migrations(connection) == []
+    assert set(_columns(engine)) >= {table.name for table in Base.metadata.sorted_tables}
+
+
+def test_duplicate_body_photos_are_dropped_before_the_unique_index(engine, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(migrations, "load_migrations", lambda: [m for m in load_migrations() if m.version < 10])
+        with engine.connect() as connection:
+            upgrade(connection)
+    photos = intake_models.BodyPhoto.__table__
+    with engine.begin() as connection:
+        connection.execute(insert(user_models.User.__table__), [{"user_id": "user-1"}, {"user_id": "user-2"}])
+        connection.execute(insert(photos), [
+            {"photo_id": 1, "user_id": "user-1", "content_hash": "a"},
+            {"photo_id": 2, "user_id": "user-1", "content_hash": "a"},
+            {"photo_id": 3, "user_id": "user-2", "content_hash": "a"},
+            {"photo_id": 4, "user_id": "user-1", "content_hash": None},
+            {"photo_id": 5, "user_id": "user-1", "content_hash": None},
+        ])
+
+    with engine.connect() as connection:
+        upgrade(connection)
+        assert list(connection.execute(select(photos.c.photo_id).order_by(photos.c.photo_id)).scalars()) == [1, 3, 4, 5]
+    assert any(index["name"] == "uq_body_photos_user_content_hash" and index["unique"]
+               for index in inspect(engine).get_indexes("body_photos"))
+
+
+def test_upgrade_backfills_a_baseline_database(engine):
+    with engine.begin() as connection:
+        m0001_initial_schema.upgrade(connection)
+        connection.execute(insert(user_models.User.__table__), {"user_id": "user-1", "email": "client@example.com"})
+        connection.execute(insert(m0001_initial_schema.metadata.tables["intake_forms"]), {
+            "user_id": "user-1", "email": "client@example.com", "weight": "176", "height": "5'10\"",
+            "measurement_system": "imperial", "goals_completed": True, "activity_level": "active",
+        })
+        connection.execute(insert(m0001_initial_schema.metadata.tables["strength_measurements"]), {
+            "user_id": "user-1", "squat_weight": "225", "squat_reps": "5", "last_updated": datetime(2024, 3, 6, 12),
+        })
+
+    with engine.connect() as connection:
+        upgrade(connection)
+
+        forms = intake_models.IntakeForm.__table__
+        form = connection.execute(select(forms.c.weight_kg, forms.c.height_m, forms.c.version)).one()
+        assert form == (pytest.approx(79.832), pytest.approx(1.778), 0)
+
+        counters = intake_models.FunnelCounter.__table__
+        counts = {(row.metric, row.bucket): row.count for row in connection.execute(select(counters))}
+        assert counts[("forms", "total")] == 1
+        assert counts[("completed", "goals_completed")] == 1
+        assert counts[("activity_level", "active")] == 1
+
+        history = intake_models.StrengthHistoryEntry.__table__
+        entry = connection.execute(select(history)).one()
+        assert (entry.lift, entry.recorded_at, entry.reps) == (0, datetime(2024, 3, 6, 12), 5)
+        assert entry.weight_kg == pytest.approx(102.058)
+        rollups = intake_models.StrengthHistoryRollup.__table__
+        periods = connection.execute(select(rollups.c.period, rollups.c.period_start).order_by(rollups.c.period)).all()
+        assert [(period, str(start)) for period, start in periods] == [("month", "2024-03-01"), ("week", "2024-03-04")]
+        # The seeded rollups match a full recompute from the history
+        seeded = connection.execute(select(rollups).order_by(rollups.c.period)).all()
+        rebuild_rollups(connection)
+        assert connection.execute(select(rollups).order_by(rollups.c.period)).all() == seeded
+
+
+def test_migrations_only_import_migration_helpers():
+    # Their schema and backfills must not change with the app code
+    for migration in load_migrations():
+        module = importlib.import_module(f"app.migrations.versions.{migration.name}")
+        tree = ast.parse(inspect_module.getsource(module))
+        imported = {node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)}
+        assert {name for name in imported if name.startswith("app.")} <= {"app.config", "app.migrations.ops"}, migration.name
@@ -0,0 +1,171 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+from app import photos, pool_metrics
+from app.photos import PHOTO_STORAGE_DIR, VARIANTS, original_path, photo_processor, render_variants
+from app.routers import intake_forms
+
+EMAIL = "client@example.com"
+PATH = f"/intake/{EMAIL}/body-photos"
+
+
+def _image(size=(1000, 500), color=(200, 30, 30), fmt="PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def _upload(client, content: bytes, content_type: str = "image/png"):
+    return client.post(PATH, content=content, headers={"Content-Type": content_type})
+
+
+def _photos(client) -> list:
+    return client.get(f"/intake/{EMAIL}").json()["body_photos"]
+
+
+def _wait_for_variants(client) -> list:
+    deadline = time.monotonic() + 60
+    while any(photo["variants_status"] == "pending" for photo in _photos(client)) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return _photos(client)
+
+
+def _partial_files() -> list:
+    return [name for _, _, names in os.walk(PHOTO_STORAGE_DIR) for name in names if name.endswith(".part")]
+
+
+@pytest.fixture
+def failing_render(monkeypatch):
+    calls = []
+
+    async def render(path, content_hash):
+        calls.append(content_hash)
+        return {}, "failed"
+
+    monkeypatch.setattr(photo_processor, "render", render)
+    return calls
+
+
+def test_upload_is_stored_once_under_its_hash(client, intake_user, failing_render):
+    content = _image(color=(1, 2, 3))
+    content_hash = hashlib.sha256(content).hexdigest()
+
+    first = _upload(client, content)
+    assert first.status_code == 201
+    photo = first.json()
+    assert photo["photo_url"] == f"{photos.PHOTO_URL_PREFIX}/{original_path(content_hash, 'png')}"
+    with open(os.path.join(PHOTO_STORAGE_DIR, original_path(content_hash, "png")), "rb") as stored:
+        assert stored.read() == content
+    assert client.get(photo["photo_url"]).content == content
+
+    again = _upload(client, content)
+    assert again.status_code == 200
+    assert again.json()["photo_id"] == photo["photo_id"]
+    assert [row["variants_status"] for row in _wait_for_variants(client)] == ["failed"]
+
+
+@pytest.mark.parametrize("content, content_type, status", [
+    (b"not an image", "text/plain", 415),
+    (b"", "image/png", 400),
+])
+def test_rejected_uploads(client, intake_user, content, content_type, status):
+    assert _upload(client, content, content_type).status_code == status
+    assert _photos(client) == []
+    assert _partial_files() == []
+
+
+def test_oversized_uploads_are_cut_off(client, intake_user, monkeypatch):
+    monkeypatch.setattr(intake_forms, "PHOTO_MAX_BYTES", 1000)
+    monkeypatch.setattr(photos, "PHOTO_MAX_BYTES", 1000)
+    content = _image(size=(300, 300), color=(5, 5, 5), fmt="BMP")
+    assert _upload(client, content).status_code == 413
+
+    # Without a Content-Length the stream is checked as it arrives
+    chunked = client.post(PATH, content=(content[i:i + 256] for i in range(0, len(content), 256)),
+                          headers={"Content-Type": "image/png"})
+    assert chunked.status_code == 413
+    assert _photos(client) == []
+    assert _partial_files() == []
+
+
+def test_variants_fit_their_bounds_and_are_rendered_once():
+    content = _image(size=(2000, 1000), color=(9, 9, 9))
+    content_hash = hashlib.sha256(content).hexdigest()
+    path = original_path(content_hash, "png")
+    os.makedirs(os.path.dirname(os.path.join(PHOTO_STORAGE_DIR, path)), exist_ok=True)
+    with open(os.path.join(PHOTO_STORAGE_DIR, path), "wb") as f:
+        f.write(content)
+
+    paths = render_variants(path, content_hash)
+    for name, size in VARIANTS.items():
+        with Image.open(os.path.join(PHOTO_STORAGE_DIR, paths[name])) as variant:
+            assert (variant.format, variant.size) == ("JPEG", (size, size // 2))
+    modified = {name: os.stat(os.path.join(PHOTO_STORAGE_DIR, p)).st_mtime_ns for name, p in paths.items()}
+    assert render_variants(path, content_hash) == paths
+    assert {name: os.stat(os.path.join(PHOTO_STORAGE_DIR, p)).st_mtime_ns for name, p in paths.items()} == modified
+
+
+def test_variants_are_rendered_in_the_background(client, intake_user):
+    completed = photo_processor.completed
+    photo = _upload(client, _image(color=(4, 5, 6))).json()
+    assert photo["variants_status"] == "pending"
+
+    [rendered] = _wait_for_variants(client)
+    assert rendered["variants_status"] == "ready"
+    assert client.get(rendered["thumbnail_url"]).headers["content-type"] == "image/jpeg"
+    assert client.get("/internal/photos").json()["completed"] == completed + 1
+
+
+def test_reupload_retries_failed_variants(client, intake_user, failing_render):
+    content = _image(color=(7, 8, 9))
+    _upload(client, content)
+    assert _wait_for_variants(client)[0]["variants_status"] == "failed"
+
+    again = _upload(client, content)
+    assert (again.status_code, again.json()["variants_status"]) == (200, "pending")
+    assert len(failing_render) == 2
+    _wait_for_variants(client)
+
+
+def test_no_connection_is_held_while_the_body_streams(client, intake_user, failing_render):
+    content = _image(color=(10, 11, 12))
+    checked_out = []
+
+    def chunks():
+        for i in range(0, len(content), 512):
+            checked_out.append(pool_metrics.pool_stats.checked_out)
+            yield content[i:i + 512]
+
+    response = client.post(PATH, content=chunks(), headers={"Content-Type": "image/png"})
+    assert response.status_code == 201
+    assert len(checked_out) > 1 and set(checked_out) == {0}
+    _wait_for_variants(client)
+
+
+def test_unknown_user(client):
+    assert _upload(client, _image(color=(13, 14, 15))).status_code == 404
+
+
+def test_concurrent_duplicate_upload_returns_the_existing_photo(client, intake_user, failing_render, monkeypatch):
+    content = _image(color=(16, 17, 18))
+    first = _upload(client, content).json()
+    _wait_for_variants(client)
+
+    # The other request's row is not visible yet when this one checks, so its insert fails
+    real_user_photo = intake_forms._user_photo
+    lookups = []
+
+    def racing_user_photo(db, user_id, content_hash):
+        lookups.append(content_hash)
+        return None if len(lookups) == 1 else real_user_photo(db, user_id, content_hash)
+
+    monkeypatch.setattr(intake_forms, "_user_photo", racing_user_photo)
+    again = _upload(client, content)
+    assert (again.status_code, again.json()["photo_id"]) == (200, first["photo_id"])
+    assert len(_photos(client)) == 1
+    assert len(failing_render) == 1
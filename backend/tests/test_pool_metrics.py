@@ -0,0 +1,41 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.pool_metrics import PoolStats, TimedQueuePool
+
+
+def test_pool_endpoint_reports_checkouts(client, user):
+    before = client.get("/internal/pool").json()
+    client.get("/users/client@example.com")
+    after = client.get("/internal/pool").json()
+    assert after["checkouts"] > before["checkouts"]
+    assert after["checked_out"] <= after["peak_checked_out"]
+    assert set(after["wait"]) == {"count", "total_seconds", "avg_seconds", "max_seconds"}
+
+
+def test_queue_pool_state_and_waits(tmp_path, monkeypatch):
+    stats = PoolStats()
+    monkeypatch.setattr("app.pool_metrics.pool_stats", stats)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool, pool_size=2, max_overflow=1)
+    try:
+        with engine.connect() as first, engine.connect() as second:
+            first.execute(text("SELECT 1"))
+            second.execute(text("SELECT 1"))
+            snapshot = stats.snapshot(engine.pool)
+        assert isinstance(engine.pool, QueuePool)
+        assert (snapshot["pool_size"], snapshot["max_overflow"]) == (2, 1)
+        # Every checkout's acquisition time is recorded
+        assert snapshot["wait"]["count"] == 2
+    finally:
+        engine.dispose()
+
+
+def test_counters_follow_checkouts_and_checkins():
+    stats = PoolStats()
+    stats.on_checkout(None, None, None)
+    stats.on_checkout(None, None, None)
+    stats.on_checkin(None, None)
+    stats.record_wait(0.5, timed_out=True)
+    snapshot = stats.snapshot()
+    assert (snapshot["checkouts"], snapshot["checkins"], snapshot["checked_out"], snapshot["peak_checked_out"]) == (2, 1, 1, 2)
+    assert (snapshot["timeouts"], snapshot["wait"]["max_seconds"]) == (1, 0.5)
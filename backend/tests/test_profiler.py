@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app import profiler
+from app.metrics import UNMATCHED_ROUTE
+from app.profiler import QueryProfile, QueryProfilerMiddleware, instrument_engine
+
+
+def _queries_app(engine, statements):
+    async def app(scope, receive, send):
+        # What routing records for a matched route
+        scope["route"] = SimpleNamespace(path="/intake/{email}")
+        with engine.connect() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return app
+
+
+def _get(app):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=QueryProfilerMiddleware(app)), base_url="http://test") as client:
+            return await client.get("/intake/alice@example.com")
+
+    return asyncio.run(send())
+
+
+def test_headers_count_the_request_statements():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    response = _get(_queries_app(engine, ["SELECT 1", "SELECT 2"]))
+    assert response.headers["X-DB-Queries"] == "2"
+    assert float(response.headers["X-DB-Time"]) >= 0
+    assert "X-DB-Repeated" not in response.headers
+
+
+def test_repeated_statements_are_reported_as_n_plus_one(caplog):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    statements = ["SELECT 1"] + ["SELECT 2"] * profiler.SQL_N_PLUS_ONE_THRESHOLD
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        response = _get(_queries_app(engine, statements))
+    assert response.headers["X-DB-Queries"] == str(len(statements))
+    assert response.headers["X-DB-Repeated"] == "1"
+    warnings = [record for record in caplog.records if record.getMessage().startswith("Possible N+1")]
+    assert len(warnings) == 1
+    assert warnings[0].repeat_count == profiler.SQL_N_PLUS_ONE_THRESHOLD
+    assert "GET /intake/{email}" in warnings[0].getMessage()
+    assert not any("alice@example.com" in record.getMessage() for record in caplog.records)
+
+
+def test_statements_outside_a_request_are_not_attributed():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert _get(_queries_app(engine, [])).headers["X-DB-Queries"] == "0"
+
+
+def test_slow_queries_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(profiler, "SQL_SLOW_QUERY_MS", 0)
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with caplog.at_level(logging.WARNING, logger="app.profiler"):
+        _get(_queries_app(engine, ["SELECT 1"]))
+    slow = [record for record in caplog.records if record.getMessage().startswith("Slow query")]
+    assert [record.route for record in slow] == ["GET /intake/{email}"]
+
+
+def test_summary_keeps_the_slowest_statements():
+    profile = QueryProfile("GET", {})
+    for index, duration in enumerate([0.001, 0.004, 0.002, 0.003, 0.005]):
+        profile.record(f"SELECT {index}", duration)
+    summary = profile.summary()
+    assert (summary["queries"], summary["db_time_ms"]) == (5, 15.0)
+    assert [item["statement"] for item in summary["slowest"]] == ["SELECT 4", "SELECT 1", "SELECT 3"][:profiler.SQL_PROFILE_TOP]
+
+
+def test_unmatched_requests_share_one_route():
+    profile = QueryProfile("GET", {"path": "/no/such/alice@example.com"})
+    assert profile.summary()["route"] == f"GET {UNMATCHED_ROUTE}"
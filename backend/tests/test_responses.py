@@ -0,0 +1,49 @@
+import json
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from app.main import app
+from app.models.schemas import AddressResponse, UserResponse
+from app.responses import dump_json, list_response, model_response
+
+EMAIL = "client@example.com"
+
+
+def test_model_response_matches_fastapis_encoding():
+    user = UserResponse(user_id="user-1", email=EMAIL, full_name="Zoë", created_at=datetime(2024, 5, 1, 12, 30, 15, 250000))
+    response = model_response(user, status_code=201, headers={"ETag": '"abc"'})
+    assert (response.status_code, response.headers["etag"], response.media_type) == (201, '"abc"', "application/json")
+    # Same document the response_model path would have produced
+    assert json.loads(response.body) == jsonable_encoder(user)
+    assert response.body == dump_json(user) == user.model_dump_json().encode()
+
+
+def test_list_response_serializes_in_one_call():
+    addresses = [AddressResponse(address_id=index, user_id="user-1", city=f"City {index}") for index in range(3)]
+    response = list_response(AddressResponse, addresses)
+    assert json.loads(response.body) == jsonable_encoder(addresses)
+    assert list_response(AddressResponse, []).body == b"[]"
+
+
+def test_routes_return_the_documented_shape(client, user):
+    client.post(f"/address/user/{EMAIL}", json={"street": "Main St", "city": "Springfield"})
+    response = client.get(f"/address/user/{EMAIL}")
+    assert response.headers["content-type"] == "application/json"
+    [address] = response.json()
+    assert set(address) == set(AddressResponse.model_fields)
+    assert set(client.get(f"/users/{EMAIL}").json()) == set(UserResponse.model_fields)
+
+
+def test_dict_routes_use_orjson(client):
+    assert app.router.default_response_class.__name__ == "ORJSONResponse"
+    response = client.get("/")
+    assert response.headers["content-type"] == "application/json"
+    # orjson writes compact JSON, json.dumps would add ", " separators
+    assert b": " not in response.content and b", " not in response.content
+
+
+def test_openapi_keeps_the_response_models(client):
+    schema = client.get("/openapi.json").json()
+    get_address = schema["paths"]["/address/user/{email}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert get_address == {"type": "array", "items": {"$ref": "#/components/schemas/AddressResponse"}, "title": get_address["title"]}
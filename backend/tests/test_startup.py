@@ -0,0 +1,53 @@
+import asyncio
+
+from sqlalchemy import create_engine
+
+from app import migrations, startup
+from app.startup import StartupReport, warm_up
+
+
+def test_ready_once_the_database_is_warm(client):
+    response = client.get("/internal/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert body["db_error"] is None
+    assert body["pending_migrations"] == []
+
+
+def test_startup_report_lists_the_phases(client):
+    report = client.get("/internal/startup").json()
+    names = [phase["name"] for phase in report["phases"]]
+    assert "import app.database" in names
+    assert "database connect + migration check" in names
+    durations = [phase["ms"] for phase in report["phases"]]
+    assert durations == sorted(durations, reverse=True)
+
+
+def test_warm_up_retries_until_the_database_answers(tmp_path, monkeypatch):
+    monkeypatch.setattr(startup, "DB_CONNECT_RETRY_INITIAL", 0)
+    real_run_migrations = migrations.run_migrations
+    failures = [ConnectionError("refused"), ConnectionError("refused")]
+
+    async def flaky_run_migrations(engine, fn):
+        if failures:
+            raise failures.pop()
+        return await real_run_migrations(engine, fn)
+
+    monkeypatch.setattr(migrations, "run_migrations", flaky_run_migrations)
+    report = StartupReport()
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    asyncio.run(warm_up(engine, report))
+
+    assert report.ready and report.db_attempts == 3
+    assert report.db_error is None
+    # An empty database has every migration pending; warm_up reports them, it does not run them
+    assert report.pending_migrations == [migration.name for migration in migrations.load_migrations()]
+
+
+def test_not_ready_until_warm_up_finishes(client, monkeypatch):
+    monkeypatch.setattr(startup.startup_report, "ready", False)
+    monkeypatch.setattr(startup.startup_report, "db_error", "OperationalError: refused")
+    response = client.get("/internal/ready")
+    assert response.status_code == 503
+    assert response.json()["db_error"] == "OperationalError: refused"
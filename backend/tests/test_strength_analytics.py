@@ -0,0 +1,126 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app import strength
+from app.data_versions import read_version
+from app.database import DbSession, SessionLocal
+from app.models import intake_models
+from app.strength import STRENGTH_VERSION, strength_cache
+
+EMAIL = "client@example.com"
+
+
+def _version(engine) -> int:
+    with engine.connect() as connection:
+        return read_version(connection, STRENGTH_VERSION)
+
+
+def _save_squat(client, weight: str):
+    response = client.post(f"/intake/{EMAIL}/strength-measurements", json={
+        "squat_weight": weight, "squat_reps": "5", "strength1_completed": True, "strength2_completed": True,
+    })
+    assert response.status_code < 300, response.text
+
+
+def test_analytics_reflect_the_latest_write(client, intake_user):
+    _save_squat(client, "100")
+    first = client.get(f"/analytics/strength/{EMAIL}").json()
+    _save_squat(client, "120")
+    second = client.get(f"/analytics/strength/{EMAIL}").json()
+    assert second["version"] > first["version"]
+    assert second["lifts"][0]["e1rm_kg"] > first["lifts"][0]["e1rm_kg"]
+    assert client.get("/analytics/strength/cohorts").json()["rows"][0]["users"] == 1
+
+
+def test_version_is_bumped_once_per_commit(client, intake_user, db_engine):
+    before = _version(db_engine)
+    # Changes strength inputs and the form's weight: several rows, one bump
+    response = client.post(f"/intake/{EMAIL}/submit", json={
+        "intake": {"weight": "80", "age": "30"},
+        "strength_measurements": {"squat_weight": "100", "squat_reps": "5", "bench_press_weight": "80", "bench_press_reps": "3"},
+    })
+    assert response.status_code < 300, response.text
+    assert _version(db_engine) == before + 1
+
+
+def test_rolled_back_write_does_not_bump(intake_user, db_engine, db_session):
+    before = _version(db_engine)
+    form = db_session.scalars(select(intake_models.IntakeForm)).one()
+    form.weight_kg = 90.0
+    db_session.flush()
+    db_session.rollback()
+    assert _version(db_engine) == before
+
+    form.weight_kg = 91.0
+    db_session.commit()
+    assert _version(db_engine) == before + 1
+
+
+def _gather(client, callers: int):
+    async def run():
+        sessions = [DbSession(SessionLocal()) for _ in range(callers)]
+        try:
+            return await asyncio.gather(*(strength_cache.get(db) for db in sessions))
+        finally:
+            for db in sessions:
+                await db.close()
+
+    return client.portal.call(run)
+
+
+def test_concurrent_misses_compute_once(client, intake_user, monkeypatch):
+    _save_squat(client, "100")
+    computed = []
+    original = strength.compute
+
+    def counting_compute(db, version):
+        computed.append(version)
+        return original(db, version)
+
+    monkeypatch.setattr(strength, "compute", counting_compute)
+    snapshots = _gather(client, 5)
+    assert len(computed) == 1
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+
+
+def test_stale_snapshot_is_served_while_refreshing(client, intake_user, monkeypatch):
+    _save_squat(client, "100")
+    stale = _gather(client, 1)[0]
+    _save_squat(client, "120")
+    served_stale = strength_cache.stale
+
+    async def run():
+        release = asyncio.Event()
+        original = strength_cache._compute
+
+        async def held_compute(version):
+            await release.wait()
+            return await original(version)
+
+        monkeypatch.setattr(strength_cache, "_compute", held_compute)
+        refreshing, waiting = DbSession(SessionLocal()), DbSession(SessionLocal())
+        try:
+            refresh = asyncio.create_task(strength_cache.get(refreshing))
+            while strength_cache._refresh is None:
+                await asyncio.sleep(0.001)
+            # Arrives while the refresh runs: gets the previous snapshot at once
+            assert await strength_cache.get(waiting) is stale
+            release.set()
+            return await refresh
+        finally:
+            await refreshing.close()
+            await waiting.close()
+
+    fresh = client.portal.call(run)
+    assert fresh.version > stale.version
+    assert strength_cache.stats()["stale"] == served_stale + 1
+
+
+def test_cohorts_are_age_band_and_weight_class(client, intake_user):
+    client.put(f"/intake/{EMAIL}", json={"age": "30", "weight": "80", "measurement_system": "metric"})
+    _save_squat(client, "100")
+    for cohort in strength.COHORTS:
+        assert client.get("/analytics/strength/cohorts", params={"cohort": cohort}).status_code == 200
+    # Intake forms record no gender to group by
+    assert client.get("/analytics/strength/cohorts", params={"cohort": "gender"}).status_code == 400
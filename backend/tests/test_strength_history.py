@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.models import intake_models
+from app.strength_history import append_entries, database_now, entry_rows, rebuild_rollups
+
+EMAIL = "client@example.com"
+HISTORY = intake_models.StrengthHistoryEntry.__table__
+ROLLUPS = intake_models.StrengthHistoryRollup.__table__
+STRENGTH = intake_models.StrengthMeasurement.__table__
+
+
+def _save(client, squat_weight: str, squat_reps: str = "5"):
+    response = client.post(f"/intake/{EMAIL}/strength-measurements", json={
+        "squat_weight": squat_weight, "squat_reps": squat_reps, "strength1_completed": True, "strength2_completed": True,
+    })
+    assert response.status_code < 300, response.text
+
+
+def _rollups(connection) -> list:
+    return connection.execute(select(ROLLUPS).order_by(ROLLUPS.c.period, ROLLUPS.c.lift)).mappings().all()
+
+
+def test_saves_append_history_and_merge_rollups(client, intake_user, db_engine):
+    _save(client, "100")
+    _save(client, "120", "3")
+    _save(client, "110")
+
+    history = client.get(f"/analytics/strength/{EMAIL}/history").json()["entries"]
+    assert [entry["weight_kg"] for entry in history] == pytest.approx([45.359, 54.431, 49.895], abs=1e-3)
+
+    week = client.get(f"/analytics/strength/{EMAIL}/trend", params={"period": "week"}).json()["series"][0]["points"]
+    assert sum(point["entries"] for point in week) == 3
+
+    with db_engine.connect() as connection:
+        # Merged into one row per period, matching a full recompute
+        merged = [dict(row) for row in _rollups(connection)]
+        rebuild_rollups(connection)
+        assert [dict(row) for row in _rollups(connection)] == merged
+        connection.rollback()
+    assert sum(row["entries"] for row in merged if row["period"] == "month") == 3
+
+
+def test_changing_the_measurement_system_appends_history(client, intake_user, db_engine):
+    client.put(f"/intake/{EMAIL}", json={"weight": "176", "measurement_system": "imperial"})
+    _save(client, "220")
+    client.put(f"/intake/{EMAIL}", json={"measurement_system": "metric"})
+
+    history = client.get(f"/analytics/strength/{EMAIL}/history").json()["entries"]
+    assert [entry["weight_kg"] for entry in history] == pytest.approx([99.79, 220.0], abs=1e-3)
+
+    week = client.get(f"/analytics/strength/{EMAIL}/trend", params={"period": "week"}).json()["series"][0]["points"]
+    assert sum(point["entries"] for point in week) == 2
+    with db_engine.connect() as connection:
+        merged = [dict(row) for row in _rollups(connection)]
+        rebuild_rollups(connection)
+        assert [dict(row) for row in _rollups(connection)] == merged
+        connection.rollback()
+
+    # Unchanged numbers log nothing
+    client.put(f"/intake/{EMAIL}", json={"measurement_system": "metric", "weight": "80"})
+    assert len(client.get(f"/analytics/strength/{EMAIL}/history").json()["entries"]) == 2
+
+
+def test_entries_use_the_database_clock(client, intake_user, db_engine):
+    _save(client, "100")
+    with db_engine.connect() as connection:
+        last_updated = connection.execute(select(STRENGTH.c.last_updated)).scalar()
+        recorded_at = connection.execute(select(HISTORY.c.recorded_at)).scalar()
+    # Both come from the database's CURRENT_TIMESTAMP, not one from Python's clock
+    assert abs((recorded_at - last_updated).total_seconds()) <= 1
+
+
+def test_merging_into_an_existing_rollup_upserts(intake_user, db_engine):
+    recorded_at = datetime(2024, 3, 6, 12)
+
+    def entries(weight, reps):
+        return entry_rows(["user-1"], [recorded_at], ["squat"], [weight], [reps], [None])
+
+    with db_engine.begin() as connection:
+        append_entries(connection, entries(100.0, 5))
+        # Same periods again: merged into the stored rows instead of a duplicate insert
+        append_entries(connection, entries(80.0, None))
+        append_entries(connection, entries(120.0, 1))
+        rows = {row["period"]: row for row in _rollups(connection)}
+
+    week = rows["week"]
+    assert (week["entries"], week["e1rm_entries"]) == (3, 2)
+    # The entry without an e1RM keeps the best one; max weight and last entry follow the inserts
+    assert week["best_e1rm_kg"] == pytest.approx(120.0)
+    assert week["max_weight_kg"] == pytest.approx(120.0)
+    assert week["last_e1rm_kg"] == pytest.approx(120.0)
+    assert rows["month"]["entries"] == 3
+
+
+def test_database_now_is_naive(db_engine):
+    with db_engine.connect() as connection:
+        now = database_now(connection)
+    assert isinstance(now, datetime) and now.tzinfo is None
@@ -0,0 +1,52 @@
+from sqlalchemy import func, select
+
+from app.models import intake_models
+from app.routers import intake_forms
+
+EMAIL = "client@example.com"
+
+
+def test_submit_creates_the_form_and_saves_every_section(client, user):
+    response = client.post(f"/intake/{EMAIL}/submit", json={
+        "intake": {"occupation": "Nurse"},
+        "goals": {"goal1": "Run"},
+        "strength_measurements": {"squat_weight": "100", "squat_reps": "5", "strength1_completed": True, "strength2_completed": True},
+        "genetics": {"wrist_circumference": "17", "genetics_completed": True},
+        "cardio_equipment": {"equipment_list": ["bike"]},
+        "gym_equipment": {"equipment_list": ["bench"], "leg_curl_type": "seated"},
+        "dumbbell_info": {"is_full_set": True, "min_weight": "2", "max_weight": "30"},
+    })
+    assert response.status_code == 200, response.text
+    form = response.json()
+    assert (form["occupation"], form["goal1"], form["goals_completed"], form["leg_curl_type"]) == ("Nurse", "Run", True, "seated")
+    assert form["strength_measurements"][0]["squat_weight"] == "100"
+    assert form["genetics"][0]["wrist_circumference"] == "17"
+    assert [row["equipment_type"] for row in form["cardio_equipment"]] == ["bike"]
+    assert [row["equipment_type"] for row in form["gym_equipment"]] == ["bench"]
+    assert form["dumbbell_info"][0]["max_weight"] == "30"
+    # The response is the document GET serves
+    assert client.get(f"/intake/{EMAIL}").json() == form
+
+
+def test_submit_is_all_or_nothing(client, intake_user, db_engine, monkeypatch):
+    def failing_dumbbell_info(db, intake_form, data):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(intake_forms, "_apply_dumbbell_info", failing_dumbbell_info)
+    response = client.post(f"/intake/{EMAIL}/submit", json={
+        "intake": {"occupation": "Nurse"},
+        "cardio_equipment": {"equipment_list": ["bike"]},
+        "dumbbell_info": {"is_full_set": True},
+    })
+    assert response.status_code == 500
+
+    assert client.get(f"/intake/{EMAIL}").json()["occupation"] is None
+    with db_engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(intake_models.CardioEquipment.__table__)).scalar() == 0
+
+
+def test_sections_left_out_are_untouched(client, intake_user):
+    client.post(f"/intake/{EMAIL}/submit", json={"goals": {"goal1": "Run"}, "cardio_equipment": {"equipment_list": ["bike"]}})
+    form = client.post(f"/intake/{EMAIL}/submit", json={"intake": {"occupation": "Nurse"}}).json()
+    assert (form["goal1"], form["occupation"]) == ("Run", "Nurse")
+    assert [row["equipment_type"] for row in form["cardio_equipment"]] == ["bike"]
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app import units
+from app.models import intake_models
+
+EMAIL = "client@example.com"
+
+
+def _values(array) -> list:
+    return [None if np.isnan(value) else round(float(value), 3) for value in array]
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("30", 30), (" 45 ", 45), ("30 yrs", 30), ("30y", 30),
+    ("30.5", None), ("4", None), ("121", None), ("thirty", None), (None, None), ("", None),
+])
+def test_ages(raw, expected):
+    assert _values(units.ages([raw])) == [expected]
+
+
+@pytest.mark.parametrize("raw, system, expected", [
+    ("80", "metric", 80.0),
+    ("80", "imperial", 36.287),
+    # An explicit unit wins over the measurement system
+    ("80 kg", "imperial", 80.0),
+    ("176 lbs", "metric", 79.832),
+    ("176lb.", "metric", 79.832),
+    ("80,5 kg", "metric", 80.5),
+    # No system set means the imperial default
+    ("176", None, 79.832),
+    ("80 cm", "metric", None),
+    ("10", "metric", None),
+    ("999", "metric", None),
+    ("", "metric", None),
+])
+def test_weights_kg(raw, system, expected):
+    assert _values(units.weights_kg([raw], [system])) == [expected]
+
+
+@pytest.mark.parametrize("raw, system, expected", [
+    ("180", "metric", 1.8),
+    ("1.8", "metric", 1.8),
+    ("1,80 m", "imperial", 1.8),
+    ("180 cm", "imperial", 1.8),
+    ("5.10", "imperial", 1.778),
+    ("70", "imperial", 1.778),
+    ("72 in", "metric", 1.829),
+    ("5'10\"", "metric", 1.778),
+    ("5' 10", "metric", 1.778),
+    ("5 ft 10 in", "metric", 1.778),
+    ("6 ft", "metric", 1.829),
+    # Twelve or more inches is not a ft.in reading
+    ("5.13", "imperial", None),
+    ("18", "metric", None),
+    ("tall", "metric", None),
+])
+def test_heights_m(raw, system, expected):
+    assert _values(units.heights_m([raw], [system])) == [expected]
+
+
+def test_body_fat_and_reps():
+    assert _values(units.body_fat_pcts(["15", "15%", "15.5 %", "0.5", "80", "15 kg"])) == [15.0, 15.0, 15.5, None, None, None]
+    assert _values(units.rep_counts(["5", "0", "5.5", "101", "5 reps", None])) == [5, 0, None, None, None, None]
+
+
+def test_repeated_inputs_parse_to_the_same_values():
+    raw = ["80", "176 lbs", "80", None, "176 lbs", "80"]
+    systems = ["metric"] * len(raw)
+    assert _values(units.weights_kg(raw, systems)) == [80.0, 79.832, 80.0, None, 79.832, 80.0]
+    assert units.weights_kg([], []).shape == (0,)
+
+
+def test_columns_round_and_use_null_for_missing():
+    assert units._column(np.array([79.83225, np.nan])) == [79.832, None]
+    assert units._column(np.array([30.0, np.nan]), integer=True) == [30, None]
+
+
+def _form_columns(engine):
+    form = intake_models.IntakeForm.__table__
+    with engine.connect() as connection:
+        return connection.execute(select(form.c.age_years, form.c.weight_kg, form.c.height_m, form.c.body_fat_pct)).one()
+
+
+def _squat_kg(engine):
+    strength = intake_models.StrengthMeasurement.__table__
+    with engine.connect() as connection:
+        return connection.execute(select(strength.c.squat_weight_kg, strength.c.squat_reps_count)).one()
+
+
+def test_writes_keep_the_numeric_columns_in_sync(client, intake_user, db_engine):
+    client.put(f"/intake/{EMAIL}", json={"age": "30", "weight": "176", "height": "5'10\"", "body_fat": "15%"})
+    assert tuple(_form_columns(db_engine)) == (30, 79.832, 1.778, 15.0)
+
+    # Only the changed input is re-read; the rest keep their values
+    client.put(f"/intake/{EMAIL}", json={"weight": "not sure"})
+    assert tuple(_form_columns(db_engine)) == (30, None, 1.778, 15.0)
+
+
+def test_changing_the_measurement_system_renormalizes(client, intake_user, db_engine):
+    client.put(f"/intake/{EMAIL}", json={"weight": "80", "height": "180", "measurement_system": "imperial"})
+    client.post(f"/intake/{EMAIL}/strength-measurements", json={
+        "squat_weight": "220", "squat_reps": "5", "strength1_completed": True, "strength2_completed": True,
+    })
+    assert tuple(_squat_kg(db_engine)) == (99.79, 5)
+    # 180 in is out of range, so the height is unknown until the system is fixed
+    assert tuple(_form_columns(db_engine))[1:3] == (36.287, None)
+
+    client.put(f"/intake/{EMAIL}", json={"measurement_system": "metric"})
+    assert tuple(_squat_kg(db_engine)) == (220.0, 5)
+    assert tuple(_form_columns(db_engine))[1:3] == (80.0, 1.8)
@@ -0,0 +1,62 @@
+from sqlalchemy import insert, select
+
+from app.dependencies import normalize_email, user_id_cache
+from app.migrations.versions import m0008_lowercase_user_emails
+from app.models import user_models
+
+
+def test_normalize_email():
+    assert normalize_email("  Client@Example.COM ") == "client@example.com"
+
+
+def test_emails_are_stored_lowercased(client):
+    response = client.post("/users/", json={"user_id": "user-1", "email": "Client@Example.com"})
+    assert response.status_code == 200
+    assert response.json()["email"] == "client@example.com"
+
+
+def test_lookup_ignores_email_case(client, user):
+    assert client.get("/users/CLIENT@example.com").json()["user_id"] == user["user_id"]
+    response = client.post("/intake/initialize/Client@Example.com")
+    assert response.status_code == 200
+    assert client.get("/intake/client@example.com").status_code == 200
+
+
+def test_duplicate_email_in_other_case_is_rejected(client, user):
+    response = client.post("/users/", json={"user_id": "user-2", "email": "CLIENT@example.com"})
+    assert response.status_code == 400
+
+
+def test_cached_lookup_matches_the_query(client, user):
+    # get_user_id queries with the same normalized email it caches under
+    response = client.post("/users/Client@Example.com/address", json={"city": "Utrecht"})
+    assert response.status_code == 200
+    assert user_id_cache.get("client@example.com") == user["user_id"]
+    user_id_cache.clear()
+    assert client.post("/users/CLIENT@EXAMPLE.COM/address", json={"city": "Delft"}).status_code == 200
+
+
+def test_invalidation_waits_for_commit(db_session):
+    user_id_cache.set("new@example.com", "stale-id")
+    db_session.add(user_models.User(user_id="user-new", email="new@example.com"))
+    db_session.flush()
+    # Flushed but not committed: other requests still see the old mapping
+    assert user_id_cache.get("new@example.com") == "stale-id"
+    db_session.rollback()
+    assert user_id_cache.get("new@example.com") == "stale-id"
+
+    db_session.add(user_models.User(user_id="user-new", email="new@example.com"))
+    db_session.commit()
+    assert user_id_cache.get("new@example.com") is None
+
+
+def test_migration_lowercases_emails(db_connection):
+    users = user_models.User.__table__
+    db_connection.execute(insert(users), [
+        {"user_id": "a", "email": "Mixed@Example.com"},
+        {"user_id": "b", "email": "taken@example.com"},
+        {"user_id": "c", "email": "TAKEN@example.com"},
+    ])
+    m0008_lowercase_user_emails.upgrade(db_connection)
+    emails = dict(db_connection.execute(select(users.c.user_id, users.c.email)).all())
+    assert emails == {"a": "mixed@example.com", "b": "taken@example.com", "c": "TAKEN@example.com"}